@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Measure the per-label cost of formatting ER-style HTML table labels
+where many labels share a small number of table layouts.
+
+The previous tag by tag formatter is reproduced here so both can be
+compared against the same labels.
+"""
+from argparse import ArgumentParser
+import random
+import time
+
+from graphviz_overlay.labels import format_html_label
+
+
+def build_labels(label_count, layouts):
+    rng = random.Random(42)
+    shapes = [
+        (rng.randint(2, 12), rng.choice([True, False]))
+        for _ in range(layouts)
+    ]
+    labels = []
+    for i in range(label_count):
+        rows, typed = shapes[i % layouts]
+        trs = [[{'colspan': '2' if typed else '1', 'value': f'entity{i}'}]]
+        for row in range(rows):
+            cells = [{'port': f'p{row}', 'value': f'column{row}'}]
+            if typed:
+                cells.append({'align': 'left', 'value': 'varchar'})
+            trs.append(cells)
+        labels.append({'border': '0', 'cellborder': '1', 'trs': trs})
+    return labels
+
+
+def previous_format_html_label(label):
+    rows = []
+    for row in label['trs']:
+        tds = []
+        for td in row:
+            tds.append(
+                previous_format_html_tag('td', td, td['value'])
+            )
+        rows.append(
+            previous_format_html_tag('tr', inner=''.join(tds))
+        )
+    table = previous_format_html_tag('table', label, ''.join(rows))
+    return f'<{table}>'
+
+
+def previous_format_html_tag(tag, attrs=None, inner=''):
+    html_attrs = {
+        'TABLE': [
+            'ALIGN', 'BGCOLOR', 'BORDER', 'CELLBORDER', 'CELLPADDING',
+            'CELLSPACING', 'COLOR', 'COLUMNS', 'FIXEDSIZE', 'GRADIENTANGLE',
+            'HEIGHT', 'HREF', 'ID', 'PORT', 'ROWS', 'SIDES',
+            'STYLE', 'TARGET', 'TITLE', 'TOOLTIP', 'VALIGN',
+            'WIDTH',
+        ],
+        'TD': [
+            'ALIGN', 'BALIGN', 'BGCOLOR', 'BORDER', 'CELLPADDING',
+            'CELLSPACING', 'COLOR', 'COLSPAN', 'FIXEDSIZE', 'GRADIENTANGLE',
+            'HEIGHT', 'HREF', 'ID', 'PORT', 'ROWSPAN', 'SIDES',
+            'STYLE', 'TARGET', 'TITLE', 'TOOLTIP', 'VALIGN',
+            'WIDTH',
+        ],
+    }
+    attrs = attrs or {}
+    tag = tag.upper()
+    tag_attrs = [
+        f'{k.upper()}="{v}"'
+        for k, v in attrs.items()
+        if k.upper() in html_attrs[tag]
+    ]
+    html = f'<{tag}'
+    if tag_attrs:
+        html += f" {' '.join(tag_attrs)}"
+    html += f'>{inner}</{tag}>'
+    return html
+
+
+def measure(label, func, labels):
+    start = time.perf_counter()
+    for html_label in labels:
+        func(html_label)
+    elapsed = time.perf_counter() - start
+    per_label = elapsed / len(labels) * 1e6
+    print(f'{label:<28} {elapsed:8.3f}s {per_label:8.2f}us/label')
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--labels', type=int, default=50_000)
+    parser.add_argument('--layouts', type=int, default=20)
+    opts = parser.parse_args()
+
+    labels = build_labels(opts.labels, opts.layouts)
+    for html_label in labels[:opts.layouts]:
+        assert (
+            format_html_label(html_label)
+            == previous_format_html_label(html_label)
+        )
+
+    measure('tag by tag formatter', previous_format_html_label, labels)
+    measure('compiled templates', format_html_label, labels)
+
+    print(f'{len(labels)} labels, {opts.layouts} layouts')
+
+
+if __name__ == '__main__':
+    main()
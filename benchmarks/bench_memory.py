@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Measure the memory held per element while drawing a model, kept as the
+dictionaries parsed from json and compiled, see graphviz_overlay.ir.
+
+Both count the model and its preprocessed overlay, which are alive
+while the overlay is walked. The time to draw both is shown next to it.
+"""
+from argparse import ArgumentParser
+import gc
+import json
+import random
+import time
+import tracemalloc
+
+from graphviz_overlay.ir import compile_model
+from graphviz_overlay.overlays import Graph
+
+
+def build_model(node_count, edge_count, subgraph_count):
+    rng = random.Random(42)
+    model = {'nodes': {}, 'edges': [], 'subgraphs': {}}
+    levels = [model]
+    for i in range(subgraph_count):
+        subgraph = {'nodes': {}, 'edges': []}
+        model['subgraphs'][f'sub{i}'] = subgraph
+        levels.append(subgraph)
+
+    node_ids = []
+    for i in range(node_count):
+        node = {}
+        if i % 3 == 0:
+            node['classes'] = ['service']
+        if i % 10 == 0:
+            node['label'] = f'Node {i}'
+        level = levels[i % len(levels)]
+        level['nodes'][f'n{i}'] = node
+        node_ids.append(f'n{i}')
+
+    for i in range(edge_count):
+        edge = {
+            'from': rng.choice(node_ids),
+            'to': rng.choice(node_ids),
+        }
+        if i % 5 == 0:
+            edge['paths'] = ['calls']
+        levels[i % len(levels)]['edges'].append(edge)
+    return json.dumps(model)
+
+
+def held(func, text):
+    """:returns: (bytes, seconds) held by func(text) and spent in it"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func(text)
+    seconds = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size, seconds
+
+
+def parsed(text):
+    overlay = Graph()
+    model = json.loads(text)
+    return model, overlay.preprocess_model(model)
+
+
+def compiled(text):
+    overlay = Graph()
+    model = compile_model(json.loads(text))
+    return model, overlay.preprocess_model(model)
+
+
+def draw_time(text, compile_first):
+    model = json.loads(text)
+    overlay = Graph()
+    start = time.perf_counter()
+    if compile_first:
+        model = compile_model(model)
+    overlay.ctx.init_graph('G', overlay.graph_class, model)
+    overlay.walk_model(overlay.ctx, overlay.preprocess_model(model))
+    overlay.ctx.close()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=200_000)
+    parser.add_argument('--subgraphs', type=int, default=100)
+    opts = parser.parse_args()
+
+    text = build_model(opts.nodes, opts.edges, opts.subgraphs)
+    elements = opts.nodes + opts.edges
+    print(
+        f'{opts.nodes} nodes and {opts.edges} edges '
+        f'in {opts.subgraphs} subgraphs'
+    )
+    for label, func, compile_first in (
+        ('parsed dictionaries', parsed, False),
+        ('compiled', compiled, True),
+    ):
+        size, _ = held(func, text)
+        seconds = draw_time(text, compile_first)
+        print(
+            f'{label:<20} {size / elements:8.1f} bytes per element '
+            f'{seconds:8.3f}s to draw'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Measure selecting a small part of a large model, preprocessing every
+element against the selectors and preprocessing the groups of elements
+sharing paths in a compiled model.
+"""
+from argparse import ArgumentParser
+import random
+import time
+
+from graphviz_overlay.ir import compile_model
+from graphviz_overlay.overlays import Graph
+
+
+def build_model(node_count, edge_count, domains, rng):
+    paths = [f'd{i}.area{j}' for i in range(domains) for j in range(3)]
+    model = {'nodes': {}, 'edges': []}
+    for i in range(node_count):
+        model['nodes'][f'n{i}'] = {'paths': [rng.choice(paths)]}
+    for _ in range(edge_count):
+        model['edges'].append({
+            'from': f'n{rng.randrange(node_count)}',
+            'to': f'n{rng.randrange(node_count)}',
+            'paths': [rng.choice(paths)],
+        })
+    return model
+
+
+def measure(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f'{label:<28} {time.perf_counter() - start:8.3f}s')
+    return result
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=200_000)
+    parser.add_argument('--edges', type=int, default=400_000)
+    parser.add_argument('--domains', type=int, default=100)
+    opts = parser.parse_args()
+
+    rng = random.Random(42)
+    model = build_model(opts.nodes, opts.edges, opts.domains, rng)
+    compiled = compile_model(model)
+    print(
+        f'{opts.nodes} nodes and {opts.edges} edges in '
+        f'{opts.domains} domains, selecting one'
+    )
+
+    for remove_deselected in (True, False):
+        print('removing deselected' if remove_deselected else 'hiding')
+        overlay = Graph(select='d7', remove_deselected=remove_deselected)
+        expect = measure(
+            'per element', overlay.preprocess_model, model,
+        )
+        result = measure(
+            'per group of paths', overlay.preprocess_model, compiled,
+        )
+        assert len(result.nodes) == len(expect.nodes)
+        assert len(result.edges) == len(expect.edges)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Measure rank bookkeeping on a model with many ranked nodes spread over
+nested subgraphs.
+
+The list concatenating bookkeeping GraphContext used previously is
+reproduced here so both strategies can be compared on the same walk.
+"""
+from argparse import ArgumentParser
+import time
+
+import graphviz
+
+from graphviz_overlay.context import RankRegistry
+from graphviz_overlay.overlays import Graph
+
+
+def build_model(node_count, rank_count, depth, branching=2, spread=True):
+    """Build a tree of subgraphs with ranked nodes.
+
+    Nodes are spread over all subgraphs, or all put in the last one.
+    """
+    levels = []
+
+    def subgraph(level):
+        model = {'nodes': {}, 'subgraphs': {}}
+        levels.append(model)
+        if level < depth:
+            for i in range(branching):
+                model['subgraphs'][f's{level}_{len(levels)}_{i}'] = (
+                    subgraph(level + 1)
+                )
+        return model
+
+    root = subgraph(1)
+    for i in range(node_count):
+        level = levels[i % len(levels)] if spread else levels[-1]
+        level['nodes'][f'n{i}'] = {
+            'rank': f'r{i % rank_count}',
+        }
+    root['ranks'] = {f'r{i}': 'same' for i in range(rank_count)}
+    return root, len(levels)
+
+
+def copying_bookkeeping(model):
+    """Rank bookkeeping by concatenating lists at every level."""
+    ranks = {}
+    for name, node in model['nodes'].items():
+        rank_nodes = ranks.get(node['rank'], [])
+        ranks[node['rank']] = rank_nodes + [name]
+    for subgraph in model['subgraphs'].values():
+        for rank, nodes in copying_bookkeeping(subgraph).items():
+            ranks[rank] = ranks.get(rank, []) + nodes
+    return ranks
+
+
+def registry_bookkeeping(model, registry=None):
+    """Rank bookkeeping with a RankRegistry shared by all levels."""
+    registry = registry or RankRegistry()
+    mark = registry.mark()
+    for name, node in model['nodes'].items():
+        registry.add(node['rank'], name)
+    for subgraph in model['subgraphs'].values():
+        registry_bookkeeping(subgraph, registry)
+    return registry.ranks(mark)
+
+
+def measure(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    print(f'{label:<24} {time.perf_counter() - start:8.3f}s')
+    return result
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=50_000)
+    parser.add_argument('--ranks', type=int, default=20)
+    parser.add_argument('--depth', type=int, default=6)
+    opts = parser.parse_args()
+
+    for spread in (True, False):
+        model, subgraphs = build_model(
+            opts.nodes, opts.ranks, opts.depth, spread=spread,
+        )
+        print(
+            f'{opts.nodes} nodes in {opts.ranks} ranks, '
+            f'{subgraphs} subgraphs over {opts.depth} levels, '
+            + ('spread over all subgraphs' if spread else 'in one subgraph')
+        )
+
+        expect = measure('copying bookkeeping', copying_bookkeeping, model)
+        result = measure('registry bookkeeping', registry_bookkeeping, model)
+        assert result == expect
+
+        overlay = Graph()
+        measure('Graph.draw', overlay.draw, 'G', model, graphviz.Graph)
+
+
+if __name__ == '__main__':
+    main()
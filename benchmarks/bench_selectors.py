@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare answering select/highlight/shade with string prefix matching
+against the compiled PathSelector for many elements and selectors.
+"""
+from argparse import ArgumentParser
+import random
+import time
+
+from graphviz_overlay.overlays import Graph
+
+
+def build_paths(element_count, domains, depth, rng):
+    def path():
+        return '.'.join(
+            f'd{rng.randrange(domains)}' for _ in range(rng.randint(1, depth))
+        )
+    return [
+        [path() for _ in range(rng.randint(1, 3))]
+        for _ in range(element_count)
+    ]
+
+
+def build_selectors(count, domains, depth, rng):
+    selectors = []
+    for i in range(count):
+        selector = '.'.join(
+            f'd{rng.randrange(domains)}' for _ in range(rng.randint(1, depth))
+        )
+        selectors.append(f'^{selector}' if i % 5 == 0 else selector)
+    return ','.join(selectors)
+
+
+def reference_paths_in_paths(paths, selected_paths):
+    """Any of the paths is selected by the selectors.
+
+    Matches by comparing every path against every selector, the way
+    overlays matched paths before compiling them into a PathSelector.
+    """
+    if selected_paths == ['']:
+        return False
+
+    inverted_paths = [
+        p[1:]
+        for p in selected_paths
+        if p.startswith('^')
+    ]
+    in_inverted_path = False
+
+    for path in paths:
+        if any(path.startswith(p) for p in selected_paths):
+            return True
+
+        in_inverted_path = (
+            in_inverted_path
+            or any(path.startswith(p) for p in inverted_paths)
+        )
+
+    return (inverted_paths and not in_inverted_path)
+
+
+def string_prefix(overlay, element_paths):
+    for paths in element_paths:
+        (
+            overlay.selected_paths == ['']
+            or reference_paths_in_paths(paths, overlay.selected_paths),
+            reference_paths_in_paths(paths, overlay.highlighted_paths),
+            reference_paths_in_paths(paths, overlay.shaded_paths),
+        )
+
+
+def compiled(overlay, element_paths):
+    match = overlay.selector.match
+    for paths in element_paths:
+        match(paths)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--elements', type=int, default=100_000)
+    parser.add_argument('--selectors', type=int, default=30)
+    parser.add_argument('--domains', type=int, default=40)
+    parser.add_argument('--depth', type=int, default=4)
+    opts = parser.parse_args()
+
+    rng = random.Random(42)
+    element_paths = build_paths(opts.elements, opts.domains, opts.depth, rng)
+    overlay = Graph(
+        select=build_selectors(opts.selectors, opts.domains, opts.depth, rng),
+        highlight=build_selectors(
+            opts.selectors, opts.domains, opts.depth, rng
+        ),
+        shade=build_selectors(opts.selectors, opts.domains, opts.depth, rng),
+    )
+    print(
+        f'{opts.elements} elements, '
+        f'{opts.selectors} selectors per selection'
+    )
+    for label, func in [
+        ('string prefix', string_prefix),
+        ('compiled trie', compiled),
+    ]:
+        start = time.perf_counter()
+        func(overlay, element_paths)
+        print(f'{label:<16} {time.perf_counter() - start:8.3f}s')
+
+
+if __name__ == '__main__':
+    main()
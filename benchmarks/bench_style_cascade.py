@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Measure the per-node cost of GraphContext.add_node on a large synthetic
+model where many nodes share a small number of class combinations.
+
+The uncached cascade is reproduced here so both strategies can be
+compared against the same input.
+"""
+from argparse import ArgumentParser
+import random
+import time
+
+import graphviz
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.context import valid_attrs
+
+
+def build_stylesheet(class_count):
+    colors = ['lightgrey', 'lightblue', 'salmon', 'gold', 'white']
+    shapes = ['box', 'ellipse', 'diamond', 'circle']
+    return {
+        f'class{i}': {
+            'color': colors[i % len(colors)],
+            'shape': shapes[i % len(shapes)],
+            'style': ['filled'] if i % 2 else ['rounded'],
+        }
+        for i in range(class_count)
+    }
+
+
+def build_nodes(node_count, class_count, combinations):
+    rng = random.Random(42)
+    names = [f'class{i}' for i in range(class_count)]
+    combos = [
+        rng.sample(names, rng.randint(1, 3))
+        for _ in range(combinations)
+    ]
+    return [
+        (f'n{i}', {'classes': combos[i % combinations], 'label': str(i)})
+        for i in range(node_count)
+    ]
+
+
+def uncached_build_attributes(ctx, element_type, attributes, classes=None):
+    attrs = ctx.styles.get(element_type, {}).copy()
+
+    classes = classes or []
+    attributes = attributes or {}
+
+    for c in classes + attributes.get('classes', []):
+        attrs.update(ctx.styles.get(c, {}))
+
+    if attributes:
+        attrs.update(attributes)
+
+    styles = list(attrs.get('style', []))
+    if not attributes.get('visible', True):
+        styles.append('invis')
+    if styles:
+        attrs['style'] = ','.join(styles)
+
+    return {
+        attr: value
+        for attr, value in attrs.items()
+        if attr in valid_attrs
+    }
+
+
+def measure(label, func, nodes):
+    start = time.perf_counter()
+    for name, attributes in nodes:
+        func(name, attributes)
+    elapsed = time.perf_counter() - start
+    per_node = elapsed / len(nodes) * 1e6
+    print(f'{label:<28} {elapsed:8.3f}s {per_node:8.2f}us/node')
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--nodes', type=int, default=100_000)
+    parser.add_argument('--classes', type=int, default=12)
+    parser.add_argument('--combinations', type=int, default=30)
+    opts = parser.parse_args()
+
+    stylesheet = build_stylesheet(opts.classes)
+    nodes = build_nodes(opts.nodes, opts.classes, opts.combinations)
+
+    ctx = GraphContext(stylesheet)
+    measure(
+        'uncached cascade',
+        lambda name, attrs: uncached_build_attributes(ctx, 'node', attrs),
+        nodes,
+    )
+
+    ctx = GraphContext(stylesheet)
+    measure(
+        'compiled cascade',
+        lambda name, attrs: ctx._build_attributes('node', attrs),
+        nodes,
+    )
+
+    ctx = GraphContext(stylesheet)
+    ctx.init_graph('G', graphviz.Graph, {})
+    measure('add_node (graphviz)', ctx.add_node, nodes)
+
+    print(f'{len(nodes)} nodes, {opts.combinations} class combinations')
+
+
+if __name__ == '__main__':
+    main()
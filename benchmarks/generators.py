@@ -0,0 +1,139 @@
+"""
+Synthetic models for benchmarking the overlays.
+
+Every generator returns a model of about ``elements`` elements, nodes
+and edges or entities, attributes and relationships, and the same model
+for the same arguments.
+"""
+import random
+
+
+def flat(elements, seed=42):
+    """Nodes and twice as many edges in a single graph, a few styled."""
+    rng = random.Random(seed)
+    node_count = max(1, elements // 3)
+    model = {'nodes': {}, 'edges': []}
+    for i in range(node_count):
+        node = {}
+        if i % 4 == 0:
+            node['classes'] = ['service']
+        if i % 7 == 0:
+            node['paths'] = [f'area{i % 10}']
+        model['nodes'][f'n{i}'] = node
+    for i in range(elements - node_count):
+        edge = {
+            'from': f'n{rng.randrange(node_count)}',
+            'to': f'n{rng.randrange(node_count)}',
+        }
+        if i % 5 == 0:
+            edge['classes'] = ['call']
+        model['edges'].append(edge)
+    model['styles'] = {
+        'service': {'shape': 'box', 'style': ['rounded']},
+        'call': {'color': 'grey'},
+    }
+    return model
+
+
+def nested(elements, branching=4, per_subgraph=8, seed=42):
+    """A tree of clusters, each with a few nodes and edges between them."""
+    rng = random.Random(seed)
+    model = {'subgraphs': {}}
+    levels = [model]
+    count = 0
+    index = 0
+    while count < elements:
+        parent = levels[index // branching]
+        subgraph = {'cluster': True, 'nodes': {}, 'edges': []}
+        parent.setdefault('subgraphs', {})[f's{index}'] = subgraph
+        levels.append(subgraph)
+        names = [f's{index}_n{i}' for i in range(per_subgraph // 2)]
+        for name in names:
+            subgraph['nodes'][name] = {}
+        for _ in range(per_subgraph - len(names)):
+            subgraph['edges'].append({
+                'from': rng.choice(names),
+                'to': rng.choice(names),
+            })
+        count += per_subgraph
+        index += 1
+    return model
+
+
+def ranked(elements, ranks=10, subgraphs=10):
+    """Nodes in rank groups across subgraphs, like examples/layer.json."""
+    model = {
+        'nodes': {},
+        'subgraphs': {
+            f'group{i}': {'nodes': {}} for i in range(subgraphs)
+        },
+        'ranks': {f'r{i}': 'same' for i in range(ranks)},
+    }
+    levels = [model] + list(model['subgraphs'].values())
+    for i in range(elements):
+        levels[i % len(levels)]['nodes'][f'n{i}'] = {
+            'rank': f'r{i % ranks}',
+        }
+    return model
+
+
+def html_labels(elements, layouts=8, seed=42):
+    """Record nodes with HTML table labels, like examples/html-record.json,
+    and an edge per node."""
+    rng = random.Random(seed)
+    node_count = max(1, elements // 2)
+    model = {'nodes': {}, 'edges': []}
+    for i in range(node_count):
+        columns = 2 + i % layouts
+        model['nodes'][f'n{i}'] = {
+            'label': {
+                'border': '1',
+                'trs': [
+                    [{'colspan': str(columns), 'value': f'Record {i}'}],
+                    [
+                        {'port': f'p{c}', 'value': f'field{c}'}
+                        for c in range(columns)
+                    ],
+                ],
+            },
+        }
+    for _ in range(elements - node_count):
+        model['edges'].append({
+            'from': f'n{rng.randrange(node_count)}',
+            'to': f'n{rng.randrange(node_count)}',
+        })
+    return model
+
+
+def entity_relationship(elements, attributes=4, domains=10, seed=42):
+    """Entities with attributes and relationships between them, spread
+    over domains, for the er overlay."""
+    rng = random.Random(seed)
+    entity_count = max(2, elements // (attributes + 2))
+    model = {
+        'domains': {f'd{i}': {'entities': {}} for i in range(domains)},
+        'relationships': [],
+    }
+    levels = list(model['domains'].values())
+    for i in range(entity_count):
+        levels[i % domains]['entities'][f'entity{i}'] = {
+            'attributes': {f'attr{a}': {} for a in range(attributes)},
+        }
+    for i in range(entity_count):
+        other = rng.randrange(entity_count)
+        if other == i:
+            continue
+        model['relationships'].append({
+            'from': {'name': f'entity{i}', 'cardinality': 'n'},
+            'to': {'name': f'entity{other}', 'cardinality': '1'},
+        })
+    return model
+
+
+generators = {
+    'flat': flat,
+    'nested': nested,
+    'ranked': ranked,
+    'html_labels': html_labels,
+    'er': entity_relationship,
+}
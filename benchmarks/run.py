@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Run the benchmark suite, drawing generated models with every overlay
+they apply to and comparing the results with a baseline.
+
+The graphviz_overlay package must be importable, installed with
+``poetry install`` or from a checkout with ``PYTHONPATH=.``.
+
+Each case is timed as the best of ``--repeat`` draws and its peak
+memory measured with tracemalloc in a separate draw. Timings only
+compare on the same machine, so the baseline is saved locally, by
+default to benchmarks/baseline.json which is not committed, and later
+runs are compared with it::
+
+    PYTHONPATH=. python benchmarks/run.py --sizes 1000,10000 --save
+    PYTHONPATH=. python benchmarks/run.py --sizes 1000,10000 \\
+        --tolerance 0.5
+
+Exits with status 1 when a case is slower or peaks higher than its
+baseline by more than the ``--tolerance`` given, a fraction of the
+baseline, so CI can track regressions. Cases without a baseline are
+not compared.
+"""
+from argparse import ArgumentParser
+import gc
+import json
+import os.path
+import sys
+import time
+import tracemalloc
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.overlays import Digraph, EntityRelationship, Graph
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from generators import generators  # noqa: E402
+
+here = os.path.dirname(os.path.abspath(__file__))
+
+# Overlays drawing the models of each generator.
+cases = {
+    'flat': [Graph, Digraph],
+    'nested': [Graph, Digraph],
+    'ranked': [Graph, Digraph],
+    'html_labels': [Graph, Digraph],
+    'er': [EntityRelationship],
+}
+
+
+def draw(overlay_class, model):
+    return overlay_class(GraphContext()).draw('G', model)
+
+
+def measure(overlay_class, model, repeat):
+    """:returns: A dict of the seconds and peak bytes of a draw"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        draw(overlay_class, model)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    gc.collect()
+    tracemalloc.start()
+    draw(overlay_class, model)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def compare(results, baseline, tolerance):
+    """:returns: The regressions of the results, as printable lines"""
+    regressions = []
+    for key, result in results.items():
+        expected = baseline.get(key)
+        if expected is None:
+            continue
+        for metric in ('seconds', 'peak_bytes'):
+            ratio = result[metric] / expected[metric]
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f'{key} {metric} {result[metric]:.4g} is {ratio:.2f}x '
+                    f'the baseline {expected[metric]:.4g}'
+                )
+    return regressions
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', default='1000,10000,100000',
+        help='Comma separated element counts, up to 1000000',
+    )
+    parser.add_argument(
+        '--cases', default=','.join(cases),
+        help='Comma separated generators to run',
+    )
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument(
+        '--baseline', default=os.path.join(here, 'baseline.json'),
+    )
+    parser.add_argument(
+        '--save', action='store_true',
+        help='Store the results in the baseline instead of comparing',
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=None,
+        help=(
+            'Fraction of the baseline a case may exceed it by, required '
+            'to compare with the baseline'
+        ),
+    )
+    parser.add_argument(
+        '--output', default=None,
+        help='Also write the results to this file as json',
+    )
+    opts = parser.parse_args()
+    if not opts.save and opts.tolerance is None:
+        parser.error('--tolerance is required to compare with the baseline')
+
+    sizes = [int(size) for size in opts.sizes.split(',')]
+    results = {}
+    for case in opts.cases.split(','):
+        for size in sizes:
+            model = generators[case](size)
+            for overlay_class in cases[case]:
+                key = f'{case}/{overlay_class.name}/{size}'
+                results[key] = measure(overlay_class, model, opts.repeat)
+                print(
+                    f'{key:<28} {results[key]["seconds"]:9.4f}s '
+                    f'{results[key]["peak_bytes"] / 2 ** 20:9.1f} MiB',
+                    flush=True,
+                )
+
+    if opts.output:
+        with open(opts.output, mode='w') as f:
+            json.dump(results, f, indent=2)
+
+    baseline = {}
+    if os.path.exists(opts.baseline):
+        with open(opts.baseline) as f:
+            baseline = json.load(f)
+    elif not opts.save:
+        print(f'No baseline {opts.baseline}, save one with --save')
+
+    if opts.save:
+        baseline.update(results)
+        with open(opts.baseline, mode='w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        return 0
+
+    regressions = compare(results, baseline, opts.tolerance)
+    for regression in regressions:
+        print(f'REGRESSION {regression}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Load test a running ``graphviz-overlay serve`` process and report the
+latency percentiles of its responses.
+
+    graphviz-overlay serve --socket /tmp/overlay.sock -j 4 &
+    python benchmarks/serve_load.py --socket /tmp/overlay.sock \
+        --model examples/simple.json --requests 2000 --concurrency 16
+"""
+from argparse import ArgumentParser, FileType
+import asyncio
+import json
+import time
+
+
+async def unix_client(path, payloads, latencies):
+    reader, writer = await asyncio.open_unix_connection(path, limit=1 << 26)
+    for payload in payloads:
+        start = time.perf_counter()
+        writer.write(payload + b'\n')
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - start)
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+    writer.close()
+
+
+async def http_client(host, port, payloads, latencies):
+    for payload in payloads:
+        start = time.perf_counter()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            f'POST / HTTP/1.1\r\nHost: {host}\r\n'
+            f'Content-Type: application/json\r\n'
+            f'Content-Length: {len(payload)}\r\n\r\n'.encode() + payload
+        )
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        latencies.append(time.perf_counter() - start)
+        if not response.startswith(b'HTTP/1.1 200'):
+            raise RuntimeError(response.decode(errors='replace'))
+
+
+def percentile(values, fraction):
+    index = min(len(values) - 1, int(fraction * len(values)))
+    return values[index]
+
+
+async def run(opts, payload):
+    per_client = [
+        [payload] * (opts.requests // opts.concurrency
+                     + (i < opts.requests % opts.concurrency))
+        for i in range(opts.concurrency)
+    ]
+    latencies = []
+    if opts.socket:
+        clients = [
+            unix_client(opts.socket, payloads, latencies)
+            for payloads in per_client
+        ]
+    else:
+        clients = [
+            http_client(opts.host, opts.port, payloads, latencies)
+            for payloads in per_client
+        ]
+
+    start = time.perf_counter()
+    await asyncio.gather(*clients)
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    listen = parser.add_mutually_exclusive_group(required=True)
+    listen.add_argument('--socket')
+    listen.add_argument('--port', type=int)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--model', type=FileType(mode='r'), required=True)
+    parser.add_argument('--stylesheet', default=None)
+    parser.add_argument('--overlay', default='digraph')
+    parser.add_argument('--format', default=None)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    opts = parser.parse_args()
+
+    request = {'model': json.load(opts.model), 'overlay': opts.overlay}
+    if opts.stylesheet:
+        request['stylesheet'] = opts.stylesheet
+    if opts.format:
+        request['format'] = opts.format
+    payload = json.dumps(request).encode()
+
+    elapsed, latencies = asyncio.run(run(opts, payload))
+    print(f'{len(latencies)} requests in {elapsed:.2f}s '
+          f'({len(latencies) / elapsed:.0f}/s), '
+          f'concurrency {opts.concurrency}')
+    for label, fraction in [('p50', 0.5), ('p90', 0.9), ('p99', 0.99)]:
+        print(f'{label} {percentile(latencies, fraction) * 1000:8.2f}ms')
+    print(f'max {latencies[-1] * 1000:8.2f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+Registry of the Graphviz attributes understood by the overlays.
+
+The table follows https://graphviz.org/doc/info/attrs.html where each
+attribute lists the elements it is used by:
+
+    G: root graph, S: subgraph, C: cluster subgraph, N: node, E: edge
+"""
+attribute_table = {
+    '_background': 'G',
+    'area': 'NC',
+    'arrowhead': 'E',
+    'arrowsize': 'E',
+    'arrowtail': 'E',
+    'bb': 'G',
+    'bgcolor': 'GC',
+    'center': 'G',
+    'charset': 'G',
+    'class': 'GCNE',
+    'clusterrank': 'G',
+    'color': 'ENC',
+    'colorscheme': 'ENCG',
+    'comment': 'ENG',
+    'compound': 'G',
+    'concentrate': 'G',
+    'constraint': 'E',
+    'Damping': 'G',
+    'decorate': 'E',
+    'defaultdist': 'G',
+    'dim': 'G',
+    'dimen': 'G',
+    'dir': 'E',
+    'diredgeconstraints': 'G',
+    'distortion': 'N',
+    'dpi': 'G',
+    'edgehref': 'E',
+    'edgetarget': 'E',
+    'edgetooltip': 'E',
+    'edgeURL': 'E',
+    'epsilon': 'G',
+    'esep': 'G',
+    'fillcolor': 'NEC',
+    'fixedsize': 'N',
+    'fontcolor': 'ENGC',
+    'fontname': 'ENGC',
+    'fontnames': 'G',
+    'fontpath': 'G',
+    'fontsize': 'ENGC',
+    'forcelabels': 'G',
+    'gradientangle': 'NCG',
+    'group': 'N',
+    'head_lp': 'E',
+    'headclip': 'E',
+    'headhref': 'E',
+    'headlabel': 'E',
+    'headport': 'E',
+    'headtarget': 'E',
+    'headtooltip': 'E',
+    'headURL': 'E',
+    'height': 'N',
+    'href': 'GCNE',
+    'id': 'GCNE',
+    'image': 'N',
+    'imagepath': 'G',
+    'imagepos': 'N',
+    'imagescale': 'N',
+    'inputscale': 'G',
+    'K': 'GC',
+    'label': 'ENGC',
+    'label_scheme': 'G',
+    'labelangle': 'E',
+    'labeldistance': 'E',
+    'labelfloat': 'E',
+    'labelfontcolor': 'E',
+    'labelfontname': 'E',
+    'labelfontsize': 'E',
+    'labelhref': 'E',
+    'labeljust': 'GC',
+    'labelloc': 'NGC',
+    'labeltarget': 'E',
+    'labeltooltip': 'E',
+    'labelURL': 'E',
+    'landscape': 'G',
+    'layer': 'ENC',
+    'layerlistsep': 'G',
+    'layers': 'G',
+    'layerselect': 'G',
+    'layersep': 'G',
+    'layout': 'G',
+    'len': 'E',
+    'levels': 'G',
+    'levelsgap': 'G',
+    'lhead': 'E',
+    'lheight': 'GC',
+    'lp': 'EGC',
+    'ltail': 'E',
+    'lwidth': 'GC',
+    'margin': 'NCG',
+    'maxiter': 'G',
+    'mclimit': 'G',
+    'mindist': 'G',
+    'minlen': 'E',
+    'mode': 'G',
+    'model': 'G',
+    'mosek': 'G',
+    'newrank': 'G',
+    'nodesep': 'G',
+    'nojustify': 'GCNE',
+    'normalize': 'G',
+    'notranslate': 'G',
+    'nslimit': 'G',
+    'nslimit1': 'G',
+    'ordering': 'GN',
+    'orientation': 'NG',
+    'outputorder': 'G',
+    'overlap': 'G',
+    'overlap_scaling': 'G',
+    'overlap_shrink': 'G',
+    'pack': 'G',
+    'packmode': 'G',
+    'pad': 'G',
+    'page': 'G',
+    'pagedir': 'G',
+    'pencolor': 'C',
+    'penwidth': 'CNE',
+    'peripheries': 'NC',
+    'pin': 'N',
+    'pos': 'EN',
+    'quadtree': 'G',
+    'quantum': 'G',
+    # 'rank': 'S',  # We intepret this one ourselves
+    'rankdir': 'G',
+    'ranksep': 'G',
+    'ratio': 'G',
+    'rects': 'N',
+    'regular': 'N',
+    'remincross': 'G',
+    'repulsiveforce': 'G',
+    'resolution': 'G',
+    'root': 'GN',
+    'rotate': 'G',
+    'rotation': 'G',
+    'samehead': 'E',
+    'sametail': 'E',
+    'samplepoints': 'N',
+    'scale': 'G',
+    'searchsize': 'G',
+    'sep': 'G',
+    'shape': 'N',
+    'shapefile': 'N',
+    'showboxes': 'ENG',
+    'sides': 'N',
+    'size': 'G',
+    'skew': 'N',
+    'smoothing': 'G',
+    'sortv': 'GCN',
+    'splines': 'G',
+    'start': 'G',
+    'style': 'ENCG',
+    'stylesheet': 'G',
+    'tail_lp': 'E',
+    'tailclip': 'E',
+    'tailhref': 'E',
+    'taillabel': 'E',
+    'tailport': 'E',
+    'tailtarget': 'E',
+    'tailtooltip': 'E',
+    'tailURL': 'E',
+    'target': 'ENGC',
+    'tooltip': 'NECG',
+    'truecolor': 'G',
+    'URL': 'ENGC',
+    'vertices': 'N',
+    'viewport': 'G',
+    'voro_margin': 'G',
+    'weight': 'E',
+    'width': 'N',
+    'xdotversion': 'G',
+    'xlabel': 'EN',
+    'xlp': 'NE',
+    'z': 'N',
+}
+
+
+def used_by(*elements: str) -> frozenset:
+    """Attributes used by any of the given element letters."""
+    return frozenset(
+        attr
+        for attr, elems in attribute_table.items()
+        if any(e in elems for e in elements)
+    )
+
+
+valid_attrs = frozenset(attribute_table)
+
+# Attribute statements of the root graph and plain subgraphs also set
+# the defaults inherited by the clusters within them.
+element_attrs = {
+    'graph': used_by('G', 'S', 'C'),
+    'cluster': used_by('C'),
+    'node': used_by('N'),
+    'edge': used_by('E'),
+}
+
+# Keys the overlays interpret from the model, never reported as invalid.
+model_attrs = frozenset([
+    'attributes',
+    'cardinality',
+    'classes',
+    'cluster',
+    'domains',
+    'edges',
+    'entities',
+    'from',
+    'name',
+    'nodes',
+    'paths',
+    'prefix',
+    'rank',
+    'ranks',
+    'relationships',
+    'styles',
+    'subgraphs',
+    'to',
+    'visible',
+])
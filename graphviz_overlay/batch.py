@@ -0,0 +1,190 @@
+"""
+Render several views of the same model.
+
+A views file lists the views to render, each with the overlay to use,
+the file to write the dot source to and the overlay arguments::
+
+    {
+        "views": [
+            {
+                "output": "domain.dot",
+                "overlay": "digraph",
+                "name": "G",
+                "select": "domain",
+                "remove_deselected": true
+            }
+        ]
+    }
+"""
+from concurrent.futures import ProcessPoolExecutor
+import logging
+import os.path
+import time
+
+from graphviz_overlay import GraphContext
+
+log = logging.getLogger(__name__)
+
+# Model and stylesheet of the batch being rendered by a worker process.
+_worker_state = {}
+
+
+def render_view(model: dict, stylesheet: dict, overlay_class, view: dict,
+                strict: bool = False, strict_endpoints: bool = False) -> str:
+    """Produce the dot source of a single view of a model."""
+    ctx = GraphContext(
+        stylesheet, strict=strict, strict_endpoints=strict_endpoints,
+    )
+    overlay_args = {
+        arg: view[arg]
+        for arg in overlay_class.arguments()
+        if arg in view
+    }
+    overlay = overlay_class(ctx, **overlay_args)
+    return overlay.draw(view.get('name', 'G'), model)
+
+
+def compiled_model(model, overlay_class, compiled: dict):
+    """The model compiled for an overlay, once for all overlays compiling
+    models the same way."""
+    compile_model = overlay_class.compile_model
+    if compile_model not in compiled:
+        compiled[compile_model] = compile_model(model)
+    return compiled[compile_model]
+
+
+def write_view(model, stylesheet, overlay_class, view, outdir, strict=False,
+               strict_endpoints=False):
+    """
+    Render a view and write it to its output file.
+
+    :returns: A tuple (outfile, source, seconds) with the time spent
+        drawing the view.
+    """
+    outfile = os.path.join(outdir, view['output'])
+    start = time.perf_counter()
+    source = render_view(
+        model, stylesheet, overlay_class, view, strict, strict_endpoints,
+    )
+    seconds = time.perf_counter() - start
+    with open(outfile, mode='w') as f:
+        f.write(source)
+    log.info('Wrote %s', outfile)
+    return outfile, source, seconds
+
+
+def _init_worker(model, stylesheet, strict, strict_endpoints):
+    _worker_state.update(
+        model=model, stylesheet=stylesheet, strict=strict,
+        strict_endpoints=strict_endpoints, compiled={},
+    )
+
+
+def _write_worker_view(overlay_class, view, outdir):
+    return write_view(
+        compiled_model(
+            _worker_state['model'],
+            overlay_class,
+            _worker_state['compiled'],
+        ),
+        _worker_state['stylesheet'],
+        overlay_class,
+        view,
+        outdir,
+        _worker_state['strict'],
+        _worker_state['strict_endpoints'],
+    )
+
+
+def render_views(model: dict, stylesheet: dict, views: list, overlays: dict,
+                 outdir: str = '.', jobs: int = 1, strict: bool = False,
+                 render_pool=None, timings: list = None,
+                 strict_endpoints: bool = False) -> list:
+    """
+    Render each view of the model to its output file.
+
+    The model is only parsed once by the caller and reused by every
+    view, and compiled once for the overlays compiling it. With more
+    than one job the views are rendered by a pool of processes which
+    each receive the model once.
+
+    :param dict overlays: Overlay classes by name.
+    :param render_pool: A RenderPool also laying out the views, each is
+        written next to its dot file with the extension of the format.
+        Views are laid out while the following views are drawn.
+    :param list timings: Appended a dict per view with the seconds spent
+        drawing it and laying it out.
+    :param strict_endpoints: Fail on edge endpoints naming no node.
+    :returns: The files written, in the order of the views.
+    """
+    tasks = []
+    for view in views:
+        if 'output' not in view:
+            raise ValueError(f'view has no output file: {view!r}')
+        overlay_name = view.get('overlay', 'graph')
+        if overlay_name not in overlays:
+            raise ValueError(f"unknown overlay '{overlay_name}'")
+        tasks.append((overlays[overlay_name], view))
+
+    os.makedirs(outdir, exist_ok=True)
+
+    # Merge the stylesheet once instead of for every view.
+    stylesheet = GraphContext(stylesheet).styles
+
+    if jobs <= 1:
+        compiled = {}
+        written = (
+            write_view(
+                compiled_model(model, overlay_class, compiled),
+                stylesheet, overlay_class, view, outdir, strict,
+                strict_endpoints,
+            )
+            for overlay_class, view in tasks
+        )
+        return _finish_views(written, render_pool, timings)
+
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(model, stylesheet, strict, strict_endpoints),
+    ) as executor:
+        futures = [
+            executor.submit(_write_worker_view, overlay_class, view, outdir)
+            for overlay_class, view in tasks
+        ]
+        return _finish_views(
+            (future.result() for future in futures),
+            render_pool,
+            timings,
+        )
+
+
+def _finish_views(written, render_pool, timings):
+    """Lay out the written views and collect their timings."""
+    outfiles = []
+    pending = []
+    for outfile, source, seconds in written:
+        outfiles.append(outfile)
+        rendered = future = None
+        if render_pool is not None:
+            rendered = f'{os.path.splitext(outfile)[0]}.{render_pool.format}'
+            future = render_pool.submit(source, rendered)
+        pending.append((outfile, seconds, rendered, future))
+
+    for outfile, seconds, rendered, future in pending:
+        layout_seconds = future.result()[0] if future else None
+        if timings is not None:
+            timings.append({
+                'output': outfile,
+                'overlay_seconds': seconds,
+                'rendered': rendered,
+                'layout_seconds': layout_seconds,
+            })
+    return outfiles
+
+
+def load_views(views: dict) -> list:
+    """Views from the contents of a views file, a list or ``{"views": []}``"""
+    if isinstance(views, dict):
+        return views.get('views', [])
+    return views
@@ -0,0 +1,242 @@
+"""
+On-disk cache of generated dot source and rendered graphs.
+
+Entries are addressed by a hash of everything the output depends on:
+the normalised model and stylesheet, the overlay, its arguments and the
+render options. Unchanged inputs are therefore found again without
+drawing, however the files are named or formatted.
+
+Normalising a model takes as long as parsing it, so the key is also
+kept under a hash of the input files as they are, see source_key. Input
+files found again by their bytes are neither parsed nor normalised.
+"""
+import hashlib
+from importlib import metadata
+import json
+import logging
+import os
+import tempfile
+
+from graphviz_overlay.jsonstream import LazyArray
+
+log = logging.getLogger(__name__)
+
+# Bump when the output for the same inputs changes.
+CACHE_FORMAT = 2
+
+# Collections of a model hashed member by member.
+_member_keys = frozenset(['nodes', 'subgraphs'])
+
+try:
+    package_version = metadata.version('graphviz-overlay')
+except metadata.PackageNotFoundError:
+    package_version = 'unknown'
+
+
+def _normalised(value) -> bytes:
+    return json.dumps(
+        value,
+        sort_keys=True,
+        separators=(',', ':'),
+        ensure_ascii=False,
+    ).encode()
+
+
+def _digest_of(value) -> bytes:
+    digest = hashlib.sha256()
+    try:
+        digest.update(_normalised(value))
+    except RecursionError:
+        for part in _normalised_parts(value):
+            digest.update(part)
+    return digest.digest()
+
+
+def _update_with_model(digest, model):
+    if getattr(model, 'model_file', None) is not None:
+        # A compiled model is hashed by the digest of its content kept
+        # in its header, without reading the file.
+        digest.update(model.model_file.digest)
+        return
+
+    # The members of the collections are hashed one at a time, so a
+    # streamed model is hashed like the same model loaded at once
+    # without holding more than one member in memory.
+    for key in sorted(model):
+        value = model[key]
+        digest.update(_normalised(key))
+        if key in _member_keys and hasattr(value, 'items'):
+            digest.update(b'{')
+            for name, member in sorted(
+                (name, _digest_of(member)) for name, member in value.items()
+            ):
+                digest.update(_normalised(name))
+                digest.update(member)
+            digest.update(b'}')
+        elif key == 'edges' and isinstance(value, (list, LazyArray)):
+            digest.update(b'[')
+            for edge in value:
+                digest.update(_digest_of(edge))
+            digest.update(b']')
+        else:
+            digest.update(_digest_of(value))
+
+
+def _file_digest(file) -> bytes:
+    """The digest of the bytes of a seekable file, read from its start
+    and left at its start."""
+    binary = getattr(file, 'buffer', file)
+    file.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: binary.read(1 << 16), b''):
+        digest.update(chunk)
+    file.seek(0)
+    return digest.digest()
+
+
+def _normalised_parts(value):
+    """The bytes of _normalised(value) in parts, following the nesting
+    of the value with a stack rather than recursion."""
+    # Values left to encode, and the separators between them as bytes.
+    pending = [value]
+    while pending:
+        value = pending.pop()
+        if isinstance(value, bytes):
+            yield value
+        elif isinstance(value, dict):
+            yield b'{'
+            pending.append(b'}')
+            members = sorted(value.items())
+            for index in range(len(members) - 1, -1, -1):
+                key, member = members[index]
+                pending.append(member)
+                pending.append(
+                    (b',' if index else b'') + _normalised(key) + b':'
+                )
+        elif isinstance(value, (list, tuple)):
+            yield b'['
+            pending.append(b']')
+            for index in range(len(value) - 1, -1, -1):
+                pending.append(value[index])
+                if index:
+                    pending.append(b',')
+        else:
+            yield _normalised(value)
+
+
+class RenderCache(object):
+    """
+    Content-addressed cache in a directory, evicting the least recently
+    used entries when it grows beyond ``max_size`` bytes.
+    """
+
+    def __init__(self, directory: str, max_size: int = None):
+        self.directory = directory
+        self.max_size = max_size
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(model, stylesheet: dict, overlay_name: str, arguments: dict,
+            **options) -> str:
+        """
+        The key of the output of drawing a model.
+
+        :param dict arguments: The overlay argument values.
+        :param options: Any other option affecting the output, like the
+            graph name, strict mode and the render format.
+        """
+        digest = hashlib.sha256()
+        digest.update(_normalised([
+            CACHE_FORMAT,
+            package_version,
+            overlay_name,
+            arguments,
+            options,
+            stylesheet,
+        ]))
+        _update_with_model(digest, model)
+        return digest.hexdigest()
+
+    @staticmethod
+    def source_key(files, overlay_name: str, arguments: dict,
+                   **options) -> str:
+        """
+        The key of the output of drawing the input files as they are.
+
+        It is found without parsing the files, the key of the drawing is
+        cached under it, see key.
+
+        :param files: The seekable model and stylesheet files, None for
+            a file not given.
+        """
+        digest = hashlib.sha256()
+        digest.update(_normalised([
+            'source',
+            CACHE_FORMAT,
+            package_version,
+            overlay_name,
+            arguments,
+            options,
+        ]))
+        for file in files:
+            digest.update(b'\0' * 32 if file is None else _file_digest(file))
+        return digest.hexdigest()
+
+    def path(self, key: str, suffix: str) -> str:
+        return os.path.join(self.directory, key[:2], f'{key}.{suffix}')
+
+    def get(self, key: str, suffix: str):
+        """:returns: The cached bytes or None."""
+        path = self.path(key, suffix)
+        try:
+            with open(path, mode='rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            log.debug('Cache miss %s.%s', key, suffix)
+            return None
+        # The modification time orders entries by their last use.
+        os.utime(path)
+        log.debug('Cache hit %s.%s', key, suffix)
+        return data
+
+    def put(self, key: str, suffix: str, data: bytes):
+        path = self.path(key, suffix)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Concurrent runs only ever see complete entries.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.')
+        try:
+            with os.fdopen(fd, mode='wb') as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        if self.max_size is not None:
+            self.evict(self.max_size)
+
+    def entries(self):
+        """:returns: A list of (mtime, size, path) of the cached files."""
+        entries = []
+        for subdir in os.scandir(self.directory):
+            if not subdir.is_dir():
+                continue
+            for entry in os.scandir(subdir.path):
+                if entry.name.startswith('.') or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def evict(self, max_size: int):
+        """Remove the least recently used entries above max_size bytes."""
+        entries = sorted(self.entries())
+        size = sum(entry[1] for entry in entries)
+        for _, entry_size, path in entries:
+            if size <= max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+            log.debug('Evicted %s', path)
@@ -1,181 +1,16 @@
-import copy
+from bisect import bisect_left
+import functools
 import logging
+from time import perf_counter
+
+from graphviz_overlay.attributes import element_attrs, model_attrs, valid_attrs
+from graphviz_overlay.emitter import emitter_class
+from graphviz_overlay.labels import format_html_label
+from graphviz_overlay.quoting import attr_list, quote_edge
+from graphviz_overlay.styles import Stylesheet
+from graphviz_overlay.symbols import node_id
 
 log = logging.getLogger(__name__)
-valid_attrs = [
-    '_background',
-    'area',
-    'arrowhead',
-    'arrowsize',
-    'arrowtail',
-    'bb',
-    'bgcolor',
-    'center',
-    'charset',
-    'class',
-    'clusterrank',
-    'color',
-    'colorscheme',
-    'comment',
-    'compound',
-    'concentrate',
-    'constraint',
-    'Damping',
-    'decorate',
-    'defaultdist',
-    'dim',
-    'dimen',
-    'dir',
-    'diredgeconstraints',
-    'distortion',
-    'dpi',
-    'edgehref',
-    'edgetarget',
-    'edgetooltip',
-    'edgeURL',
-    'epsilon',
-    'esep',
-    'fillcolor',
-    'fixedsize',
-    'fontcolor',
-    'fontname',
-    'fontnames',
-    'fontpath',
-    'fontsize',
-    'forcelabels',
-    'gradientangle',
-    'group',
-    'head_lp',
-    'headclip',
-    'headhref',
-    'headlabel',
-    'headport',
-    'headtarget',
-    'headtooltip',
-    'headURL',
-    'height',
-    'href',
-    'id',
-    'image',
-    'imagepath',
-    'imagepos',
-    'imagescale',
-    'inputscale',
-    'K',
-    'label',
-    'label_scheme',
-    'labelangle',
-    'labeldistance',
-    'labelfloat',
-    'labelfontcolor',
-    'labelfontname',
-    'labelfontsize',
-    'labelhref',
-    'labeljust',
-    'labelloc',
-    'labeltarget',
-    'labeltooltip',
-    'labelURL',
-    'landscape',
-    'layer',
-    'layerlistsep',
-    'layers',
-    'layerselect',
-    'layersep',
-    'layout',
-    'len',
-    'levels',
-    'levelsgap',
-    'lhead',
-    'lheight',
-    'lp',
-    'ltail',
-    'lwidth',
-    'margin',
-    'maxiter',
-    'mclimit',
-    'mindist',
-    'minlen',
-    'mode',
-    'model',
-    'mosek',
-    'newrank',
-    'nodesep',
-    'nojustify',
-    'normalize',
-    'notranslate',
-    'nslimit',
-    'nslimit1',
-    'ordering',
-    'orientation',
-    'outputorder',
-    'overlap',
-    'overlap_scaling',
-    'overlap_shrink',
-    'pack',
-    'packmode',
-    'pad',
-    'page',
-    'pagedir',
-    'pencolor',
-    'penwidth',
-    'peripheries',
-    'pin',
-    'pos',
-    'quadtree',
-    'quantum',
-    # 'rank',  # We intepret this one ourselves
-    'rankdir',
-    'ranksep',
-    'ratio',
-    'rects',
-    'regular',
-    'remincross',
-    'repulsiveforce',
-    'resolution',
-    'root',
-    'rotate',
-    'rotation',
-    'samehead',
-    'sametail',
-    'samplepoints',
-    'scale',
-    'searchsize',
-    'sep',
-    'shape',
-    'shapefile',
-    'showboxes',
-    'sides',
-    'size',
-    'skew',
-    'smoothing',
-    'sortv',
-    'splines',
-    'start',
-    'style',
-    'stylesheet',
-    'tail_lp',
-    'tailclip',
-    'tailhref',
-    'taillabel',
-    'tailport',
-    'tailtarget',
-    'tailtooltip',
-    'tailURL',
-    'target',
-    'tooltip',
-    'truecolor',
-    'URL',
-    'vertices',
-    'viewport',
-    'voro_margin',
-    'weight',
-    'width',
-    'xdotversion',
-    'xlabel',
-    'xlp',
-    'z',
-]
 
 
 class GraphContext(object):
@@ -234,28 +69,74 @@ class GraphContext(object):
         'edge': {},
     }
 
+    # Element types which are styled by another element's base style.
+    base_style_for = {
+        'cluster': 'graph',
+    }
+
     def __init__(
         self, stylesheet: dict = None, path: str = '', prefix: str = '',
-        _level: int = 0
+        strict: bool = False, sink=None, tracer=None, profiler=None,
+        strict_endpoints: bool = False, _level: int = 0, _ranks=None,
     ):
         self.graph = None
-        self.styles = copy.deepcopy(self.base_styles)
-        self.add_stylesheet(stylesheet or {})
-        self._ranks = {}
+        self.strict = strict
+        # Whether edge endpoints naming no node are an error.
+        self.strict_endpoints = strict_endpoints
+        self.sink = sink
+        self.tracer = tracer
+        self.profiler = profiler
+        # Whether to log every element, decided once per draw.
+        self._debug = False
+        self._trace_start = None
+        if isinstance(stylesheet, Stylesheet):
+            # Shared with the context it comes from, it never changes.
+            self.styles = stylesheet
+        else:
+            self.styles = Stylesheet(self.base_styles).layer(stylesheet)
+        self._ranks = RankRegistry() if _ranks is None else _ranks
+        self._rank_mark = self._ranks.mark()
         self._level = _level
         self.prefix = prefix
         self.path = path
 
-    def init_graph(self, name, graph_class, attributes):
-        styles = attributes.get('styles', {})
+    def init_graph(
+        self, name, graph_class, attributes, cluster=False, visible=True,
+        extra_classes=None,
+    ):
+        if not self._level:
+            self._debug = log.isEnabledFor(logging.DEBUG)
 
-        graph_attrs = styles.get('graph', {})
+        styles = attributes.get('styles', {})
+        # The graph, node and edge styles of a graph become its DOT
+        # defaults, any other classes it defines apply within it only.
+        self.styles = self.styles.layer({
+            class_name: attrs
+            for class_name, attrs in styles.items()
+            if class_name not in self.base_styles
+        })
+
+        graph_attrs = dict(styles.get('graph', {}))
         graph_attrs.update(attributes)
+        if cluster:
+            graph_attrs['cluster'] = True
+
+        if self._level and name.startswith('cluster'):
+            element_type = 'cluster'
+        else:
+            element_type = 'graph'
 
         graph_attrs = self._build_attributes(
-            'graph',
-            graph_attrs
+            element_type,
+            graph_attrs,
+            visible=visible,
+            extra_classes=extra_classes,
         )
+        if self.sink is not None:
+            graph_class = functools.partial(
+                emitter_class(graph_class),
+                sink=self.sink,
+            )
         self.graph = graph_class(
             name,
             graph_attr=graph_attrs,
@@ -274,65 +155,110 @@ class GraphContext(object):
         Add stylesheet to the context stylesheet.
 
         A stylesheet consists of a dictionary of class
-        definitions which are themselves dictionaries.
+        definitions which are themselves dictionaries. It is layered on
+        the current stylesheet, which is shared with other contexts and
+        left unchanged.
+        """
+        self.styles = self.styles.layer(stylesheet)
+
+    def new_context(
+        self, name, path, model, cluster=None, visible=True,
+        extra_classes=None,
+    ):
         """
-        new_stylesheet = self.styles.copy()
-        for class_name, attrs in stylesheet.items():
-            new_class = new_stylesheet.get(class_name, {})
-            for attr, value in attrs.items():
-                if attr == 'style':
-                    if 'style' not in new_class:
-                        new_class['style'] = value.copy()
-                    else:
-                        new_value = []
-                        for v in new_class['style']:
-                            if v in value:
-                                continue
-                            new_value.append(v)
-                        for v in value:
-                            new_value.append(v)
-                        new_class['style'] = new_value
-                else:
-                    new_class[attr] = value
-            new_stylesheet[class_name] = new_class
-        self.styles = new_stylesheet
-
-    def new_context(self, name, path, model):
-        stylesheet = self.styles.copy()
+        Create the context of a subgraph.
+
+        :param str name: Name of the subgraph.
+        :param str path: Path of the subgraph.
+        :param dict model: The subgraph model.
+        :param bool cluster: Whether the subgraph is a cluster, defaults
+            to the ``cluster`` attribute of the model.
+        :param bool visible: Whether the subgraph is visible.
+        :param extra_classes: Classes applied after the model's classes.
+        """
+        if cluster is None:
+            cluster = model.get('cluster', False)
+
         ctx = GraphContext(
-            stylesheet,
+            self.styles,
             path=path,
             prefix=model.get('prefix', ''),
+            strict=self.strict,
+            tracer=self.tracer,
+            profiler=self.profiler,
+            strict_endpoints=self.strict_endpoints,
             _level=self._level + 1,
+            _ranks=self._ranks,
         )
+        ctx._debug = self._debug
+        if self.tracer is not None:
+            ctx._trace_start = perf_counter()
 
-        if model.get('cluster', False):
+        if cluster:
             if not name.startswith('cluster_'):
                 name = f'cluster_{name}'
 
-        ctx.init_graph(name, self.graph.__class__, model)
+        ctx.init_graph(
+            name,
+            getattr(self.graph, 'subgraph_class', self.graph.__class__),
+            model,
+            cluster=cluster,
+            visible=visible,
+            extra_classes=extra_classes,
+        )
         return ctx
 
     def add_subgraph_from_context(self, ctx):
         self.graph.subgraph(
             ctx.graph,
         )
-        for rank, nodes in ctx.get_ranks().items():
-            self._ranks[rank] = self._ranks.get(rank, []) + nodes
+        if ctx._ranks is not self._ranks:
+            self._ranks.extend(ctx._ranks.entries(ctx._rank_mark))
+        if self.tracer is not None and ctx._trace_start is not None:
+            self.tracer.record(
+                'subgraph', ctx.graph.name, ctx._trace_start, ctx.path,
+            )
+
+    def fragment_mark(self):
+        """Mark the current end of the graph, see fragment."""
+        return len(self.graph.body), self._ranks.mark()
+
+    def fragment(self, mark):
+        """
+        What has been added to the graph since the mark.
+
+        Only available for graphs built in memory by the graphviz library.
+
+        :returns: A tuple (lines, rank_entries) which add_fragment adds
+            to a graph again.
+        """
+        lines, since = mark
+        return self.graph.body[lines:], self._ranks.entries(since)
+
+    def add_fragment(self, fragment):
+        """Add the lines and rank memberships of a fragment, to graphs
+        of the graphviz library or emitters."""
+        lines, rank_entries = fragment
+        extend_body = getattr(self.graph, 'extend_body', None)
+        if extend_body is None:
+            extend_body = self.graph.body.extend
+        extend_body(lines)
+        self._ranks.extend(rank_entries)
 
     def get_ranks(self):
-        return self._ranks
+        """Rank memberships of nodes in this context and its subgraphs."""
+        return self._ranks.ranks(self._rank_mark)
 
     def node_id(self, name):
-        if not self.prefix:
-            return name
-        return f'{self.prefix}_{name}'
+        return node_id(self.prefix, name)
 
     def add_edge(
         self, node_from: str, node_to: str, attributes: dict = None,
-        classes=None
+        classes=None, visible=True, extra_classes=None,
     ):
-        log.info('Enter add_edge')
+        tracer = self.tracer
+        if tracer is not None:
+            start = perf_counter()
 
         classes = classes or []
 
@@ -340,49 +266,111 @@ class GraphContext(object):
             'edge',
             attributes,
             classes,
+            visible=visible,
+            extra_classes=extra_classes,
         )
 
-        log.info('Adding edge')
-        log.debug(f'{node_from=} {node_to=} {attrs=}')
+        if self._debug:
+            log.debug('Adding edge %s %s %r', node_from, node_to, attrs)
         self.graph.edge(
             node_from,
             node_to,
             **attrs
         )
+        if tracer is not None:
+            tracer.record('edge', f'{node_from}:{node_to}', start, self.path)
+
+    def add_edges(self, symbols, tails, heads, kinds, styles):
+        """
+        Add edges given as columns, drawn as add_edge draws them in turn.
+
+        The attributes of the edges of a kind are built once, the id of
+        each node is quoted once and the edge statements are added to
+        the graph in one go. Edges are logged and traced one by one, and
+        added one by one to graphs other than those of the graphviz
+        library and the emitters.
+
+        :param list symbols: The node ids of the endpoints.
+        :param tails: The index in symbols of the tail of each edge.
+        :param heads: The index in symbols of the head of each edge.
+        :param kinds: The index in styles of each edge.
+        :param list styles: The (attributes, visible, extra_classes) of
+            the edges of each kind, as taken by add_edge.
+        """
+        graph = self.graph
+        extend_body = getattr(graph, 'extend_body', None)
+        if extend_body is None and isinstance(
+            getattr(graph, 'body', None), list,
+        ):
+            extend_body = graph.body.extend
+        if extend_body is None or self._debug or self.tracer is not None:
+            for tail, head, kind in zip(tails, heads, kinds):
+                attributes, visible, extra_classes = styles[kind]
+                self.add_edge(
+                    symbols[tail],
+                    symbols[head],
+                    attributes,
+                    visible=visible,
+                    extra_classes=extra_classes,
+                )
+            return
+
+        attr_lists = []
+        for attributes, visible, extra_classes in styles:
+            attrs = self._build_attributes(
+                'edge',
+                attributes,
+                visible=visible,
+                extra_classes=extra_classes,
+            )
+            label = attrs.pop('label', None)
+            attr_lists.append(attr_list(label, kwargs=attrs))
+        quoted = [quote_edge(nodeid) for nodeid in symbols]
+        edge_op = '->' if graph.directed else '--'
+        extend_body(
+            f'\t{quoted[tail]} {edge_op} {quoted[head]}{attr_lists[kind]}\n'
+            for tail, head, kind in zip(tails, heads, kinds)
+        )
 
-    def add_node(self, name, attributes=None, classes=None):
-        log.info('Enter add_node')
+    def add_node(
+        self, name, attributes=None, classes=None, visible=True,
+        extra_classes=None,
+    ):
+        tracer = self.tracer
+        if tracer is not None:
+            start = perf_counter()
 
         classes = classes or []
         attributes = attributes or {}
 
-        log.debug(f'{name} {attributes} {classes}')
-
+        node_name = self.node_id(name)
         if 'rank' in attributes:
-            rank_name = attributes['rank']
-            rank_nodes = self._ranks.get(rank_name, [])
-            self._ranks[rank_name] = rank_nodes + [name]
+            self._ranks.add(attributes['rank'], node_name)
 
         attrs = self._build_attributes(
             'node',
             attributes,
             classes,
+            visible=visible,
+            extra_classes=extra_classes,
         )
 
         if 'label' in attrs and isinstance(attrs['label'], dict):
             attrs['label'] = format_html_label(attrs['label'])
             attrs['shape'] = 'plain'
 
-        node_name = self.node_id(name)
-        log.info('Adding node')
-        log.debug(f'{node_name=} {attrs=}')
+        if self._debug:
+            log.debug('Adding node %s %r', node_name, attrs)
         self.graph.node(
             node_name,
             **attrs
         )
+        if tracer is not None:
+            tracer.record('node', node_name, start, self.path)
 
     def _build_attributes(
-        self, element_type: str, attributes: dict, classes: list = None
+        self, element_type: str, attributes: dict, classes: list = None,
+        visible: bool = True, extra_classes: tuple = None,
     ) -> dict:
         """
         Construct a dictionary of attributes for a graphviz element.
@@ -396,23 +384,38 @@ class GraphContext(object):
         Any attributes specified overrides the one supplied by
         any classes.
 
-        :param str element_type: The DOT element, graph, subgraph, node, edge
+        In strict mode attributes which do not apply to the element
+        raise a ValueError instead of being dropped.
+
+        :param str element_type: The DOT element, graph, cluster, node, edge
         :param dict attributes: (key, value) pairs. The value is
             treated as a literal.
         :param list classes: Any classes to apply defined by the stylesheet.
+        :param bool visible: Whether the element is visible, an element
+            is also hidden by setting its ``visible`` attribute to false.
+        :param tuple extra_classes: Classes applied after the classes
+            defined by the element.
         :returns: A (key, value) mapping of element attributes.
         :rtype: dict
         """
-        attrs = self.styles.get(element_type, {}).copy()
-
-        classes = classes or []
+        if self.profiler is not None:
+            self.profiler.counters['build_attributes'] += 1
         attributes = attributes or {}
+        classes = (
+            tuple(classes or ())
+            + tuple(attributes.get('classes', ()))
+            + tuple(extra_classes or ())
+        )
 
-        for c in classes + attributes.get('classes', []):
-            attrs.update(self.styles.get(c, {}))
-
-        if attributes:
-            attrs.update(attributes)
+        attrs = self._compile_style(element_type, classes).copy()
+        applicable = element_attrs[element_type]
+        for attr, value in attributes.items():
+            if attr in applicable:
+                attrs[attr] = value
+            elif self.strict and attr not in model_attrs:
+                raise ValueError(
+                    f"attribute '{attr}' does not apply to {element_type}"
+                )
 
         styles = attrs.get('style', [])
 
@@ -421,20 +424,71 @@ class GraphContext(object):
                 "style attribute must be a list, got '%r'" % styles
             )
 
-        if not attributes.get('visible', True):
-            styles.append('invis')
+        if not (visible and attributes.get('visible', True)):
+            styles = styles + ['invis']
         elif attributes.get('cluster', False):
             if not styles:
-                styles.append('solid')
+                styles = ['solid']
 
         if styles:
             attrs['style'] = ','.join(styles)
 
-        result = {}
-        for attr in attrs.keys():
-            if attr in valid_attrs:
-                result[attr] = attrs[attr]
-        return result
+        return attrs
+
+    def _compile_style(self, element_type: str, classes: tuple) -> dict:
+        """
+        Resolve the stylesheet cascade for an element type and classes.
+
+        The result is cached with the stylesheet, so elements sharing a
+        class combination only pay for the cascade once, in this context
+        and every other one sharing the stylesheet.
+        The returned dictionary is shared and must not be modified.
+
+        Attributes defined by classes are filtered by the element type,
+        so a class may style several kinds of elements. In strict mode
+        attributes unknown to Graphviz raise a ValueError.
+
+        :param str element_type: The DOT element, graph, cluster, node, edge
+        :param tuple classes: Classes to apply in order of precedence.
+        :returns: The filtered (key, value) mapping defined by the classes.
+        :rtype: dict
+        """
+        compiled_styles = self.styles.compiled
+        key = (element_type, classes, self.strict)
+        try:
+            attrs = compiled_styles[key]
+        except KeyError:
+            pass
+        else:
+            if self.profiler is not None:
+                self.profiler.counters['style_cache_hits'] += 1
+            return attrs
+        if self.profiler is not None:
+            self.profiler.counters['style_cache_misses'] += 1
+
+        base_style = self.base_style_for.get(element_type, element_type)
+        attrs = self.styles.get(base_style, {}).copy()
+        for c in classes:
+            attrs.update(self.styles.get(c, {}))
+
+        if self.strict:
+            unknown = [
+                attr for attr in attrs
+                if attr not in valid_attrs and attr not in model_attrs
+            ]
+            if unknown:
+                raise ValueError(
+                    f'unknown attributes {unknown} in classes {classes}'
+                )
+
+        applicable = element_attrs[element_type]
+        compiled = {
+            attr: value
+            for attr, value in attrs.items()
+            if attr in applicable
+        }
+        compiled_styles[key] = compiled
+        return compiled
 
     def add_rank(self, rank_name: str, rank_type: str) -> ():
         """Add rank specification to the graph
@@ -442,7 +496,10 @@ class GraphContext(object):
         :param str rank_name: Name given the rank.
         :param str rank_type: same, min, or max.
         """
-        rank_nodes = self._ranks.get(rank_name)
+        rank_nodes = self._ranks.members(rank_name, self._rank_mark)
+        if not rank_nodes:
+            log.debug("Rank '%s' has no nodes, skipping", rank_name)
+            return
 
         if rank_type not in ['same', 'min', 'max']:
             log.warning("Rank type '%s' not valid, replacing with 'same'", rank_type)
@@ -453,57 +510,72 @@ class GraphContext(object):
             for nodename in rank_nodes:
                 s.node(nodename)
 
+    def close(self):
+        """Finish the graph, writing its end when streaming to a sink."""
+        close = getattr(self.graph, 'close', None)
+        if close is not None:
+            close()
+
     def source(self):
         return self.graph.source
 
 
-def format_html_label(label: dict):
-    """Produces a graphviz html label from a dictionary.
+class RankRegistry(object):
+    """
+    Append-only record of rank memberships.
 
-    :param label:
+    A context shares the registry with the contexts of its subgraphs.
+    As the model is walked depth first, the members added by a context
+    and its subgraphs are exactly those added since the context was
+    created, so a context only needs to remember its starting mark.
     """
 
-    rows = []
-    for row in label['trs']:
-        tds = []
-        for td in row:
-            tds.append(
-                format_html_tag('td', td, td['value'])
+    def __init__(self):
+        self._seq = 0
+        self._members = {}
+
+    def mark(self) -> int:
+        """Position of the next membership to be added."""
+        return self._seq
+
+    def add(self, rank_name: str, node_name: str):
+        seqs, nodes = self._members.setdefault(rank_name, ([], []))
+        seqs.append(self._seq)
+        nodes.append(node_name)
+        self._seq += 1
+
+    def extend(self, entries):
+        """Add (rank_name, node_name) memberships in order."""
+        for rank_name, node_name in entries:
+            self.add(rank_name, node_name)
+
+    def members(self, rank_name: str, since: int = 0) -> list:
+        """Nodes of a rank in insertion order added since the mark."""
+        if rank_name not in self._members:
+            return []
+        seqs, nodes = self._members[rank_name]
+        return nodes[bisect_left(seqs, since):]
+
+    def ranks(self, since: int = 0) -> dict:
+        """Members of every rank with nodes added since the mark."""
+        ranks = {}
+        for rank_name in self._members:
+            nodes = self.members(rank_name, since)
+            if nodes:
+                ranks[rank_name] = nodes
+        return ranks
+
+    def entries(self, since: int = 0) -> list:
+        """(rank_name, node_name) memberships since the mark in order."""
+        entries = []
+        for rank_name, (seqs, nodes) in self._members.items():
+            start = bisect_left(seqs, since)
+            entries.extend(
+                (seq, rank_name, node_name)
+                for seq, node_name in zip(seqs[start:], nodes[start:])
             )
-        rows.append(
-            format_html_tag('tr', inner=''.join(tds))
-        )
-    table = format_html_tag('table', label, ''.join(rows))
-    return f'<{table}>'
-
-
-def format_html_tag(tag, attrs=None, inner=''):
-    html_attrs = {
-        'TABLE': [
-            'ALIGN', 'BGCOLOR', 'BORDER', 'CELLBORDER', 'CELLPADDING',
-            'CELLSPACING', 'COLOR', 'COLUMNS', 'FIXEDSIZE', 'GRADIENTANGLE',
-            'HEIGHT', 'HREF', 'ID', 'PORT', 'ROWS', 'SIDES',
-            'STYLE', 'TARGET', 'TITLE', 'TOOLTIP', 'VALIGN',
-            'WIDTH',
-        ],
-        'TD': [
-            'ALIGN', 'BALIGN', 'BGCOLOR', 'BORDER', 'CELLPADDING',
-            'CELLSPACING', 'COLOR', 'COLSPAN', 'FIXEDSIZE', 'GRADIENTANGLE',
-            'HEIGHT', 'HREF', 'ID', 'PORT', 'ROWSPAN', 'SIDES',
-            'STYLE', 'TARGET', 'TITLE', 'TOOLTIP', 'VALIGN',
-            'WIDTH',
-        ],
-    }
-    attrs = attrs or {}
-    tag = tag.upper()
-    tag_attrs = [
-        f'{k.upper()}="{v}"'
-        for k, v in attrs.items()
-        if k.upper() in html_attrs[tag]
-    ]
-    log.debug(f'{tag_attrs=}')
-    html = f'<{tag}'
-    if tag_attrs:
-        html += f" {' '.join(tag_attrs)}"
-    html += f'>{inner}</{tag}>'
-    return html
+        entries.sort()
+        return [
+            (rank_name, node_name)
+            for _, rank_name, node_name in entries
+        ]
@@ -0,0 +1,141 @@
+"""
+Streaming DOT output.
+
+The graphviz library keeps every statement of a graph in memory and
+copies the statements of a subgraph into its parent. The emitters in
+this module implement the part of its interface used by GraphContext,
+but write each statement to a file-like sink as soon as it is made.
+
+As the overlays walk a model depth first, the statements of a subgraph
+are made in one go between the statements of its parent, so writing
+them immediately produces the same source as the graphviz library.
+"""
+import contextlib
+import functools
+import io
+
+import graphviz
+
+from graphviz_overlay.quoting import a_list, attr_list, quote, quote_edge
+
+
+class DotGraph(object):
+    """Emits an undirected graph, or one of its subgraphs, to a sink."""
+
+    directed = False
+    edge_op = '--'
+
+    def __init__(
+        self, name: str = None, graph_attr: dict = None,
+        node_attr: dict = None, edge_attr: dict = None, *, sink=None,
+        depth: int = 0,
+    ):
+        self.name = name
+        self.sink = io.StringIO() if sink is None else sink
+        self.depth = depth
+        self.closed = False
+        self._indent = '\t' * (depth + 1)
+
+        name = f'{quote(name)} ' if name else ''
+        if depth == 0:
+            head = 'digraph' if self.directed else 'graph'
+            self._write_line(f'{head} {name}{{', depth)
+        elif name:
+            self._write_line(f'subgraph {name}{{', depth)
+        else:
+            self._write_line('{', depth)
+
+        for kw, attrs in [
+            ('graph', graph_attr),
+            ('node', node_attr),
+            ('edge', edge_attr),
+        ]:
+            if attrs:
+                self.sink.write(
+                    f'{self._indent}{kw}{attr_list(None, kwargs=attrs)}\n'
+                )
+
+    def _write_line(self, line, depth):
+        indent = '\t' * depth
+        self.sink.write(f'{indent}{line}\n')
+
+    @property
+    def subgraph_class(self):
+        """Creates subgraphs written to the same sink."""
+        return functools.partial(
+            type(self),
+            sink=self.sink,
+            depth=self.depth + 1,
+        )
+
+    def node(self, name: str, label: str = None, **attrs):
+        self.sink.write(
+            f'{self._indent}{quote(name)}{attr_list(label, kwargs=attrs)}\n'
+        )
+
+    def edge(self, tail_name: str, head_name: str, label: str = None,
+             **attrs):
+        self.sink.write(
+            f'{self._indent}{quote_edge(tail_name)} {self.edge_op} '
+            f'{quote_edge(head_name)}{attr_list(label, kwargs=attrs)}\n'
+        )
+
+    def extend_body(self, lines):
+        """Write statements formatted as the lines of the body of a
+        graphviz graph, which are indented by one tab."""
+        indent = self._indent[1:]
+        if indent:
+            lines = (f'{indent}{line}' for line in lines)
+        self.sink.writelines(lines)
+
+    def attr(self, **attrs):
+        """Write a general attribute statement."""
+        if attrs:
+            self.sink.write(
+                f'{self._indent}{a_list(None, kwargs=attrs)}\n'
+            )
+
+    def subgraph(self, graph=None):
+        """
+        Close a subgraph created by ``subgraph_class``, or return a context
+        manager creating an anonymous subgraph closed on exit.
+        """
+        if graph is not None:
+            graph.close()
+            return None
+        return self._anonymous_subgraph()
+
+    @contextlib.contextmanager
+    def _anonymous_subgraph(self):
+        subgraph = self.subgraph_class()
+        yield subgraph
+        subgraph.close()
+
+    def close(self):
+        """Write the end of the graph, once."""
+        if not self.closed:
+            self._write_line('}', self.depth)
+            self.closed = True
+
+    @property
+    def source(self) -> str:
+        """The source written so far when the sink is a StringIO."""
+        if isinstance(self.sink, io.StringIO):
+            return self.sink.getvalue()
+        return None
+
+
+class DotDigraph(DotGraph):
+    """Emits a directed graph, or one of its subgraphs, to a sink."""
+
+    directed = True
+    edge_op = '->'
+
+
+def emitter_class(graph_class):
+    """The emitter producing the same kind of graph as a graphviz class."""
+    if isinstance(graph_class, type) and issubclass(
+        graph_class, (graphviz.Digraph, DotDigraph)
+    ):
+        return DotDigraph
+    return DotGraph
@@ -0,0 +1,292 @@
+"""
+Compact representation of models.
+
+A model loaded from json carries a dictionary per element, and a string
+per node id and edge endpoint. Compiled, each level of a model keeps
+its nodes and edges in parallel lists and arrays instead:
+
+* Strings are interned, a node id and the endpoints referring to it
+  share one string.
+* Edge endpoints are indices into a table of the model's symbols, held
+  in arrays.
+* Elements are indexed by the paths they carry, see PathIndex.
+* Attribute dictionaries with the same contents are shared, most edges
+  share the empty one. The dictionary of an edge is only created while
+  it is drawn.
+
+The compiled levels behave as the read-only model dictionaries they are
+compiled from, so they are drawn like any other model. Shared attribute
+dictionaries must not be modified.
+"""
+from array import array
+from collections.abc import Mapping
+import heapq
+from itertools import repeat
+import sys
+
+# Keys holding the elements of a level, compiled into tables.
+element_keys = frozenset(['nodes', 'edges', 'subgraphs'])
+
+_empty = {}
+
+
+class Interner(object):
+    """Shares equal strings and attribute dictionaries of a model."""
+
+    def __init__(self):
+        self.symbols = []
+        self._symbol_index = {}
+        self._attributes = {}
+
+    def symbol(self, name) -> int:
+        """The index of a node id or endpoint in ``symbols``."""
+        index = self._symbol_index.get(name)
+        if index is None:
+            index = self._symbol_index[name] = len(self.symbols)
+            self.symbols.append(_intern(name))
+        return index
+
+    def attributes(self, attributes: dict, exclude=()) -> dict:
+        """An attribute dictionary equal to the given one without the
+        excluded keys, the same one for equal attributes."""
+        items = [
+            (sys.intern(key), self._value(value))
+            for key, value in attributes.items()
+            if key not in exclude
+        ]
+        if not items:
+            return _empty
+        try:
+            key = tuple([
+                (name, value) if type(value) is str
+                else (name, _freeze(value))
+                for name, value in items
+            ])
+            return self._attributes.setdefault(key, dict(items))
+        except TypeError:
+            # Html labels are rarely equal, they are not shared.
+            return dict(items)
+
+    def _value(self, value):
+        if type(value) is str:
+            return sys.intern(value)
+        if type(value) is list:
+            return [self._value(v) for v in value]
+        return value
+
+
+def _intern(value):
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+def _freeze(value):
+    """A key of an attribute value, equal values of different types such
+    as 1 and true have different keys."""
+    if type(value) is list:
+        return list, tuple(_freeze(v) for v in value)
+    return type(value), value
+
+
+class PathIndex(object):
+    """
+    The elements of a table grouped by the paths they carry.
+
+    Selection only depends on the paths of an element, so it is decided
+    once for each group instead of for each element.
+    """
+    __slots__ = ('groups',)
+
+    def __init__(self):
+        self.groups = {}
+
+    def add(self, paths, index: int):
+        key = tuple(paths) if paths else ()
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = array('L')
+        group.append(index)
+
+    def items(self):
+        """:returns: (paths, indices) of each group"""
+        return self.groups.items()
+
+
+class NodeTable(object):
+    """The nodes of a level as parallel lists of ids and attributes."""
+    __slots__ = ('ids', 'attributes', 'paths')
+
+    def __init__(self):
+        self.ids = []
+        self.attributes = []
+        self.paths = PathIndex()
+
+    def items(self):
+        return zip(self.ids, self.attributes)
+
+    def entries(self, selection):
+        ids = self.ids
+        attributes = self.attributes
+        for index, visible, classes in selection:
+            yield ids[index], attributes[index], visible, classes
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class EdgeTable(object):
+    """The edges of a level with their endpoints in arrays of symbols."""
+    __slots__ = ('symbols', 'tails', 'heads', 'attributes', 'paths')
+
+    def __init__(self, symbols: list):
+        self.symbols = symbols
+        self.tails = array('L')
+        self.heads = array('L')
+        self.attributes = []
+        self.paths = PathIndex()
+
+    def items(self):
+        """The endpoints and attributes of each edge."""
+        symbols = self.symbols
+        for tail, head, attributes in zip(
+            self.tails, self.heads, self.attributes,
+        ):
+            yield symbols[tail], symbols[head], attributes
+
+    def __iter__(self):
+        """The edges as the dictionaries they are compiled from, each is
+        created as it is iterated."""
+        for tail, head, attributes in self.items():
+            yield {'from': tail, 'to': head, **attributes}
+
+    def entries(self, selection):
+        symbols = self.symbols
+        tails = self.tails
+        heads = self.heads
+        attributes = self.attributes
+        for index, visible, classes in selection:
+            edge = {
+                'from': symbols[tails[index]],
+                'to': symbols[heads[index]],
+                **attributes[index],
+            }
+            yield edge, visible, classes
+
+    def __len__(self):
+        return len(self.tails)
+
+
+class Selection(object):
+    """
+    The groups of elements of a table chosen by preprocessing, with
+    whether they are visible and their classes.
+
+    Iterating yields the entries of the elements in the order of the
+    table, as preprocessing yields them for the elements of a model
+    which is not compiled.
+    """
+    __slots__ = ('table', 'groups')
+
+    def __init__(self, table):
+        self.table = table
+        self.groups = []
+
+    def add(self, indices, visible: bool, classes: tuple):
+        """Add a group of elements, the indices are in ascending order."""
+        self.groups.append((indices, visible, classes))
+
+    def members(self):
+        """:returns: (index, visible, classes) of the elements in order"""
+        groups = [
+            zip(indices, repeat(visible), repeat(classes))
+            for indices, visible, classes in self.groups
+        ]
+        if len(groups) == 1:
+            return groups[0]
+        # Indices are unique, so entries are only compared by them.
+        return heapq.merge(*groups)
+
+    def __iter__(self):
+        return self.table.entries(self.members())
+
+    def __len__(self):
+        return sum(len(indices) for indices, _, _ in self.groups)
+
+
+class ModelIR(Mapping):
+    """
+    One compiled level of a model.
+
+    ``nodes`` is a NodeTable, ``edges`` an EdgeTable and ``subgraphs``
+    a dictionary of compiled levels, the other keys of the level are in
+    ``attributes``.
+    """
+    __slots__ = ('attributes', 'nodes', 'edges', 'subgraphs')
+
+    def __init__(self, attributes: dict, nodes=None, edges=None,
+                 subgraphs=None):
+        self.attributes = attributes
+        self.nodes = nodes
+        self.edges = edges
+        self.subgraphs = subgraphs
+
+    def __getitem__(self, key):
+        if key in element_keys:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return value
+        return self.attributes[key]
+
+    def __iter__(self):
+        yield from self.attributes
+        for key in ('nodes', 'edges', 'subgraphs'):
+            if getattr(self, key) is not None:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def compile_model(model: dict) -> ModelIR:
+    """Compile a model, nested subgraphs are followed without recursion."""
+    interner = Interner()
+    symbols = interner.symbols
+    symbol = interner.symbol
+    attributes = interner.attributes
+    endpoints = ('from', 'to')
+    root = ModelIR(None)
+    stack = [(root, model)]
+    while stack:
+        level, level_model = stack.pop()
+        level.attributes = {
+            key: value
+            for key, value in level_model.items()
+            if key not in element_keys
+        }
+
+        if 'nodes' in level_model:
+            nodes = level.nodes = NodeTable()
+            for node_id, node in level_model['nodes'].items():
+                nodes.ids.append(symbols[symbol(node_id)])
+                nodes.attributes.append(attributes(node) if node else _empty)
+                nodes.paths.add(node.get('paths'), len(nodes.ids) - 1)
+
+        if 'edges' in level_model:
+            edges = level.edges = EdgeTable(symbols)
+            for edge in level_model['edges']:
+                edges.tails.append(symbol(edge['from']))
+                edges.heads.append(symbol(edge['to']))
+                edges.attributes.append(
+                    attributes(edge, exclude=endpoints)
+                    if len(edge) > 2 else _empty
+                )
+                edges.paths.add(edge.get('paths'), len(edges.tails) - 1)
+
+        if 'subgraphs' in level_model:
+            level.subgraphs = {}
+            for name, subgraph in level_model['subgraphs'].items():
+                compiled = level.subgraphs[name] = ModelIR(None)
+                stack.append((compiled, subgraph))
+    return root
@@ -0,0 +1,415 @@
+"""
+Incremental loading of large json models.
+
+Only the collections of the top level of a model, ``nodes``, ``edges``
+and ``subgraphs``, are streamed. Each of their entries is read from the
+file when the collection is iterated, so no more than a single entry is
+held in memory at a time. Every other top level key is loaded up front,
+they are needed before drawing starts and are small.
+
+The input must be seekable as each collection is read from its offset
+in the file when it is iterated.
+
+Values are parsed with load and loads, which parse values nested deeper
+than the recursion limit allows for json.loads without recursion.
+"""
+from collections.abc import Mapping
+import io
+import json
+from json.decoder import scanstring
+from json.scanner import NUMBER_RE
+import re
+
+from graphviz_overlay.symbols import node_id
+
+collection_keys = frozenset(['nodes', 'edges', 'subgraphs'])
+
+_NON_WHITESPACE = re.compile(rb'[^ \t\n\r]')
+_STRUCTURE = re.compile(rb'["{}\[\]]')
+_STRING = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb'[ \t\n\r,}\]]')
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_CONSTANT = re.compile(r'true|false|null|NaN|-?Infinity')
+_constants = {
+    'true': True,
+    'false': False,
+    'null': None,
+    'NaN': float('nan'),
+    'Infinity': float('inf'),
+    '-Infinity': float('-inf'),
+}
+
+
+def load(file):
+    """Parse the json of a file, see loads."""
+    return loads(file.read())
+
+
+def loads(source):
+    """
+    Parse json like json.loads.
+
+    Values nested deeper than the recursion limit allows are parsed again
+    following the nesting with a stack, at a fraction of the speed.
+    """
+    try:
+        return json.loads(source)
+    except RecursionError:
+        if isinstance(source, (bytes, bytearray)):
+            source = source.decode(
+                json.detect_encoding(source), 'surrogatepass',
+            )
+        return _parse(source)
+
+
+def _parse(s: str):
+    """Parse json without recursion."""
+    skip = _WHITESPACE.match
+    # Objects and arrays being parsed, each with the key of the member
+    # being parsed, None in arrays.
+    stack = []
+    pos = skip(s).end()
+    while True:
+        char = s[pos:pos + 1]
+        if char == '{' or char == '[':
+            pos = skip(s, pos + 1).end()
+            if s[pos:pos + 1] == ('}' if char == '{' else ']'):
+                value = {} if char == '{' else []
+                pos += 1
+            elif char == '{':
+                key, pos = _parse_key(s, pos)
+                stack.append(({}, key))
+                continue
+            else:
+                stack.append(([], None))
+                continue
+        elif char == '"':
+            value, pos = scanstring(s, pos + 1)
+        else:
+            m = NUMBER_RE.match(s, pos)
+            if m is not None:
+                integer, fraction, exponent = m.groups()
+                if fraction or exponent:
+                    value = float(m.group())
+                else:
+                    value = int(integer)
+            else:
+                m = _CONSTANT.match(s, pos)
+                if m is None:
+                    raise json.JSONDecodeError('Expecting value', s, pos)
+                value = _constants[m.group()]
+            pos = m.end()
+
+        # Add the value to the containers it completes.
+        while True:
+            pos = skip(s, pos).end()
+            if not stack:
+                if pos != len(s):
+                    raise json.JSONDecodeError('Extra data', s, pos)
+                return value
+            container, key = stack[-1]
+            if key is None:
+                container.append(value)
+            else:
+                container[key] = value
+            char = s[pos:pos + 1]
+            if char == ',':
+                pos = skip(s, pos + 1).end()
+                if key is not None:
+                    key, pos = _parse_key(s, pos)
+                    stack[-1] = (container, key)
+                break
+            if char != (']' if key is None else '}'):
+                raise json.JSONDecodeError("Expecting ',' delimiter", s, pos)
+            stack.pop()
+            value = container
+            pos += 1
+
+
+def _parse_key(s: str, pos: int):
+    """:returns: (key, pos) of the member name at pos and the position of
+    its value"""
+    if s[pos:pos + 1] != '"':
+        raise json.JSONDecodeError(
+            'Expecting property name enclosed in double quotes', s, pos,
+        )
+    key, pos = scanstring(s, pos + 1)
+    pos = _WHITESPACE.match(s, pos).end()
+    if s[pos:pos + 1] != ':':
+        raise json.JSONDecodeError("Expecting ':' delimiter", s, pos)
+    return key, _WHITESPACE.match(s, pos + 1).end()
+
+
+class _Scanner(object):
+    """Reads json values from a binary file, one chunk at a time."""
+
+    def __init__(self, file, offset: int = 0, chunk_size: int = 1 << 16):
+        file.seek(offset)
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = b''
+        self.pos = 0
+        # File offset of the start of the buffer.
+        self.offset = offset
+
+    def tell(self) -> int:
+        return self.offset + self.pos
+
+    def _next_chunk(self, parts=None, start=0) -> bool:
+        """Replace the buffer with the next chunk of the file.
+
+        Keeps the unconsumed part of the buffer from ``start`` in ``parts``
+        when given, otherwise it must already have been consumed.
+        """
+        data = self.file.read(self.chunk_size)
+        if not data:
+            return False
+        if parts is not None:
+            parts.append(self.buf[start:])
+        self.offset += len(self.buf)
+        self.buf = data
+        self.pos = 0
+        return True
+
+    def peek(self) -> bytes:
+        """The next non-whitespace character, or b'' at the end of file."""
+        while True:
+            m = _NON_WHITESPACE.search(self.buf, self.pos)
+            if m:
+                self.pos = m.start()
+                return self.buf[self.pos:self.pos + 1]
+            self.pos = len(self.buf)
+            if not self._next_chunk():
+                return b''
+
+    def expect(self, char: bytes):
+        found = self.peek()
+        if found != char:
+            raise ValueError(
+                f'Expected {char!r} at offset {self.tell()}, found {found!r}'
+            )
+        self.pos += 1
+
+    def read_value(self, keep: bool = True) -> bytes:
+        """Read the next json value and return its source.
+
+        :param bool keep: Only skip the value when false, returning b''.
+        """
+        first = self.peek()
+        if not first:
+            raise ValueError('Unexpected end of file')
+        parts = [] if keep else None
+        if first in b'{[':
+            end = self._scan_structure(parts)
+        elif first == b'"':
+            self.pos += 1
+            end = self._scan_string(parts, self.pos - 1)
+        else:
+            end = self._scan_scalar(parts)
+        if keep:
+            parts.append(self.buf[self._start:end])
+        self.pos = end
+        return b''.join(parts) if keep else b''
+
+    def _scan_string(self, parts, start):
+        """Find the end of a string whose opening quote is consumed."""
+        self._start = start
+        i = self.pos
+        while True:
+            m = _STRING.search(self.buf, i)
+            if m is None:
+                if not self._next_chunk(parts, self._start):
+                    raise ValueError('Unterminated string')
+                self._start = i = 0
+                continue
+            i = m.end()
+            if m.group() == b'"':
+                return i
+            # Skip the escaped character, which may be in the next chunk.
+            if i == len(self.buf):
+                if not self._next_chunk(parts, self._start):
+                    raise ValueError('Unterminated string')
+                self._start = 0
+                i = 1
+            else:
+                i += 1
+
+    def _scan_structure(self, parts):
+        self._start = self.pos
+        i = self.pos
+        depth = 0
+        while True:
+            m = _STRUCTURE.search(self.buf, i)
+            if m is None:
+                if not self._next_chunk(parts, self._start):
+                    raise ValueError('Unexpected end of file')
+                self._start = i = 0
+                continue
+            char = m.group()
+            i = m.end()
+            if char == b'"':
+                start = self._start
+                self.pos = i
+                i = self._scan_string(parts, start)
+                continue
+            if char in b'{[':
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return i
+
+    def _scan_scalar(self, parts):
+        self._start = self.pos
+        i = self.pos
+        while True:
+            m = _SCALAR_END.search(self.buf, i)
+            if m is not None:
+                return m.start()
+            if not self._next_chunk(parts, self._start):
+                return len(self.buf)
+            self._start = i = 0
+
+    def members(self, array: bool = False):
+        """Iterate over the members of the object or array at the cursor.
+
+        Yields the key of each member, or None for array items, with the
+        cursor at its value which must be read before continuing.
+        """
+        open_char, close_char = (b'[', b']') if array else (b'{', b'}')
+        self.expect(open_char)
+        if self.peek() == close_char:
+            self.pos += 1
+            return
+        while True:
+            if array:
+                yield None
+            else:
+                key = json.loads(self.read_value())
+                self.expect(b':')
+                yield key
+            separator = self.peek()
+            self.pos += 1
+            if separator == close_char:
+                return
+            if separator != b',':
+                raise ValueError(
+                    f'Expected , or {close_char!r} at offset '
+                    f'{self.tell() - 1}, found {separator!r}'
+                )
+
+
+def node_ids(source: bytes):
+    """
+    The ids of the nodes of a subgraph and of the subgraphs within it,
+    read from the json source of the subgraph without parsing the nodes.
+    """
+    scanner = _Scanner(io.BytesIO(source))
+    # Members being read of the subgraphs objects, None, and of the levels
+    # with the names of their nodes and their prefix.
+    stack = [(scanner.members(), [], [''])]
+    while stack:
+        members, names, prefix = stack[-1]
+        key = next(members, None)
+        if key is None:
+            stack.pop()
+            if names is not None:
+                for name in names:
+                    yield node_id(prefix[0], name)
+        elif names is None:
+            stack.append((scanner.members(), [], ['']))
+        elif key == 'nodes':
+            for name in scanner.members():
+                names.append(name)
+                scanner.read_value(keep=False)
+        elif key == 'prefix':
+            prefix[0] = loads(scanner.read_value())
+        elif key == 'subgraphs':
+            stack.append((scanner.members(), None, None))
+        else:
+            scanner.read_value(keep=False)
+
+
+class LazyObject(object):
+    """A json object in a file whose members are read when iterated."""
+
+    def __init__(self, file, offset: int, chunk_size: int = 1 << 16):
+        self.file = file
+        self.offset = offset
+        self.chunk_size = chunk_size
+
+    def raw_items(self):
+        """Iterate over (key, source) pairs of the members."""
+        scanner = _Scanner(self.file, self.offset, self.chunk_size)
+        for key in scanner.members():
+            yield key, scanner.read_value()
+
+    def items(self):
+        for key, raw in self.raw_items():
+            yield key, loads(raw)
+
+    def __iter__(self):
+        for key, _ in self.raw_items():
+            yield key
+
+
+class LazyArray(object):
+    """A json array in a file whose items are read when iterated."""
+
+    def __init__(self, file, offset: int, chunk_size: int = 1 << 16):
+        self.file = file
+        self.offset = offset
+        self.chunk_size = chunk_size
+
+    def raw_items(self):
+        """Iterate over (index, source) pairs of the items."""
+        scanner = _Scanner(self.file, self.offset, self.chunk_size)
+        for index, _ in enumerate(scanner.members(array=True)):
+            yield index, scanner.read_value()
+
+    def __iter__(self):
+        for _, raw in self.raw_items():
+            yield loads(raw)
+
+
+class StreamedModel(Mapping):
+    """
+    A model whose top level collections are read incrementally.
+
+    Behaves like the model dictionary, except ``nodes`` and
+    ``subgraphs`` are LazyObjects and ``edges`` a LazyArray.
+    """
+    streamed = True
+
+    def __init__(self, file, chunk_size: int = 1 << 16):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.attributes = {}
+        self.collections = {}
+
+        scanner = _Scanner(file, chunk_size=chunk_size)
+        for key in scanner.members():
+            if key in collection_keys:
+                scanner.peek()
+                self.collections[key] = scanner.tell()
+                scanner.read_value(keep=False)
+            else:
+                self.attributes[key] = loads(scanner.read_value())
+        if scanner.peek():
+            raise ValueError(f'Extra data at offset {scanner.tell()}')
+
+    def __getitem__(self, key):
+        if key in self.collections:
+            collection = LazyArray if key == 'edges' else LazyObject
+            return collection(
+                self.file, self.collections[key], self.chunk_size,
+            )
+        return self.attributes[key]
+
+    def __iter__(self):
+        yield from self.attributes
+        yield from self.collections
+
+    def __len__(self):
+        return len(self.attributes) + len(self.collections)
@@ -0,0 +1,159 @@
+"""
+Graphviz HTML-like labels from dictionaries.
+
+A label is a table whose ``trs`` are rows of cells, the other keys of
+the table and of its cells are TABLE and TD attributes::
+
+    {
+        "border": "1",
+        "trs": [
+            [{"value": "Entity", "colspan": "2", "header": true}],
+            [
+                {"port": "p0", "value": "id", "font": {"color": "grey"}},
+                {"port": "p1", "value": ["first line", "second line"]}
+            ]
+        ]
+    }
+
+The ``value`` of a cell is its text, or a list of lines separated by
+``<BR/>``. A ``font`` of FONT attributes wraps the value, or the whole
+table when given on the table. Graphviz has no TH element, a
+``header`` cell is a TD with a bold value.
+
+Text and attribute values are escaped. Labels with the same structure,
+the same attributes on the same cells, share a compiled template which
+only the values are substituted into.
+"""
+import functools
+from html import escape
+import re
+
+html_attrs = {
+    'TABLE': frozenset([
+        'ALIGN', 'BGCOLOR', 'BORDER', 'CELLBORDER', 'CELLPADDING',
+        'CELLSPACING', 'COLOR', 'COLUMNS', 'FIXEDSIZE', 'GRADIENTANGLE',
+        'HEIGHT', 'HREF', 'ID', 'PORT', 'ROWS', 'SIDES',
+        'STYLE', 'TARGET', 'TITLE', 'TOOLTIP', 'VALIGN',
+        'WIDTH',
+    ]),
+    'TD': frozenset([
+        'ALIGN', 'BALIGN', 'BGCOLOR', 'BORDER', 'CELLPADDING',
+        'CELLSPACING', 'COLOR', 'COLSPAN', 'FIXEDSIZE', 'GRADIENTANGLE',
+        'HEIGHT', 'HREF', 'ID', 'PORT', 'ROWSPAN', 'SIDES',
+        'STYLE', 'TARGET', 'TITLE', 'TOOLTIP', 'VALIGN',
+        'WIDTH',
+    ]),
+    'TR': frozenset(),
+    'FONT': frozenset(['COLOR', 'FACE', 'POINT-SIZE']),
+}
+
+
+def format_html_label(label: dict) -> str:
+    """Produces a graphviz html label from a dictionary.
+
+    :param dict label: A table as described in the module documentation.
+    """
+    values = []
+    signature = _label_signature(label, values)
+    # Escaping is rare, so one search over all values decides whether
+    # any of them needs it.
+    if _special.search('\0'.join(values)) is not None:
+        values = [escape(value) for value in values]
+    return compile_label(signature).format(*values)
+
+
+_special = re.compile('[&<>"\']')
+
+
+@functools.lru_cache(maxsize=1024)
+def _tag_attributes(tag, keys):
+    """:returns: The keys which are attributes of the tag, and their names"""
+    allowed = html_attrs[tag]
+    applicable = [(key, key.upper()) for key in keys]
+    applicable = [(key, name) for key, name in applicable if name in allowed]
+    return (
+        tuple(key for key, _ in applicable),
+        tuple(name for _, name in applicable),
+    )
+
+
+def _attribute_names(tag, attrs, values):
+    """Names of the attributes of a tag, appending their values."""
+    keys, names = _tag_attributes(tag, tuple(attrs))
+    for key in keys:
+        values.append(str(attrs[key]))
+    return names
+
+
+def _label_signature(label, values):
+    """
+    The structure of a label, its values are appended to ``values`` in
+    the order the template of the structure substitutes them.
+    """
+    font = label.get('font')
+    if font is not None:
+        font = _attribute_names('FONT', font, values)
+    table = _attribute_names('TABLE', label, values)
+    rows = []
+    for row in label['trs']:
+        cells = []
+        for td in row:
+            names = _attribute_names('TD', td, values)
+            cell_font = td.get('font')
+            if cell_font is not None:
+                cell_font = _attribute_names('FONT', cell_font, values)
+            value = td['value']
+            if isinstance(value, list):
+                lines = len(value)
+                values.extend(str(line) for line in value)
+            else:
+                lines = None
+                values.append(str(value))
+            cells.append((names, cell_font, bool(td.get('header')), lines))
+        rows.append(tuple(cells))
+    return font, table, tuple(rows)
+
+
+def _open_tag(tag, names):
+    attrs = ''.join(f' {name}="{{}}"' for name in names)
+    return f'<{tag}{attrs}>'
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_label(signature) -> str:
+    """The template, a format string, of labels with this structure."""
+    font, table, rows = signature
+    parts = ['<']
+    if font is not None:
+        parts.append(_open_tag('FONT', font))
+    parts.append(_open_tag('TABLE', table))
+    for row in rows:
+        parts.append('<TR>')
+        for names, cell_font, header, lines in row:
+            parts.append(_open_tag('TD', names))
+            if cell_font is not None:
+                parts.append(_open_tag('FONT', cell_font))
+            if header:
+                parts.append('<B>')
+            slots = 1 if lines is None else lines
+            parts.append('<BR/>'.join(['{}'] * slots))
+            if header:
+                parts.append('</B>')
+            if cell_font is not None:
+                parts.append('</FONT>')
+            parts.append('</TD>')
+        parts.append('</TR>')
+    parts.append('</TABLE>')
+    if font is not None:
+        parts.append('</FONT>')
+    parts.append('>')
+    return ''.join(parts)
+
+
+def format_html_tag(tag, attrs=None, inner=''):
+    """A single tag with its applicable attributes around ``inner``."""
+    tag = tag.upper()
+    values = []
+    names = _attribute_names(tag, attrs or {}, values)
+    values = [escape(value) for value in values]
+    return f'{_open_tag(tag, names).format(*values)}{inner}</{tag}>'
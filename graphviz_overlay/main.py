@@ -2,28 +2,405 @@
 Generate a undirected graph
 """
 from argparse import ArgumentParser, FileType
+import io
+import logging
 import sys
+import time
 
 from graphviz_overlay import GraphContext, overlays
-from graphviz_overlay.util import load_json_file
+from graphviz_overlay.modelfile import is_model_file
+from graphviz_overlay.profiling import Profiler, phase
+from graphviz_overlay.util import load_json_file, load_model
+
+# The modules of commands and options other than drawing a model are
+# imported where they are used, so drawing does not wait for them.
+
+log = logging.getLogger(__name__)
 
 
 def main(opts):
-    model = load_json_file(opts.infile)
+    if opts.watch:
+        return watch_model(opts)
+
+    profiler = Profiler() if opts.profile else None
+    try:
+        draw_model(opts, profiler)
+    finally:
+        if profiler is not None:
+            profiler.write(opts.profile)
+
+
+def draw_model(opts, profiler=None):
+    """Draw the model of the options and output it."""
+    overlay_args = {
+        arg: getattr(opts, arg)
+        for arg in opts.overlay.arguments()
+    }
+    cache_options = {
+        'name': opts.name,
+        'strict': opts.strict,
+        'strict_endpoints': opts.strict_endpoints,
+    }
+
+    cache = source_key = key = source = None
+    if opts.cache_dir:
+        from graphviz_overlay.cache import RenderCache
+
+        cache = RenderCache(opts.cache_dir, opts.cache_size)
+        # Unchanged input files are found by their bytes, without
+        # parsing them, a compiled model is keyed by its digest anyway.
+        if not is_model_file(getattr(opts.infile, 'name', None)):
+            with phase(profiler, 'load'):
+                opts.infile = seekable(opts.infile)
+                if opts.stylesheet:
+                    opts.stylesheet = seekable(opts.stylesheet)
+                source_key = cache.source_key(
+                    [opts.infile, opts.stylesheet],
+                    opts.overlay.name,
+                    overlay_args,
+                    **cache_options,
+                )
+            key = cache.get(source_key, 'key')
+        if key is not None:
+            key = key.decode()
+            done, source = cached_output(opts, cache, key, profiler)
+            if done:
+                return
+
+    overlay_seconds = None
+    if source is None:
+        with phase(profiler, 'load'):
+            model = load_model(opts.infile, opts.incremental)
+
+            styles = load_json_file(opts.stylesheet)
+
+        if cache is not None and key is None:
+            key = cache.key(
+                model,
+                styles,
+                opts.overlay.name,
+                overlay_args,
+                **cache_options,
+            )
+            if source_key is not None:
+                cache.put(source_key, 'key', key.encode())
+            done, source = cached_output(opts, cache, key, profiler)
+            if done:
+                return
+
+    if source is None:
+        start = time.perf_counter()
+        # Only the compiled model is kept while drawing.
+        with phase(profiler, 'compile'):
+            model = opts.overlay.compile_model(model)
+        source = draw(
+            opts, model, styles, overlay_args, cache is not None, profiler,
+        )
+        overlay_seconds = time.perf_counter() - start
+        if cache is not None:
+            cache.put(key, 'dot', source.encode())
+
+    if not opts.format:
+        with phase(profiler, 'output'):
+            if source:
+                print(source)
+        report_timings(opts, overlay_seconds)
+        return
+
+    from graphviz_overlay.render import render
+
+    with phase(profiler, 'layout'):
+        layout_seconds, output = render(
+            source,
+            opts.outfile,
+            format=opts.format,
+            engine=opts.engine,
+            timeout=opts.timeout,
+        )
+    with phase(profiler, 'output'):
+        if cache is not None:
+            if output is None:
+                with open(opts.outfile, mode='rb') as f:
+                    output = f.read()
+            cache.put(key, f'{opts.engine}.{opts.format}', output)
+        if not opts.outfile:
+            write_output(opts, output)
+    report_timings(opts, overlay_seconds, layout_seconds)
+
+
+def cached_output(opts, cache, key, profiler=None):
+    """
+    Output the rendered graph of a key if it is cached.
+
+    :returns: A tuple (done, source) of whether the rendered graph was
+        output and otherwise the cached dot source, or None.
+    """
+    if opts.format:
+        output = cache.get(key, f'{opts.engine}.{opts.format}')
+        count_cache(profiler, output)
+        if output is not None:
+            with phase(profiler, 'output'):
+                write_output(opts, output)
+            report_timings(opts, None)
+            return True, None
+    source = cache.get(key, 'dot')
+    count_cache(profiler, source)
+    if source is not None:
+        source = source.decode()
+    return False, source
+
+
+def seekable(file):
+    """The file, or its content in memory if it cannot be read twice."""
+    if file.seekable():
+        return file
+    return io.TextIOWrapper(
+        io.BytesIO(getattr(file, 'buffer', file).read()), encoding='utf-8',
+    )
+
+
+def count_cache(profiler, cached):
+    """Count a lookup of the render cache."""
+    if profiler is not None:
+        if cached is None:
+            profiler.counters['render_cache_misses'] += 1
+        else:
+            profiler.counters['render_cache_hits'] += 1
+
+
+def draw(opts, model, styles, overlay_args, keep_source=False,
+         profiler=None):
+    """
+    Draw the model with the selected overlay.
+
+    :returns: The dot source, or None if it was streamed to stdout.
+    """
+    sink = None
+    if opts.stream:
+        # The source is needed once complete to lay it out or cache it.
+        if opts.format or keep_source:
+            sink = io.StringIO()
+        else:
+            sink = sys.stdout
+
+    tracer = None
+    if opts.trace:
+        from graphviz_overlay.trace import Tracer
+
+        tracer = Tracer(opts.trace)
+
+    with phase(profiler, 'context'):
+        ctx = GraphContext(
+            styles,
+            strict=opts.strict,
+            strict_endpoints=opts.strict_endpoints,
+            sink=sink,
+            tracer=tracer,
+            profiler=profiler,
+        )
+        overlay = opts.overlay(ctx, **overlay_args)
+    if opts.subgraph_jobs > 1:
+        from graphviz_overlay.parallel import draw_parallel
+
+        draw_parallel(
+            overlay, opts.name, model, opts.subgraph_jobs, styles,
+            overlay_args,
+        )
+    else:
+        overlay.draw(opts.name, model)
+    if sink is sys.stdout:
+        return None
+    return overlay.source()
+
+
+def write_output(opts, output: bytes):
+    """Write a rendered graph to the output file or stdout."""
+    if opts.outfile:
+        with open(opts.outfile, mode='wb') as f:
+            f.write(output)
+    else:
+        sys.stdout.buffer.write(output)
+        sys.stdout.flush()
+
+
+def batch(opts):
+    from graphviz_overlay.batch import load_views, render_views
+    from graphviz_overlay.render import RenderPool
+
+    model = load_model(opts.infile)
 
     styles = load_json_file(opts.stylesheet)
 
-    ctx = GraphContext(styles)
+    render_pool = None
+    if opts.format:
+        render_pool = RenderPool(
+            jobs=opts.render_jobs,
+            format=opts.format,
+            engine=opts.engine,
+            timeout=opts.timeout,
+        )
+
+    timings = []
+    try:
+        render_views(
+            model,
+            styles,
+            load_views(load_json_file(opts.views)),
+            {overlay.name: overlay for overlay in overlays},
+            outdir=opts.outdir,
+            jobs=opts.jobs,
+            strict=opts.strict,
+            strict_endpoints=opts.strict_endpoints,
+            render_pool=render_pool,
+            timings=timings,
+        )
+    finally:
+        if render_pool is not None:
+            render_pool.close()
+
+    for timing in timings:
+        report_timings(
+            opts,
+            timing['overlay_seconds'],
+            timing['layout_seconds'],
+            timing['output'],
+        )
+
+
+def compile_file(opts):
+    """Write the model to a compiled model file."""
+    from graphviz_overlay.modelfile import write_model_file
+
+    model = load_json_file(opts.infile)
+    with open(opts.output, mode='wb') as f:
+        write_model_file(model, f)
+
+
+def watch_model(opts):
+    """Draw the model every time it or the stylesheet is modified."""
+    files = [opts.infile]
+    if opts.stylesheet:
+        files.append(opts.stylesheet)
+    if any(f is sys.stdin for f in files):
+        raise ValueError('--watch needs the model in a file')
+    for f in files:
+        f.close()
 
     overlay_args = {
         arg: getattr(opts, arg)
         for arg in opts.overlay.arguments()
     }
+    try:
+        _watch_model(opts, files, overlay_args)
+    except KeyboardInterrupt:
+        pass
+
+
+def _watch_model(opts, files, overlay_args):
+    from graphviz_overlay.render import render
+    from graphviz_overlay.watch import IncrementalDraw, watch
+
+    styles = incremental = None
+    for _ in watch([f.name for f in files], opts.watch_interval):
+        try:
+            with open(opts.infile.name) as f:
+                model = load_json_file(f)
+            new_styles = {}
+            if opts.stylesheet:
+                with open(opts.stylesheet.name) as f:
+                    new_styles = load_json_file(f)
+        except ValueError as e:
+            log.warning('Not drawing, invalid json: %s', e)
+            continue
+
+        if incremental is None or new_styles != styles:
+            styles = new_styles
+            incremental = IncrementalDraw(
+                lambda: opts.overlay(
+                    GraphContext(
+                        styles,
+                        strict=opts.strict,
+                        strict_endpoints=opts.strict_endpoints,
+                    ),
+                    **overlay_args,
+                ),
+                opts.name,
+            )
+
+        start = time.perf_counter()
+        try:
+            source = incremental.draw(model)
+        except ValueError as e:
+            log.warning('Not drawing: %s', e)
+            continue
+        overlay_seconds = time.perf_counter() - start
+        log.info('Redrew subgraphs %s', incremental.redrawn)
 
-    overlay = opts.overlay(ctx, **overlay_args)
-    overlay.draw(opts.name, model)
+        layout_seconds = None
+        if opts.format:
+            layout_seconds, output = render(
+                source,
+                opts.outfile,
+                format=opts.format,
+                engine=opts.engine,
+                timeout=opts.timeout,
+            )
+            if output is not None:
+                write_output(opts, output)
+        elif opts.outfile:
+            with open(opts.outfile, mode='w') as f:
+                f.write(source)
+        else:
+            print(source, flush=True)
+        report_timings(opts, overlay_seconds, layout_seconds)
 
-    print(overlay.source())
+
+def serve(opts):
+    import asyncio
+
+    from graphviz_overlay.serve import DrawServer, StylesheetStore
+    from graphviz_overlay.serve import serve_forever
+
+    draw_server = DrawServer(
+        {overlay.name: overlay for overlay in overlays},
+        StylesheetStore(
+            opts.stylesheets,
+            default=load_json_file(opts.stylesheet),
+        ),
+        jobs=opts.jobs,
+        engine=opts.engine,
+        timeout=opts.timeout,
+    )
+    if opts.socket:
+        print(f'Serving on {opts.socket}', file=sys.stderr)
+    else:
+        print(f'Serving on http://{opts.host}:{opts.port}', file=sys.stderr)
+    try:
+        asyncio.run(serve_forever(
+            draw_server,
+            socket=opts.socket,
+            host=opts.host,
+            port=opts.port,
+        ))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        draw_server.close()
+
+
+def report_timings(opts, overlay_seconds, layout_seconds=None, view=None):
+    """Write the time spent drawing and laying out to stderr."""
+    if not opts.timings:
+        return
+    if overlay_seconds is None:
+        report = 'overlay cached'
+    else:
+        report = f'overlay {overlay_seconds:.3f}s'
+    if layout_seconds is not None:
+        report += f' layout {layout_seconds:.3f}s'
+    if view:
+        report = f'{view}: {report}'
+    print(report, file=sys.stderr)
 
 
 overlays = [
@@ -51,6 +428,135 @@ def run():
         default=None,
         help='Stylesheet file',
     )
+    parser.add_argument(
+        '--strict',
+        action='store_true',
+        default=False,
+        help=(
+            'Fail on attributes which do not apply to the element they '
+            'are defined on instead of dropping them.'
+        ),
+    )
+    parser.add_argument(
+        '--strict-endpoints',
+        action='store_true',
+        default=False,
+        help='Fail on edge endpoints which do not name a node.',
+    )
+
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        default=False,
+        help=(
+            'Read the nodes, edges and subgraphs of the input one at a '
+            'time while drawing, the input file must be seekable.'
+        ),
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        default=False,
+        help=(
+            'Write the dot source while the model is walked instead of '
+            'building it in memory with the graphviz library.'
+        ),
+    )
+
+    parser.add_argument(
+        '--subgraph-jobs',
+        type=int,
+        default=1,
+        help=(
+            'Number of processes walking the top level subgraphs of the '
+            'model, which are merged in the order of the model.'
+        ),
+    )
+
+    parser.add_argument(
+        '-T', '--format',
+        default=None,
+        help=(
+            'Lay out the graph with Graphviz and render it in this output '
+            'format, e.g. svg or png, instead of writing the dot source.'
+        ),
+    )
+    parser.add_argument(
+        '--outfile',
+        default=None,
+        help=(
+            'File to write the rendered graph, or the dot source when '
+            'watching, to. Defaults to stdout'
+        ),
+    )
+    parser.add_argument(
+        '--engine',
+        default='dot',
+        help='Graphviz layout engine used when rendering',
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        default=None,
+        help='Seconds after which laying out a graph fails',
+    )
+    parser.add_argument(
+        '--timings',
+        action='store_true',
+        default=False,
+        help='Report the time spent drawing and laying out on stderr',
+    )
+
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        default=False,
+        help=(
+            'Draw the model again whenever it or the stylesheet changes, '
+            'only redrawing the top level subgraphs which changed.'
+        ),
+    )
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=0.5,
+        help='Seconds between checking the watched files for changes',
+    )
+    parser.add_argument(
+        '--trace',
+        type=FileType(mode='w'),
+        default=None,
+        help=(
+            'Write the time spent drawing each node, edge and subgraph to '
+            'this file as json lines'
+        ),
+    )
+    parser.add_argument(
+        '--profile',
+        type=FileType(mode='w'),
+        default=None,
+        help=(
+            'Write the time and allocations of each phase of drawing and '
+            'counters of the work done to this file as json'
+        ),
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=None,
+        help=(
+            'Directory caching the dot source and rendered graphs of '
+            'unchanged models, stylesheets and overlay arguments'
+        ),
+    )
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=256 * 1024 * 1024,
+        help=(
+            'Bytes the cache may grow to before the least recently used '
+            'entries are removed'
+        ),
+    )
 
     subparsers = parser.add_subparsers(
         title='Overlays',
@@ -66,6 +572,97 @@ def run():
         for arg, params in args.items():
             arg = arg.replace('_', '-')
             subparser.add_argument(f'--{arg}', **params)
-        subparser.set_defaults(overlay=overlay)
+        subparser.set_defaults(overlay=overlay, func=main)
+
+    subparser = subparsers.add_parser(
+        'batch',
+        help='Render every view listed in a views file.',
+    )
+    subparser.add_argument(
+        'views',
+        type=FileType(mode='r'),
+        help='Json file listing the views to render',
+    )
+    subparser.add_argument(
+        '-o', '--outdir',
+        default='.',
+        help='Directory the output files of the views are written to',
+    )
+    subparser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of processes rendering views',
+    )
+    subparser.add_argument(
+        '--render-jobs',
+        type=int,
+        default=1,
+        help='Number of layout processes run at the same time with --format',
+    )
+    subparser.set_defaults(func=batch)
+
+    subparser = subparsers.add_parser(
+        'compile',
+        help=(
+            'Write the model to a binary file, which is drawn without '
+            'parsing it.'
+        ),
+    )
+    subparser.add_argument(
+        'output',
+        help='Compiled model file, given as the input of other commands',
+    )
+    subparser.set_defaults(func=compile_file)
+
+    subparser = subparsers.add_parser(
+        'serve',
+        help='Draw the graphs requested over a Unix socket or HTTP.',
+    )
+    listen = subparser.add_mutually_exclusive_group(required=True)
+    listen.add_argument(
+        '--socket',
+        help='Unix socket answering a json line for each request line',
+    )
+    listen.add_argument(
+        '--port',
+        type=int,
+        help='Port answering json requests POSTed over HTTP',
+    )
+    subparser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='Address the HTTP port is bound to',
+    )
+    subparser.add_argument(
+        '--stylesheets',
+        default=None,
+        help='Directory of the json stylesheets requests refer to by name',
+    )
+    subparser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='Number of threads drawing requests',
+    )
+    subparser.set_defaults(func=serve)
 
-    main(parser.parse_args())
+    opts = parser.parse_args()
+    if opts.func is main and opts.watch:
+        unsupported = [
+            option
+            for option, given in [
+                ('--stream', opts.stream),
+                ('--incremental', opts.incremental),
+                ('--cache-dir', opts.cache_dir),
+                ('--profile', opts.profile),
+                ('--trace', opts.trace),
+                ('--subgraph-jobs', opts.subgraph_jobs != 1),
+            ]
+            if given
+        ]
+        if unsupported:
+            parser.error(
+                f'--watch cannot be combined with {", ".join(unsupported)}'
+            )
+    opts.func(opts)
@@ -0,0 +1,528 @@
+"""
+Compiled model files, loaded by mapping them into memory.
+
+A model file holds a model in the form of graphviz_overlay.ir, written
+once by the ``compile`` command and drawn any number of times::
+
+    graphviz-overlay -i model.json compile model.gvo
+    graphviz-overlay -i model.gvo digraph
+
+Loading a model file maps it into memory and reads nothing but its
+header. The levels of the model are read as they are walked: the ids,
+endpoints and attributes of their elements are columns of indices read
+in place, into a table of the strings of the model and a table of its
+distinct attribute dictionaries, stored as json. A string or attribute
+dictionary is decoded when first used.
+
+Drawing a selection of a model removing the deselected elements leaves
+out the subgraphs which cannot be selected without reading them, as a
+level tells which of its subgraphs have elements with paths within
+them. Edges ending at their nodes are found to end at removed nodes by
+looking the endpoints up in a hash index of the ids of all nodes, see
+ModelFile.node_ids. Hashing a model file, for the cache, reads the
+digest of its content written in the header.
+
+The file starts with a header, all integers are little endian::
+
+    magic "GVOM", version, offsets of the string table, the attribute
+    table, the top level and the node id index, and the sha256 digest
+    of everything following the header
+
+A table of n entries is n, the offsets of the entries and their end
+relative to the data which follows, and the data. A level is::
+
+    the index of its attributes, which of nodes, edges and subgraphs it
+    has, and the counts of its nodes, edges, subgraphs, node path groups
+    and edge path groups, followed by the columns of
+    node ids, node attributes, edge tails, edge heads, edge attributes
+    (indices of 4 bytes), the names, the offsets and whether elements
+    within have paths of its subgraphs (8 bytes), and the path groups of
+    the nodes and of the edges, each the index of its paths, its element
+    count and the element indices.
+
+The node id index is its size, a power of two, and the slots of the
+string indices of the node ids plus one, 0 for empty slots, each id
+probed for from the crc32 of its utf-8 bytes.
+
+Attribute index 0 is the empty dictionary. Decoded attribute
+dictionaries are shared and must not be modified.
+"""
+from array import array
+from collections.abc import Mapping
+import hashlib
+import json
+import mmap
+import struct
+import sys
+import zlib
+
+from graphviz_overlay.ir import ModelIR, NodeTable, EdgeTable, PathIndex
+from graphviz_overlay.ir import element_keys, _empty
+from graphviz_overlay.symbols import node_id
+
+MAGIC = b'GVOM'
+VERSION = 2
+
+_header = struct.Struct('<4sIQQQQ32s')
+_level = struct.Struct('<IIIIIII')
+_count = struct.Struct('<Q')
+_group = struct.Struct('<II')
+
+# Flags of the elements a level has.
+_has_nodes = 1
+_has_edges = 2
+_has_subgraphs = 4
+
+
+def is_model_file(path) -> bool:
+    """Whether the file at the path is a model file."""
+    try:
+        with open(path, mode='rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except (OSError, TypeError):
+        return False
+
+
+class _TableWriter(object):
+    """Assigns indices to distinct entries, written as a table."""
+
+    def __init__(self, entries=()):
+        self.index = {}
+        self.entries = []
+        for entry in entries:
+            self.add(entry)
+
+    def add(self, entry: bytes) -> int:
+        index = self.index.get(entry)
+        if index is None:
+            index = self.index[entry] = len(self.entries)
+            self.entries.append(entry)
+        return index
+
+    def write(self, f) -> int:
+        """Write the table at the end of the file, returns its offset."""
+        offset = _pad(f)
+        f.write(_count.pack(len(self.entries)))
+        offsets = [0]
+        for entry in self.entries:
+            offsets.append(offsets[-1] + len(entry))
+        f.write(_indices('Q', offsets))
+        for entry in self.entries:
+            f.write(entry)
+        return offset
+
+
+def _pad(f) -> int:
+    """Align the end of the file to 8 bytes, returns the end."""
+    offset = f.tell()
+    if offset % 8:
+        f.write(b'\0' * (8 - offset % 8))
+        offset = f.tell()
+    return offset
+
+
+def _indices(typecode, values) -> bytes:
+    values = array(typecode, values)
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values.tobytes()
+
+
+class _DigestWriter(object):
+    """Writes to a file, hashing what is written."""
+
+    def __init__(self, f):
+        self.f = f
+        self.digest = hashlib.sha256()
+
+    def write(self, data):
+        self.digest.update(data)
+        return self.f.write(data)
+
+    def tell(self):
+        return self.f.tell()
+
+
+def write_model_file(model: dict, f):
+    """
+    Write a model to a binary file opened for writing.
+
+    Nested subgraphs are written before the level containing them,
+    without recursion.
+    """
+    strings = _TableWriter()
+    attributes = _TableWriter([b'{}'])
+    node_ids = set()
+
+    def string(value) -> int:
+        return strings.add(str(value).encode())
+
+    def attributes_of(element: dict, exclude=()) -> int:
+        values = {
+            key: value
+            for key, value in element.items()
+            if key not in exclude
+        }
+        if not values:
+            return 0
+        return attributes.add(
+            json.dumps(values, ensure_ascii=False).encode()
+        )
+
+    f.write(_header.pack(MAGIC, VERSION, 0, 0, 0, 0, bytes(32)))
+    header_end = f.tell()
+    writer = _DigestWriter(f)
+
+    # Levels are written once the levels of their subgraphs are, their
+    # offsets kept with whether elements within them have paths.
+    written = {}
+    stack = [(model, False)]
+    while stack:
+        level_model, ready = stack.pop()
+        subgraphs = level_model.get('subgraphs', {})
+        if not ready:
+            stack.append((level_model, True))
+            stack.extend(
+                (subgraph, False) for subgraph in subgraphs.values()
+            )
+            continue
+
+        nodes = level_model.get('nodes', {})
+        edges = level_model.get('edges', [])
+        flags = (
+            (_has_nodes if 'nodes' in level_model else 0)
+            | (_has_edges if 'edges' in level_model else 0)
+            | (_has_subgraphs if 'subgraphs' in level_model else 0)
+        )
+        node_paths = PathIndex()
+        for index, node in enumerate(nodes.values()):
+            node_paths.add(node.get('paths'), index)
+        edge_paths = PathIndex()
+        for index, edge in enumerate(edges):
+            edge_paths.add(edge.get('paths'), index)
+        subgraph_levels = [
+            written.pop(id(subgraph)) for subgraph in subgraphs.values()
+        ]
+
+        prefix = '' if level_model is model else level_model.get(
+            'prefix', '',
+        )
+        node_ids.update(string(node_id(prefix, name)) for name in nodes)
+
+        offset = _pad(writer)
+        written[id(level_model)] = (offset, int(
+            any(paths for paths in node_paths.groups)
+            or any(paths for paths in edge_paths.groups)
+            or any(within for _, within in subgraph_levels)
+        ))
+        writer.write(_level.pack(
+            attributes_of(level_model, exclude=element_keys),
+            flags,
+            len(nodes),
+            len(edges),
+            len(subgraphs),
+            len(node_paths.groups),
+            len(edge_paths.groups),
+        ))
+        writer.write(_indices('I', [string(name) for name in nodes]))
+        writer.write(_indices('I', [
+            attributes_of(node) for node in nodes.values()
+        ]))
+        writer.write(_indices('I', [
+            string(edge['from']) for edge in edges
+        ]))
+        writer.write(_indices('I', [string(edge['to']) for edge in edges]))
+        writer.write(_indices('I', [
+            attributes_of(edge, exclude=('from', 'to')) for edge in edges
+        ]))
+        _pad(writer)
+        writer.write(_indices('Q', [string(name) for name in subgraphs]))
+        writer.write(_indices('Q', [
+            subgraph_offset for subgraph_offset, _ in subgraph_levels
+        ]))
+        writer.write(_indices('Q', [
+            within for _, within in subgraph_levels
+        ]))
+        for path_index in (node_paths, edge_paths):
+            for paths, indices in path_index.items():
+                writer.write(_group.pack(
+                    attributes.add(json.dumps(list(paths)).encode()),
+                    len(indices),
+                ))
+                writer.write(_indices('I', indices))
+
+    root = written.pop(id(model))[0]
+    string_table = strings.write(writer)
+    attribute_table = attributes.write(writer)
+    node_index = _write_node_index(writer, strings.entries, node_ids)
+    f.seek(0)
+    f.write(_header.pack(
+        MAGIC, VERSION, string_table, attribute_table, root, node_index,
+        writer.digest.digest(),
+    ))
+    assert header_end == _header.size
+
+
+def _write_node_index(f, strings, node_ids) -> int:
+    """Write the hash index of the node ids, returns its offset."""
+    size = 1
+    while size < 2 * len(node_ids):
+        size *= 2
+    mask = size - 1
+    slots = [0] * size
+    for index in sorted(node_ids):
+        slot = zlib.crc32(strings[index]) & mask
+        while slots[slot]:
+            slot = (slot + 1) & mask
+        slots[slot] = index + 1
+
+    offset = _pad(f)
+    f.write(_count.pack(size))
+    f.write(_indices('I', slots))
+    return offset
+
+
+class _Table(object):
+    """The entries of a table in a model file, decoded once used."""
+
+    def __init__(self, buffer, offset: int):
+        self.buffer = buffer
+        count = _count.unpack_from(buffer, offset)[0]
+        start = offset + _count.size
+        self._offsets = buffer[start:start + 8 * (count + 1)].cast('Q')
+        self._data = start + 8 * (count + 1)
+        self._decoded = {}
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _bytes(self, index: int) -> bytes:
+        data = self._data
+        return self.buffer[
+            data + self._offsets[index]:data + self._offsets[index + 1]
+        ]
+
+    def __getitem__(self, index: int):
+        try:
+            return self._decoded[index]
+        except KeyError:
+            value = self._decoded[index] = self._decode(self._bytes(index))
+            return value
+
+    def _decode(self, data):
+        return sys.intern(str(data, 'utf-8'))
+
+
+class _AttributeTable(_Table):
+
+    def _decode(self, data):
+        return json.loads(str(data, 'utf-8'))
+
+
+class _Column(object):
+    """A column of indices into a table, read as they are used."""
+    __slots__ = ('table', 'indices')
+
+    def __init__(self, table: _Table, indices):
+        self.table = table
+        self.indices = indices
+
+    def __getitem__(self, index: int):
+        return self.table[self.indices[index]]
+
+    def __iter__(self):
+        table = self.table
+        for index in self.indices:
+            yield table[index]
+
+    def __len__(self):
+        return len(self.indices)
+
+
+class _NodeIndex(object):
+    """The ids of all nodes of a model file, looked up by their hash."""
+
+    def __init__(self, strings: _Table, buffer, offset: int):
+        self.strings = strings
+        size = _count.unpack_from(buffer, offset)[0]
+        start = offset + _count.size
+        self._slots = buffer[start:start + 4 * size].cast('I')
+        self._mask = size - 1
+
+    def __contains__(self, nodeid) -> bool:
+        if not isinstance(nodeid, str):
+            return False
+        data = nodeid.encode()
+        slots = self._slots
+        mask = self._mask
+        slot = zlib.crc32(data) & mask
+        while slots[slot]:
+            if self.strings._bytes(slots[slot] - 1) == data:
+                return True
+            slot = (slot + 1) & mask
+        return False
+
+
+class _Subgraphs(Mapping):
+    """The subgraphs of a level, each read when first used."""
+
+    def __init__(self, model_file, names, offsets, paths_within):
+        self.model_file = model_file
+        self._names = names
+        self._offsets = offsets
+        self._paths_within = paths_within
+        self._positions = None
+        self._levels = {}
+
+    def _position(self, name) -> int:
+        if self._positions is None:
+            self._positions = {
+                subgraph_name: position
+                for position, subgraph_name in enumerate(self._names)
+            }
+        return self._positions[name]
+
+    def paths_within(self, name) -> bool:
+        """Whether any element within the subgraph has paths, read
+        without reading the subgraph."""
+        return bool(self._paths_within[self._position(name)])
+
+    def __getitem__(self, name):
+        position = self._position(name)
+        level = self._levels.get(position)
+        if level is None:
+            level = self._levels[position] = self.model_file.level(
+                self._offsets[position],
+            )
+        return level
+
+    def __iter__(self):
+        return iter(self._names)
+
+    def __len__(self):
+        return len(self._names)
+
+
+class MappedLevel(ModelIR):
+    """A level of a model file, pickled as a reference to the file."""
+    __slots__ = ('model_file', 'offset')
+
+    def __reduce__(self):
+        return self.model_file.level, (self.offset,)
+
+
+class ModelFile(object):
+    """
+    A model file mapped into memory.
+
+    ``model`` is its top level, drawn like any compiled model. The file
+    stays mapped while any of its levels is used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, mode='rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buffer = memoryview(self._map)
+        (
+            magic, version, strings, attributes, root, node_index,
+            self.digest,
+        ) = _header.unpack_from(self.buffer)
+        if sys.byteorder != 'little':
+            raise ValueError('model files are only mapped little endian')
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a compiled model file')
+        if version != VERSION:
+            raise ValueError(
+                f'{path} is a compiled model file of version {version}, '
+                f'expected {VERSION}'
+            )
+        self.strings = _Table(self.buffer, strings)
+        self.attributes = _AttributeTable(self.buffer, attributes)
+        self.attributes._decoded[0] = _empty
+        self.node_ids = _NodeIndex(self.strings, self.buffer, node_index)
+        self.model = self.level(root)
+
+    def __reduce__(self):
+        return ModelFile, (self.path,)
+
+    def level(self, offset: int) -> MappedLevel:
+        """The level written at the offset."""
+        buffer = self.buffer
+        (
+            attributes, flags, node_count, edge_count, subgraph_count,
+            node_groups, edge_groups,
+        ) = _level.unpack_from(buffer, offset)
+
+        level = MappedLevel(dict(self.attributes[attributes]))
+        level.model_file = self
+        level.offset = offset
+        start = offset + _level.size
+        end = start + 8 * node_count + 12 * edge_count
+        end += -end % 8
+        groups_start = end + 24 * subgraph_count
+        node_paths, edge_paths = self._path_indices(
+            groups_start, node_groups, edge_groups,
+        )
+
+        if flags & _has_nodes:
+            ids, node_attributes = _columns(buffer, start, 'I', 4, 2 * [
+                node_count,
+            ])
+            # Built without the empty columns of a new table.
+            nodes = level.nodes = NodeTable.__new__(NodeTable)
+            nodes.ids = _Column(self.strings, ids)
+            nodes.attributes = _Column(self.attributes, node_attributes)
+            nodes.paths = node_paths
+        if flags & _has_edges:
+            tails, heads, edge_attributes = _columns(
+                buffer, start + 8 * node_count, 'I', 4, 3 * [edge_count],
+            )
+            edges = level.edges = EdgeTable.__new__(EdgeTable)
+            edges.symbols = self.strings
+            edges.tails = tails
+            edges.heads = heads
+            edges.attributes = _Column(self.attributes, edge_attributes)
+            edges.paths = edge_paths
+        if flags & _has_subgraphs:
+            names, offsets, paths_within = _columns(
+                buffer, end, 'Q', 8, 3 * [subgraph_count],
+            )
+            level.subgraphs = _Subgraphs(
+                self, _Column(self.strings, names), offsets, paths_within,
+            )
+        return level
+
+    def _path_indices(self, offset, *group_counts):
+        """The PathIndex of the nodes and of the edges of a level."""
+        buffer = self.buffer
+        path_indices = []
+        for group_count in group_counts:
+            path_index = PathIndex()
+            for _ in range(group_count):
+                paths, count = _group.unpack_from(buffer, offset)
+                offset += _group.size
+                path_index.groups[tuple(self.attributes[paths])] = (
+                    buffer[offset:offset + 4 * count].cast('I')
+                )
+                offset += 4 * count
+            path_indices.append(path_index)
+        return path_indices
+
+
+def _columns(buffer, offset, typecode, size, counts):
+    """Consecutive columns of the counts of integers at the offset."""
+    columns = []
+    for count in counts:
+        if count:
+            end = offset + size * count
+            columns.append(buffer[offset:end].cast(typecode))
+            offset = end
+        else:
+            columns.append(())
+    return columns
+
+
+def load_model_file(path) -> MappedLevel:
+    """Map a model file into memory, returns its top level."""
+    return ModelFile(path).model
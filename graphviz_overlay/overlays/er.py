@@ -17,21 +17,35 @@ class EntityRelationship(Graph):
         'cardinality': {},
     }
 
-    def walk_model(self, ctx, model):
-        self.add_domains(ctx, model.get('domains', {}))
-        self.add_entity_relationships(ctx, model)
-        self.add_ranks(ctx, model.get('ranks', {}))
-
-    def add_domains(self, ctx, domains):
-        for name, domain in domains.items():
-            self.add_domain(ctx, name, domain)
+    @staticmethod
+    def compile_model(model):
+        return model
 
-    def add_domain(self, ctx, name, domain):
-        graphname = f'cluster_{name}'
+    def preprocess_model(self, model, current_path=''):
+        return model
 
-        new_ctx = ctx.new_context(graphname, name, domain)
-        self.walk_model(new_ctx, domain)
-        ctx.add_subgraph_from_context(new_ctx)
+    def walk_model(self, ctx, model):
+        """Draw the domains, then the entities and relationships of a model.
+
+        Domains are followed with a stack rather than recursion, so the
+        depth of a model is not limited by the recursion limit.
+        """
+        stack = [(ctx, model, iter(model.get('domains', {}).items()))]
+        while stack:
+            ctx, model, domains = stack[-1]
+            entry = next(domains, None)
+            if entry is not None:
+                name, domain = entry
+                domain_ctx = ctx.new_context(f'cluster_{name}', name, domain)
+                subdomains = iter(domain.get('domains', {}).items())
+                stack.append((domain_ctx, domain, subdomains))
+                continue
+
+            stack.pop()
+            self.add_entity_relationships(ctx, model)
+            self.add_ranks(ctx, model.get('ranks', {}))
+            if stack:
+                stack[-1][0].add_subgraph_from_context(ctx)
 
     def add_entity_relationships(self, ctx, model):
         self.add_entities(ctx, model.get('entities', {}))
@@ -1,5 +1,12 @@
-import graphviz
-from graphviz_overlay import GraphContext
+from array import array
+
+from graphviz_overlay import GraphContext, quoting
+from graphviz_overlay.ir import ModelIR, NodeTable, EdgeTable, Selection
+from graphviz_overlay.ir import compile_model
+from graphviz_overlay.jsonstream import loads, node_ids
+from graphviz_overlay.profiling import phase
+from graphviz_overlay.selectors import PathSelector
+from graphviz_overlay.symbols import SymbolTable
 
 
 class Graph(object):
@@ -8,6 +15,8 @@ class Graph(object):
     """
     name = 'graph'
 
+    graph_class = quoting.Graph
+
     styles = {
         'highlighted': {
             'penwidth': '3',
@@ -39,6 +48,11 @@ class Graph(object):
         ]
         self.remove_deselected = remove_deselected
 
+        self.selector = PathSelector()
+        self.selector.add(self.selected_paths, unset=True)
+        self.selector.add(self.highlighted_paths)
+        self.selector.add(self.shaded_paths)
+
     @classmethod
     def arguments(self):
         return {
@@ -56,134 +70,451 @@ class Graph(object):
             },
         }
 
-    def draw(self, name: str, model: dict, graph_class=graphviz.Graph) -> str:
-        self.ctx.init_graph(
-            name,
-            graph_class,
-            model,
-        )
-        processed_model = self.preprocess_model(model)
-        self.walk_model(self.ctx, processed_model)
-        return self.ctx.source()
+    def draw(self, name: str, model: dict, graph_class=None) -> str:
+        profiler = self.ctx.profiler
+        if profiler is not None:
+            begun = profiler.begin()
+        compiled = self.compile_model(model)
+        if profiler is not None and compiled is not model:
+            profiler.end('compile', begun)
+        model = compiled
+        with phase(profiler, 'stylesheet'):
+            self.ctx.init_graph(
+                name,
+                graph_class or self.graph_class,
+                model,
+            )
+        with phase(profiler, 'preprocess'):
+            processed_model = self.preprocess_model(model)
+        with phase(profiler, 'walk'):
+            self.walk_model(self.ctx, processed_model)
+        with phase(profiler, 'source'):
+            self.ctx.close()
+            return self.ctx.source()
 
     def source(self):
         return self.ctx.source()
 
+    @staticmethod
+    def compile_model(model):
+        """
+        The model as walked by the overlay, see graphviz_overlay.ir.
+
+        Compiling a model once before drawing it with several overlays
+        or options saves compiling it on every draw.
+        """
+        if getattr(model, 'streamed', False) or isinstance(model, ModelIR):
+            return model
+        return compile_model(model)
+
     def preprocess_model(self, model, current_path=''):
         """
         Preprocess the model selecting only elements in selected paths
-        :returns: A filtered version of the model
+
+        The model is not modified, the decisions made for its elements
+        are recorded in the returned overlay which references them. The
+        nodes are declared in a SymbolTable resolving the endpoints of
+        the edges when walked, see check_endpoints.
+
+        :returns: A ModelOverlay of the elements to draw.
+        """
+        if getattr(model, 'streamed', False):
+            return self.preprocess_streamed_model(model)
+
+        symbols = self.symbol_table(model)
+        processed_model = self._preprocess_level(model, current_path, symbols)
+        processed_model.subgraphs = self.preprocess_subgraphs(
+            model.get('subgraphs', {}),
+            [current_path] if current_path else [],
+            current_path,
+            symbols,
+            processed_model.scope,
+        )
+        self.check_endpoints(self.ctx, [processed_model])
+        return processed_model
+
+    def symbol_table(self, model) -> SymbolTable:
+        """
+        The SymbolTable to preprocess a model with.
+
+        When removing deselected elements from a model file, the
+        subgraphs which cannot be selected are left out without being
+        read, the ids of their nodes are looked up in the file instead.
+        """
+        model_file = getattr(model, 'model_file', None)
+        if self.remove_deselected and model_file is not None:
+            return SymbolTable(model_file.node_ids)
+        return SymbolTable()
+
+    def _preprocess_level(self, model, current_path, symbols=None,
+                          scope=None, prefix=''):
+        """
+        The overlay of the nodes and edges of one level of a model.
+
+        :param symbols: A SymbolTable to declare the nodes in, within the
+            scope of the enclosing level.
+        :param prefix: The prefix of the node ids of the level.
         """
-        new_model = model.copy()
         paths = []
         if current_path:
             paths.append(current_path)
 
-        new_model['nodes'] = self.preprocess_nodes(
-            model.get('nodes', {}),
-            paths,
-        )
+        nodes = model.get('nodes', {})
+        selected_nodes = self.preprocess_nodes(nodes, paths)
+        if symbols is not None:
+            scope = symbols.scope(prefix, scope)
+            self._declare_nodes(symbols, scope, prefix, nodes, selected_nodes)
 
-        new_model['edges'] = self.preprocess_edges(
-            model.get('edges', {}),
-            paths,
+        return ModelOverlay(
+            model,
+            nodes=selected_nodes,
+            edges=self.preprocess_edges(
+                model.get('edges', []),
+                paths,
+            ),
+            subgraphs=[],
+            symbols=symbols,
+            scope=scope,
         )
 
-        new_model['subgraphs'] = self.preprocess_subgraphs(
-            model.get('subgraphs', {}),
-            paths,
-            current_path,
+    def _declare_nodes(self, symbols, scope, prefix, nodes, selected_nodes):
+        """Declare the nodes of a level, only the selected are drawn."""
+        names = nodes.ids if isinstance(nodes, NodeTable) else nodes
+        drawn = not self.remove_deselected
+        symbols.declare_all(scope, prefix, names, drawn)
+        if not drawn:
+            symbols.declare_all(
+                scope, prefix, (entry[0] for entry in selected_nodes),
+            )
+
+    def preprocess_streamed_model(self, model):
+        """
+        Preprocess a model read incrementally, see StreamedModel.
+
+        The collections of the returned overlay preprocess each element
+        as it is read while the overlay is walked, declaring the nodes
+        of each subgraph as it is read. When removing deselected
+        elements, elements which cannot be selected are dropped before
+        their source is parsed.
+
+        Edges may name the nodes of any subgraph, so when removing
+        deselected elements or checking endpoints the model is read once
+        more first, declaring all its nodes, see declare_streamed_nodes.
+        """
+        symbols = SymbolTable()
+        if self.remove_deselected or self.ctx.strict_endpoints:
+            self.declare_streamed_nodes(model, symbols)
+        return ModelOverlay(
+            model,
+            nodes=self._stream_nodes(model.get('nodes')),
+            edges=self._stream_edges(model.get('edges')),
+            subgraphs=self._stream_subgraphs(
+                model.get('subgraphs'), symbols,
+            ),
+            symbols=symbols,
         )
 
-        return new_model
+    def declare_streamed_nodes(self, model, symbols):
+        """
+        Declare every node of a streamed model and check the endpoints
+        of its edges, see check_endpoints.
 
-    def preprocess_nodes(self, nodes, paths):
-        selected_nodes = {}
-        for nodeid, node in nodes.items():
-            node_paths = paths + node.get('paths', [])
-            if (
-                not self.in_a_selected_path(node_paths)
-                and self.remove_deselected
-            ):
+        Nodes which cannot be selected are declared as removed from
+        their names, without parsing them.
+        """
+        nodes = model.get('nodes')
+        if nodes is not None:
+            for nodeid, raw in nodes.raw_items():
+                drawn = not self._cannot_be_selected(raw) and (
+                    self.preprocess_node(nodeid, loads(raw), []) is not None
+                )
+                symbols.declare(None, '', nodeid, drawn)
+
+        # Endpoints not resolved when read, before all nodes are.
+        unresolved = {}
+        if self.ctx.strict_endpoints:
+            unresolved.update(
+                (name, None)
+                for edge, _, _ in self._stream_edges(model.get('edges'))
+                for name in (edge['from'], edge['to'])
+            )
+        subgraphs = model.get('subgraphs')
+        if subgraphs is not None:
+            for subgraph_name, raw in subgraphs.raw_items():
+                if self._subgraph_cannot_be_selected(subgraph_name, raw):
+                    symbols.declare_all(None, '', node_ids(raw), False)
+                    continue
+                processed = self.preprocess_subgraph(
+                    subgraph_name, loads(raw), symbols=symbols,
+                )
+                if self.ctx.strict_endpoints:
+                    unresolved.update(
+                        (name, None)
+                        for name, nodeid in self.edge_endpoints(
+                            [level for _, level in processed],
+                        )
+                        if nodeid is None
+                    )
+
+        if self.ctx.strict_endpoints:
+            self._report_dangling(
+                name for name in unresolved if name not in symbols.ids
+            )
+
+    def _stream_nodes(self, nodes):
+        if nodes is None:
+            return
+        for nodeid, raw in nodes.raw_items():
+            if self._cannot_be_selected(raw):
+                continue
+            entry = self.preprocess_node(nodeid, loads(raw), [])
+            if entry is not None:
+                yield entry
+
+    def _stream_edges(self, edges):
+        if edges is None:
+            return
+        for _, raw in edges.raw_items():
+            if self._cannot_be_selected(raw):
+                continue
+            entry = self.preprocess_edge(loads(raw), [])
+            if entry is not None:
+                yield entry
+
+    def _stream_subgraphs(self, subgraphs, symbols):
+        if subgraphs is None:
+            return
+        for subgraph_name, raw in subgraphs.raw_items():
+            if self._subgraph_cannot_be_selected(subgraph_name, raw):
                 continue
-            self.preprocess_element(node, node_paths)
+            yield from self.preprocess_subgraph(
+                subgraph_name, loads(raw), symbols=symbols,
+            )
+
+    def _subgraph_cannot_be_selected(self, subgraph_name, raw):
+        if subgraph_name.startswith('cluster_'):
+            subgraph_name = subgraph_name[8:]
+        return self._cannot_be_selected(raw, subgraph_name)
+
+    def _cannot_be_selected(self, raw, path=None):
+        """Whether the source of an element removed when deselected shows
+        that neither it nor any element within it can be selected.
+
+        Elements within are only selected by their own paths or by
+        selectors the path of the element is a prefix of.
+        """
+        if not self.remove_deselected or b'"paths"' in raw:
+            return False
+        paths = [path] if path is not None else []
+        return not (
+            self.in_a_selected_path(paths)
+            or self.partially_selected_path(paths)
+        )
 
-            selected_nodes[nodeid] = node
+    def preprocess_nodes(self, nodes, paths):
+        """:returns: A list of (node_id, node, visible, classes)"""
+        if isinstance(nodes, NodeTable):
+            return self._select(nodes, paths)
+        selected_nodes = []
+        for nodeid, node in nodes.items():
+            entry = self.preprocess_node(nodeid, node, paths)
+            if entry is not None:
+                selected_nodes.append(entry)
         return selected_nodes
 
+    def preprocess_node(self, nodeid, node, paths):
+        """:returns: (node_id, node, visible, classes) or None if removed"""
+        node_paths = paths + node['paths'] if 'paths' in node else paths
+        visible, classes = self.preprocess_element(node, node_paths)
+        if not visible and self.remove_deselected:
+            return None
+        return nodeid, node, visible, classes
+
     def preprocess_edges(self, edges, paths):
+        """:returns: A list of (edge, visible, classes)"""
+        if isinstance(edges, EdgeTable):
+            return self._select(edges, paths)
         selected_edges = []
         for edge in edges:
-            edge_paths = paths + edge.get('paths', [])
-            if (
-                not self.in_a_selected_path(edge_paths)
-                and self.remove_deselected
+            entry = self.preprocess_edge(edge, paths)
+            if entry is not None:
+                selected_edges.append(entry)
+        return selected_edges
+
+    def preprocess_edge(self, edge, paths):
+        """:returns: (edge, visible, classes) or None if removed"""
+        edge_paths = paths + edge['paths'] if 'paths' in edge else paths
+        visible, classes = self.preprocess_element(edge, edge_paths)
+        if not visible and self.remove_deselected:
+            return None
+        return edge, visible, classes
+
+    def _select(self, table, paths):
+        """
+        Preprocess the elements of a compiled table by the groups of its
+        PathIndex, elements with the same paths are selected together.
+
+        :returns: A Selection of the elements
+        """
+        selection = Selection(table)
+        for group_paths, indices in table.paths.items():
+            visible, classes = self.preprocess_element(
+                table.attributes[indices[0]],
+                paths + list(group_paths),
+            )
+            if visible or not self.remove_deselected:
+                selection.add(indices, visible, classes)
+        return selection
+
+    def preprocess_subgraphs(self, subgraphs, paths, current_path='',
+                             symbols=None, scope=None):
+        """
+        Preprocess the subgraphs and everything nested within them.
+
+        Nesting is followed with a stack rather than recursion, so the
+        depth of a model is not limited by the recursion limit. The path
+        of every subgraph on the way to the current one is a prefix of
+        its path, so only that path and the lengths of the prefixes are
+        kept.
+
+        :param symbols: A SymbolTable to declare the nodes in, with the
+            scope of the level the subgraphs are in.
+        :returns: A list of (subgraph_name, ModelOverlay)
+        """
+        selected_subgraphs = []
+        path = current_path
+        ends = [len(path)] if path else []
+        # Subgraphs and those left to preprocess, the list their overlays
+        # are added to, the number of names in the path of their parent
+        # and the scope of its nodes.
+        stack = [(
+            subgraphs, iter(subgraphs), selected_subgraphs,
+            len(ends), scope,
+        )]
+        while stack:
+            level_subgraphs, names, target, depth, scope = stack[-1]
+            subgraph_name = next(names, None)
+            if subgraph_name is None:
+                stack.pop()
+                continue
+
+            del ends[depth:]
+            parent_path = path[:ends[-1]] if ends else ''
+            if self._level_cannot_be_selected(
+                level_subgraphs, subgraph_name, parent_path, symbols,
             ):
                 continue
+            subgraph = level_subgraphs[subgraph_name]
+            entry, path, hoisted = self._preprocess_subgraph_level(
+                subgraph_name, subgraph, parent_path, symbols, scope,
+            )
+            ends.append(len(path))
+
+            if not hoisted:
+                target.append(entry)
+                target = entry[1].subgraphs
+            nested = subgraph.get('subgraphs')
+            if nested:
+                stack.append((
+                    nested, iter(nested), target, len(ends),
+                    entry[1].scope,
+                ))
+        return selected_subgraphs
 
-            self.preprocess_element(edge, edge_paths)
+    def _level_cannot_be_selected(self, subgraphs, subgraph_name,
+                                  current_path, symbols):
+        """Whether a subgraph of a model file and every element within it
+        are removed when deselected, told without reading it.
 
-            selected_edges.append(edge)
-        return selected_edges
+        Its nodes are not declared, symbols resolves endpoints naming
+        them from the ids of all nodes of the file.
+        """
+        if (
+            symbols is None
+            or symbols.node_ids is None
+            or not self.remove_deselected
+            or not hasattr(subgraphs, 'paths_within')
+            or subgraphs.paths_within(subgraph_name)
+        ):
+            return False
+        if subgraph_name.startswith('cluster_'):
+            subgraph_name = subgraph_name[8:]
+        paths = [self.subgraph_path(subgraph_name, current_path)]
+        return not (
+            self.in_a_selected_path(paths)
+            or self.partially_selected_path(paths)
+        )
 
-    def preprocess_subgraphs(self, subgraphs, paths, current_path=''):
-        selected_subgraphs = {}
-        for subgraph_name, subgraph in subgraphs.items():
+    def preprocess_subgraph(self, subgraph_name, subgraph, current_path='',
+                            symbols=None, scope=None):
+        """
+        :returns: A list of (subgraph_name, ModelOverlay), empty if the
+            subgraph is removed or its subgraphs if only it is removed.
+        """
+        return self.preprocess_subgraphs(
+            {subgraph_name: subgraph},
+            [current_path] if current_path else [],
+            current_path,
+            symbols,
+            scope,
+        )
 
-            if subgraph_name.startswith('cluster_'):
-                subgraph_name = subgraph_name[8:]
-                subgraph['cluster'] = True
+    def _preprocess_subgraph_level(self, subgraph_name, subgraph,
+                                   current_path, symbols=None, scope=None):
+        """
+        Preprocess one subgraph without the subgraphs nested within.
 
-            subgraph_path = self.subgraph_path(subgraph_name, current_path)
+        :returns: A tuple ((subgraph_name, ModelOverlay), path, hoisted)
+            where hoisted tells whether the subgraph is removed, leaving
+            its subgraphs in its place.
+        """
+        cluster = subgraph.get('cluster', False)
+        if subgraph_name.startswith('cluster_'):
+            subgraph_name = subgraph_name[8:]
+            cluster = True
 
-            paths = [subgraph_path]
+        subgraph_path = self.subgraph_path(subgraph_name, current_path)
 
-            processed_subgraph = self.preprocess_model(
-                subgraph,
-                current_path=subgraph_path,
-            )
-            self.preprocess_element(processed_subgraph, paths)
+        paths = [subgraph_path]
 
-            if (
-                not self.in_a_selected_path(paths)
-            ):
-                if self.remove_deselected:
-                    if not (
-                        processed_subgraph.get('nodes', False)
-                        or processed_subgraph.get('edges', False)
-                    ):
-                        selected_subgraphs.update(
-                            processed_subgraph.get('subgraphs', {})
-                        )
-                        return selected_subgraphs
+        processed_subgraph = self._preprocess_level(
+            subgraph,
+            subgraph_path,
+            symbols,
+            scope,
+            subgraph.get('prefix', ''),
+        )
+        processed_subgraph.cluster = cluster
+        visible, classes = self.preprocess_element(subgraph, paths)
+        processed_subgraph.visible = visible
+        processed_subgraph.classes = classes
+
+        hoisted = False
+        if not (processed_subgraph.nodes or processed_subgraph.edges):
+            if not visible:
+                hoisted = self.remove_deselected
             else:
-                if not (
-                    processed_subgraph.get('nodes', False)
-                    or processed_subgraph.get('edges', False)
-                ):
-                    processed_subgraph['visible'] = False
-            selected_subgraphs[subgraph_name] = processed_subgraph
-
-        return selected_subgraphs
+                processed_subgraph.visible = False
+        return (subgraph_name, processed_subgraph), subgraph_path, hoisted
 
     def preprocess_element(self, elem, paths):
         """Generic preprocessing of graph elements.
 
-        Applies styles based on select paths.
-        """
+        Decides the styles based on select paths.
 
-        if not self.in_a_selected_path(paths):
-            elem['visible'] = False
-        else:
-            elem['visible'] = True
+        :returns: A tuple (visible, classes) of whether the element is
+            selected and the classes to add to it.
+        """
+        selected, highlighted, shaded = self.selector.match(paths)
 
-        if self.is_highlighted(paths):
-            elem['classes'] = elem.get('classes', []) + ['highlighted']
+        classes = ()
+        if highlighted:
+            classes += ('highlighted',)
 
-        if self.is_shaded(paths):
-            elem['classes'] = elem.get('classes', []) + ['shaded']
+        if shaded:
+            classes += ('shaded',)
 
-        return elem
+        return selected, classes
 
     def subgraph_path(self, subgraph_name, current_path):
         if current_path:
@@ -191,38 +522,14 @@ class Graph(object):
         return subgraph_name
 
     def is_highlighted(self, paths):
-        return self.paths_in_paths(paths, self.highlighted_paths)
+        return self.selector.match(paths)[1]
 
     def is_shaded(self, paths):
-        return self.paths_in_paths(paths, self.shaded_paths)
+        return self.selector.match(paths)[2]
 
     def in_a_selected_path(self, paths):
         """Element is in a selected path"""
-        if self.selected_paths == ['']:
-            return True
-        return self.paths_in_paths(paths, self.selected_paths)
-
-    def paths_in_paths(self, paths, selected_paths):
-        if selected_paths == ['']:
-            return False
-
-        inverted_paths = [
-            p[1:]
-            for p in selected_paths
-            if p.startswith('^')
-        ]
-        in_inverted_path = False
-
-        for path in paths:
-            if any(path.startswith(p) for p in selected_paths):
-                return True
-
-            in_inverted_path = (
-                in_inverted_path
-                or any(path.startswith(p) for p in inverted_paths)
-            )
-
-        return (inverted_paths and not in_inverted_path)
+        return self.selector.match(paths)[0]
 
     def partially_selected_path(self, paths):
         """Is any current path prefix of a selected path.
@@ -232,36 +539,241 @@ class Graph(object):
         """
         if self.selected_paths == ['']:
             return True
-        for path in paths:
-            if any(p.startswith(path) for p in self.selected_paths):
-                return True
-        return False
+        return any(
+            self.selector.match_prefix(path)[0]
+            for path in paths
+        )
 
     def walk_model(self, ctx, model):
-        self.add_nodes(ctx, model.get('nodes', {}))
-        self.add_subgraphs(ctx, model.get('subgraphs', {}))
-        self.add_edges(ctx, model.get('edges', {}))
-        self.add_ranks(ctx, model.get('ranks', {}))
+        """Draw a preprocessed model.
+
+        Each level draws its nodes, subgraphs, edges and ranks in that
+        order. Subgraphs are followed with a stack rather than recursion,
+        so the depth of a model is not limited by the recursion limit.
+
+        The walk of every top level subgraph is a phase of the profiler
+        of the context, if any.
+
+        :param ctx: The context of the graph being drawn.
+        :param model: A ModelOverlay as returned by preprocess_model.
+        """
+        profiler = ctx.profiler
+        self.add_nodes(ctx, model.nodes)
+        stack = [(ctx, model, iter(model.subgraphs))]
+        while stack:
+            ctx, model, subgraphs = stack[-1]
+            entry = next(subgraphs, None)
+            if entry is not None:
+                subgraph_name, subgraph = entry
+                if profiler is not None and len(stack) == 1:
+                    begun = profiler.begin()
+                subgraph_ctx = self.subgraph_context(
+                    ctx, subgraph_name, subgraph,
+                )
+                self.add_nodes(subgraph_ctx, subgraph.nodes)
+                stack.append(
+                    (subgraph_ctx, subgraph, iter(subgraph.subgraphs))
+                )
+                continue
+
+            stack.pop()
+            self.add_edges(ctx, model.edges, model.symbols, model.scope)
+            self.add_ranks(ctx, model.model.get('ranks', {}))
+            if stack:
+                stack[-1][0].add_subgraph_from_context(ctx)
+                if profiler is not None and len(stack) == 1:
+                    profiler.end(f'walk/{ctx.path}', begun)
+
+    def subgraph_context(self, ctx, subgraph_name, subgraph):
+        """The context of a preprocessed subgraph within ctx."""
+        return ctx.new_context(
+            subgraph_name,
+            subgraph_name,
+            subgraph.model,
+            cluster=subgraph.cluster,
+            visible=subgraph.visible,
+            extra_classes=subgraph.classes,
+        )
 
     def add_nodes(self, ctx, nodes):
-        for node_id, attributes in nodes.items():
-            ctx.add_node(node_id, attributes)
-
-    def add_subgraphs(self, ctx, subgraphs):
-        for subgraph_name, model in subgraphs.items():
-            subgraph_ctx = ctx.new_context(
-                subgraph_name,
-                subgraph_name,
-                model,
+        for node_id, attributes, visible, classes in nodes:
+            ctx.add_node(
+                node_id,
+                attributes,
+                visible=visible,
+                extra_classes=classes,
             )
 
-            self.walk_model(subgraph_ctx, model)
+    def add_edges(self, ctx, edges, symbols=None, scope=None):
+        """
+        Add preprocessed edges, with a SymbolTable their endpoints are
+        resolved to the nodes they name in the scope.
 
-            ctx.add_subgraph_from_context(subgraph_ctx)
+        The edges of a compiled model are added in bulk, see
+        add_edge_selection.
+        """
+        if isinstance(edges, Selection):
+            self.add_edge_selection(ctx, edges, symbols, scope)
+            return
+        for edge, visible, classes in edges:
+            node_from = edge['from']
+            node_to = edge['to']
+            if symbols is not None:
+                endpoints = self.resolve_endpoints(symbols, scope, edge)
+                if endpoints is None:
+                    continue
+                node_from, node_to = endpoints
+            ctx.add_edge(
+                node_from,
+                node_to,
+                edge,
+                visible=visible,
+                extra_classes=classes,
+            )
 
-    def add_edges(self, ctx, edges):
-        for edge in edges:
-            ctx.add_edge(edge['from'], edge['to'], edge)
+    def add_edge_selection(self, ctx, selection, symbols=None, scope=None):
+        """
+        Add the selected edges of a compiled model with
+        GraphContext.add_edges.
+
+        Edges sharing attributes, visibility and classes are of the same
+        kind, and each endpoint symbol of the table is resolved once.
+        """
+        table = selection.table
+        names = table.symbols
+        tails = table.tails
+        heads = table.heads
+        attributes = table.attributes
+
+        nodeids = []
+        # Index in nodeids of the symbols resolved, None when removed.
+        resolved = {}
+        kinds = {}
+        styles = []
+        edge_tails = array('L')
+        edge_heads = array('L')
+        edge_kinds = array('L')
+        for index, visible, classes in selection.members():
+            endpoints = []
+            for symbol in (tails[index], heads[index]):
+                try:
+                    endpoint = resolved[symbol]
+                except KeyError:
+                    nodeid = names[symbol]
+                    if symbols is not None:
+                        nodeid = self.resolve_endpoint(symbols, scope, nodeid)
+                    if nodeid is None:
+                        endpoint = None
+                    else:
+                        endpoint = len(nodeids)
+                        nodeids.append(nodeid)
+                    resolved[symbol] = endpoint
+                if endpoint is None:
+                    break
+                endpoints.append(endpoint)
+            else:
+                edge_attributes = attributes[index]
+                key = (id(edge_attributes), visible, id(classes))
+                kind = kinds.get(key)
+                if kind is None:
+                    kind = kinds[key] = len(styles)
+                    styles.append((edge_attributes, visible, classes))
+                edge_tails.append(endpoints[0])
+                edge_heads.append(endpoints[1])
+                edge_kinds.append(kind)
+
+        ctx.add_edges(nodeids, edge_tails, edge_heads, edge_kinds, styles)
+
+    def resolve_endpoints(self, symbols, scope, edge):
+        """
+        The node ids of the endpoints of an edge.
+
+        :returns: A tuple (node_from, node_to), or None when removing
+            deselected elements removed a node of the edge.
+        """
+        node_from = self.resolve_endpoint(symbols, scope, edge['from'])
+        if node_from is None:
+            return None
+        node_to = self.resolve_endpoint(symbols, scope, edge['to'])
+        if node_to is None:
+            return None
+        return node_from, node_to
+
+    def resolve_endpoint(self, symbols, scope, name):
+        """
+        The node id of an edge endpoint, a dangling endpoint is drawn
+        by its name.
+
+        :returns: The node id, or None when removing deselected elements
+            removed the node.
+        """
+        nodeid = symbols.resolve(scope, name)
+        if nodeid is None:
+            return name
+        if not symbols.is_drawn(nodeid):
+            return None
+        return nodeid
+
+    def check_endpoints(self, ctx, levels):
+        """
+        With ``strict_endpoints`` set in the context, raise a ValueError
+        naming every edge endpoint of the preprocessed levels, or of the
+        levels within them, which names no node.
+        """
+        if not ctx.strict_endpoints:
+            return
+        self._report_dangling(
+            name
+            for name, nodeid in self.edge_endpoints(levels)
+            if nodeid is None
+        )
+
+    @staticmethod
+    def _report_dangling(names):
+        dangling = dict.fromkeys(names)
+        if dangling:
+            raise ValueError('edge endpoints are not nodes: ' + ', '.join(
+                f"'{name}'" for name in dangling
+            ))
+
+    def edge_endpoints(self, levels):
+        """
+        Resolve the endpoints of the edges of the preprocessed levels and
+        of the levels within them, level by level. Levels preprocessed
+        without a SymbolTable are left out.
+
+        :returns: An iterator of (name, nodeid) for every endpoint name
+            of each level, nodeid is None if it names no node.
+        """
+        stack = list(reversed(levels))
+        while stack:
+            level = stack.pop()
+            symbols = level.symbols
+            if symbols is None:
+                continue
+            scope = level.scope
+            for name in self._endpoint_names(level.edges):
+                yield name, symbols.resolve(scope, name)
+            stack.extend(
+                subgraph for _, subgraph in reversed(level.subgraphs)
+            )
+
+    @staticmethod
+    def _endpoint_names(edges):
+        """The distinct endpoint names of preprocessed edges."""
+        if isinstance(edges, Selection):
+            table = edges.table
+            symbols = dict.fromkeys(
+                symbol
+                for index, _, _ in edges.members()
+                for symbol in (table.tails[index], table.heads[index])
+            )
+            return [table.symbols[symbol] for symbol in symbols]
+        return list(dict.fromkeys(
+            name
+            for edge, _, _ in edges
+            for name in (edge['from'], edge['to'])
+        ))
 
     def add_ranks(self, ctx, ranks):
         for rank_name, rank_type in ranks.items():
@@ -275,5 +787,33 @@ class Digraph(Graph):
 
     name = 'digraph'
 
-    def draw(self, name, model):
-        return super().draw(name, model, graphviz.Digraph)
+    graph_class = quoting.Digraph
+
+
+class ModelOverlay(object):
+    """
+    The elements of one level of a model to draw.
+
+    Holds the decisions made by preprocessing next to references to the
+    elements of the model, so the model itself is never copied or
+    modified and can be drawn again with other options.
+    """
+    __slots__ = (
+        'model', 'nodes', 'edges', 'subgraphs', 'visible', 'classes',
+        'cluster', 'symbols', 'scope',
+    )
+
+    def __init__(
+        self, model: dict, nodes=(), edges=(), subgraphs=(),
+        visible: bool = True, classes: tuple = (), cluster: bool = False,
+        symbols=None, scope=None,
+    ):
+        self.model = model
+        self.nodes = nodes
+        self.edges = edges
+        self.subgraphs = subgraphs
+        self.visible = visible
+        self.classes = classes
+        self.cluster = cluster
+        self.symbols = symbols
+        self.scope = scope
@@ -0,0 +1,150 @@
+"""
+Draw the top level subgraphs of a model in a pool of processes.
+
+Each top level subgraph is walked by a worker process, which returns
+what it added to the graph as a fragment, see GraphContext.fragment.
+The fragments are added to the graph in the order of the model and the
+nodes, edges and ranks of the top level drawn as the overlay draws
+them, so the source is the same as if the model was drawn in one
+process.
+
+Every worker receives the model once and preprocesses all of it, as
+the edges of a subgraph may connect to nodes of any other. Only the
+walk, building the statements of the subgraphs, is shared out.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.profiling import phase
+from graphviz_overlay.watch import supports_incremental
+
+# Overlay and model being drawn by a worker process.
+_worker_state = {}
+
+
+def preprocess_top_level(overlay, model):
+    """
+    Preprocess a model one top level subgraph at a time.
+
+    :returns: A tuple (level, subgraphs) of the ModelOverlay of the top
+        level and a list of (subgraph_name, processed_subgraphs), as
+        returned by preprocess_subgraph, for each top level subgraph.
+    """
+    symbols = overlay.symbol_table(model)
+    level = overlay._preprocess_level(model, '', symbols)
+    subgraphs = [
+        (subgraph_name, overlay.preprocess_subgraph(
+            subgraph_name, subgraph, symbols=symbols, scope=level.scope,
+        ))
+        for subgraph_name, subgraph in model.get('subgraphs', {}).items()
+    ]
+    return level, subgraphs
+
+
+def walk_subgraphs(overlay, ctx, processed_subgraphs):
+    """
+    Walk the preprocessed subgraphs of a top level subgraph in ctx.
+
+    :returns: The fragment of ctx they added.
+    """
+    mark = ctx.fragment_mark()
+    for name, processed in processed_subgraphs:
+        subgraph_ctx = overlay.subgraph_context(ctx, name, processed)
+        overlay.walk_model(subgraph_ctx, processed)
+        ctx.add_subgraph_from_context(subgraph_ctx)
+    return ctx.fragment(mark)
+
+
+def _init_worker(overlay_class, overlay_args, stylesheet, strict, name,
+                 model):
+    overlay = overlay_class(
+        GraphContext(stylesheet, strict=strict),
+        **overlay_args,
+    )
+    _, subgraphs = preprocess_top_level(overlay, model)
+    _worker_state.update(
+        overlay=overlay, name=name, model=model, subgraphs=subgraphs,
+    )
+
+
+def _walk_worker_subgraph(index):
+    overlay = _worker_state['overlay']
+    # A new graph for every subgraph, so its fragment holds no more.
+    ctx = GraphContext(overlay.ctx.styles, strict=overlay.ctx.strict)
+    ctx.init_graph(
+        _worker_state['name'],
+        overlay.graph_class,
+        _worker_state['model'],
+    )
+    _, processed_subgraphs = _worker_state['subgraphs'][index]
+    return walk_subgraphs(overlay, ctx, processed_subgraphs)
+
+
+def draw_parallel(overlay, name: str, model, jobs: int,
+                  stylesheet: dict = None, overlay_args: dict = None) -> str:
+    """
+    Draw a model with the overlay, walking its top level subgraphs in
+    a pool of ``jobs`` processes.
+
+    The workers draw with overlays of the same class created with the
+    overlay arguments, in contexts of the stylesheet. Models which
+    cannot be drawn in parts, such as streamed models or those of
+    overlays walking models differently, are drawn by the overlay in
+    this process, as are models with less than two top level subgraphs
+    and contexts tracing every element.
+
+    :param overlay: The overlay, its context draws the graph.
+    :param stylesheet: The stylesheet the context of the overlay was
+        created with.
+    :param overlay_args: The arguments the overlay was created with.
+    :returns: The dot source of the model.
+    """
+    ctx = overlay.ctx
+    profiler = ctx.profiler
+    if profiler is not None:
+        begun = profiler.begin()
+    compiled = overlay.compile_model(model)
+    if profiler is not None and compiled is not model:
+        profiler.end('compile', begun)
+    model = compiled
+
+    if (
+        jobs <= 1
+        or getattr(model, 'streamed', False)
+        or not supports_incremental(type(overlay))
+        or len(model.get('subgraphs', {})) < 2
+        or ctx.tracer is not None
+    ):
+        return overlay.draw(name, model)
+
+    with phase(profiler, 'stylesheet'):
+        ctx.init_graph(name, overlay.graph_class, model)
+    with phase(profiler, 'preprocess'):
+        level, subgraphs = preprocess_top_level(overlay, model)
+        overlay.check_endpoints(ctx, [level] + [
+            processed
+            for _, processed_subgraphs in subgraphs
+            for _, processed in processed_subgraphs
+        ])
+
+    with phase(profiler, 'walk'):
+        with ProcessPoolExecutor(
+            max_workers=min(jobs, len(subgraphs)),
+            initializer=_init_worker,
+            initargs=(
+                type(overlay), overlay_args or {}, stylesheet, ctx.strict,
+                name, model,
+            ),
+        ) as executor:
+            fragments = executor.map(
+                _walk_worker_subgraph, range(len(subgraphs)),
+            )
+            overlay.add_nodes(ctx, level.nodes)
+            for fragment in fragments:
+                ctx.add_fragment(fragment)
+        overlay.add_edges(ctx, level.edges, level.symbols, level.scope)
+        overlay.add_ranks(ctx, model.get('ranks', {}))
+
+    with phase(profiler, 'source'):
+        ctx.close()
+        return ctx.source()
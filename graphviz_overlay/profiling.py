@@ -0,0 +1,95 @@
+"""
+Profile of the phases of drawing a graph.
+
+A Profiler records the wall time of each phase and the number of memory
+blocks it left allocated, along with counters of the work done::
+
+    {
+        "phases": [
+            {"phase": "load", "seconds": 0.012, "allocated_blocks": 5210},
+            {"phase": "walk/cluster_a", "seconds": 0.003,
+             "allocated_blocks": 88},
+            ...
+        ],
+        "counters": {"build_attributes": 120, "style_cache_hits": 117,
+                     "style_cache_misses": 3, "quote_hits": 950, ...}
+    }
+
+Phases are listed in the order they end, a phase within another such
+as the walk of a subgraph is named by its path. Allocated blocks are
+the difference of ``sys.getallocatedblocks()``, memory allocated and
+freed within a phase is not counted.
+
+Hooks added to a profiler are called with the record of every phase as
+it ends.
+"""
+from collections import Counter
+import contextlib
+import json
+import sys
+from time import perf_counter
+
+from graphviz_overlay import quoting
+from graphviz_overlay.labels import compile_label
+
+
+class Profiler(object):
+
+    def __init__(self, hooks=None):
+        self.phases = []
+        self.counters = Counter()
+        self.hooks = list(hooks or [])
+        self._labels = compile_label.cache_info()
+        self._quoting = quoting.cache_info()
+
+    def add_hook(self, hook):
+        """Call ``hook(record)`` with the record of every phase."""
+        self.hooks.append(hook)
+
+    def begin(self):
+        """Start a phase, see end."""
+        return perf_counter(), sys.getallocatedblocks()
+
+    def end(self, name: str, begun):
+        """End the phase begun, recording it as ``name``."""
+        start, blocks = begun
+        record = {
+            'phase': name,
+            'seconds': perf_counter() - start,
+            'allocated_blocks': sys.getallocatedblocks() - blocks,
+        }
+        self.phases.append(record)
+        for hook in self.hooks:
+            hook(record)
+        return record
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        begun = self.begin()
+        try:
+            yield
+        finally:
+            self.end(name, begun)
+
+    def report(self) -> dict:
+        counters = dict(self.counters)
+        labels = compile_label.cache_info()
+        counters['label_template_hits'] = labels.hits - self._labels.hits
+        counters['label_template_misses'] = (
+            labels.misses - self._labels.misses
+        )
+        quotes = quoting.cache_info()
+        counters['quote_hits'] = quotes['hits'] - self._quoting['hits']
+        counters['quote_misses'] = quotes['misses'] - self._quoting['misses']
+        return {'phases': self.phases, 'counters': counters}
+
+    def write(self, file):
+        json.dump(self.report(), file, indent=2)
+        file.write('\n')
+
+
+def phase(profiler, name: str):
+    """A phase of the profiler, or nothing without a profiler."""
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.phase(name)
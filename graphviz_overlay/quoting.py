@@ -0,0 +1,106 @@
+"""
+Memoised quoting of DOT identifiers and attributes.
+
+The same node ids and attribute values recur throughout the statements
+of a graph. The functions of this module return exactly what those of
+``graphviz.quoting`` return, but remember the quoting of the most
+recently used identifiers and attributes, up to ``cache_size`` of each.
+
+They quote the statements of the Graph and Digraph classes of this
+module, which the overlays draw, of the emitters and of edges added in
+bulk. cache_info reports how often the caches were hit.
+"""
+import functools
+
+import graphviz
+from graphviz import quoting
+
+cache_size = 2 ** 16
+
+quote = functools.lru_cache(maxsize=cache_size, typed=True)(quoting.quote)
+
+quote_edge = functools.lru_cache(maxsize=cache_size, typed=True)(
+    quoting.quote_edge
+)
+
+
+@functools.lru_cache(maxsize=cache_size, typed=True)
+def _attribute(name, value) -> str:
+    return f'{quoting.quote(name)}={quoting.quote(value)}'
+
+
+def _items(mapping):
+    # Sorted if a plain dict, as by graphviz.quoting.
+    if type(mapping) is dict:
+        return sorted(mapping.items())
+    return mapping.items()
+
+
+def _attributes(items) -> list:
+    result = []
+    for name, value in items:
+        if value is None:
+            continue
+        try:
+            result.append(_attribute(name, value))
+        except TypeError:
+            # Unhashable values are not cached.
+            result.append(f'{quoting.quote(name)}={quoting.quote(value)}')
+    return result
+
+
+def a_list(label=None, kwargs=None, attributes=None) -> str:
+    """The DOT a_list of the label and attributes."""
+    # Labels, html tables in particular, are rarely repeated and would
+    # only push identifiers out of the cache.
+    result = [f'label={quoting.quote(label)}'] if label is not None else []
+    if kwargs:
+        result += _attributes(_items(kwargs))
+    if attributes:
+        if hasattr(attributes, 'items'):
+            attributes = _items(attributes)
+        result += _attributes(attributes)
+    return ' '.join(result)
+
+
+def attr_list(label=None, kwargs=None, attributes=None) -> str:
+    """The DOT attribute list of the label and attributes."""
+    content = a_list(label, kwargs=kwargs, attributes=attributes)
+    if not content:
+        return ''
+    return f' [{content}]'
+
+
+def cache_info() -> dict:
+    """The hits and misses of the quoting caches since they were
+    cleared."""
+    info = {'hits': 0, 'misses': 0}
+    for cached in (quote, quote_edge, _attribute):
+        cached_info = cached.cache_info()
+        info['hits'] += cached_info.hits
+        info['misses'] += cached_info.misses
+    return info
+
+
+def cache_clear():
+    for cached in (quote, quote_edge, _attribute):
+        cached.cache_clear()
+
+
+class Quote(object):
+    """Quotes the statements of a graphviz graph with the memoised
+    functions."""
+
+    _quote = staticmethod(quote)
+    _quote_edge = staticmethod(quote_edge)
+
+    _a_list = staticmethod(a_list)
+    _attr_list = staticmethod(attr_list)
+
+
+class Graph(Quote, graphviz.Graph):
+    """An undirected graphviz graph quoted with the memoised functions."""
+
+
+class Digraph(Quote, graphviz.Digraph):
+    """A directed graphviz graph quoted with the memoised functions."""
@@ -0,0 +1,127 @@
+"""
+Layout and render dot source with the Graphviz executables.
+
+Each job runs the layout engine in its own process, a RenderPool bounds
+how many run at the same time.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import subprocess
+import time
+
+log = logging.getLogger(__name__)
+
+
+def render(source: str, outfile: str = None, format: str = 'svg',
+           engine: str = 'dot', timeout: float = None):
+    """
+    Layout and render dot source with a Graphviz layout engine.
+
+    :param str outfile: File to write to, the rendered output is
+        returned instead when not given.
+    :param str format: Graphviz output format, e.g. svg or png.
+    :param str engine: Layout engine executable, e.g. dot or neato.
+    :param float timeout: Seconds after which the engine is killed.
+    :returns: A tuple (seconds, output) of the layout time and the
+        rendered output if no outfile is given.
+    """
+    args = [engine, f'-T{format}']
+    if outfile:
+        args.append(f'-o{outfile}')
+
+    start = time.perf_counter()
+    try:
+        process = subprocess.run(
+            args,
+            input=source.encode(),
+            capture_output=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(
+            f'{engine} timed out after {timeout}s rendering {outfile}'
+        )
+    seconds = time.perf_counter() - start
+
+    if process.returncode:
+        raise RuntimeError(
+            f'{engine} failed rendering {outfile}: '
+            f'{process.stderr.decode(errors="replace").strip()}'
+        )
+    log.info('Rendered %s in %.3fs', outfile or format, seconds)
+    return seconds, None if outfile else process.stdout
+
+
+async def render_async(source: str, format: str = 'svg',
+                       engine: str = 'dot', timeout: float = None):
+    """
+    Layout and render dot source without blocking the event loop.
+
+    :returns: A tuple (seconds, output) of the layout time and the
+        rendered output.
+    """
+    start = time.perf_counter()
+    process = await asyncio.create_subprocess_exec(
+        engine, f'-T{format}',
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        output, stderr = await asyncio.wait_for(
+            process.communicate(source.encode()),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise RuntimeError(f'{engine} timed out after {timeout}s')
+    seconds = time.perf_counter() - start
+
+    if process.returncode:
+        raise RuntimeError(
+            f'{engine} failed: {stderr.decode(errors="replace").strip()}'
+        )
+    log.info('Rendered %s in %.3fs', format, seconds)
+    return seconds, output
+
+
+class RenderPool(object):
+    """
+    Renders dot sources with at most ``jobs`` layout processes at a time.
+
+    Use as a context manager, waiting for outstanding jobs on exit::
+
+        with RenderPool(jobs=4, format='png') as pool:
+            future = pool.submit(source, 'graph.png')
+        seconds, _ = future.result()
+    """
+
+    def __init__(self, jobs: int = 1, format: str = 'svg',
+                 engine: str = 'dot', timeout: float = None):
+        self.format = format
+        self.engine = engine
+        self.timeout = timeout
+        # The work happens in the layout processes, threads only wait.
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+
+    def submit(self, source: str, outfile: str = None):
+        """Schedule a render, returning a future of what render returns."""
+        return self._executor.submit(
+            render,
+            source,
+            outfile,
+            format=self.format,
+            engine=self.engine,
+            timeout=self.timeout,
+        )
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
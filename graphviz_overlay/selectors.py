@@ -0,0 +1,103 @@
+"""
+Compiled path selectors.
+
+Paths are plain strings, a selector selects every path it is a prefix of
+while a selector prefixed with ``^`` selects elements that have no path
+it is a prefix of.
+"""
+
+
+class PathSelector(object):
+    """
+    Several selections answered in a single pass over an element's paths.
+
+    All selectors are stored in one character trie where each entry is
+    flagged with the selections it belongs to. Matching a path walks the
+    trie once, collecting the flags of every selector that is a prefix of
+    the path, regardless of how many selectors there are::
+
+        selector = PathSelector()
+        selector.add(['a.b', '^c'], unset=True)
+        selector.add(['a'])
+        selector.match(['a.b.c'])  # (True, True)
+    """
+
+    def __init__(self):
+        # Trie nodes are [children, flags, flags of the node and below]
+        self._root = [{}, 0, 0]
+        self._selections = []
+
+    def add(self, selectors: list, unset: bool = False) -> int:
+        """Add a selection and return its index in the match results.
+
+        :param list selectors: Path selectors, ``['']`` selects nothing.
+        :param bool unset: Result for every element when no selectors
+            are given.
+        """
+        index = len(self._selections)
+        positive = 1 << (2 * index)
+        inverted = positive << 1
+
+        if selectors == ['']:
+            self._selections.append((0, 0, unset))
+            return index
+
+        has_inverted = False
+        for selector in selectors:
+            self._insert(selector, positive)
+            if selector.startswith('^'):
+                self._insert(selector[1:], inverted)
+                has_inverted = True
+
+        self._selections.append(
+            (positive, inverted if has_inverted else 0, None)
+        )
+        return index
+
+    def _insert(self, selector, flag):
+        node = self._root
+        node[2] |= flag
+        for char in selector:
+            node = node[0].setdefault(char, [{}, 0, 0])
+            node[2] |= flag
+        node[1] |= flag
+
+    def _flags(self, path):
+        node = self._root
+        flags = node[1]
+        for char in path:
+            node = node[0].get(char)
+            if node is None:
+                break
+            flags |= node[1]
+        return flags
+
+    def match(self, paths) -> tuple:
+        """Whether paths are selected by each selection in order added."""
+        flags = 0
+        for path in paths:
+            flags |= self._flags(path)
+
+        return tuple(
+            unset if unset is not None
+            else bool(flags & positive) or (
+                bool(inverted) and not flags & inverted
+            )
+            for positive, inverted, unset in self._selections
+        )
+
+    def match_prefix(self, path: str) -> tuple:
+        """Whether the path is a prefix of a selector of each selection."""
+        node = self._root
+        for char in path:
+            node = node[0].get(char)
+            if node is None:
+                flags = 0
+                break
+        else:
+            flags = node[2]
+
+        return tuple(
+            unset if unset is not None else bool(flags & positive)
+            for positive, _, unset in self._selections
+        )
@@ -0,0 +1,280 @@
+"""
+Draw graphs for clients of a long running process.
+
+Requests and responses are json objects. On a Unix socket every line
+sent is a request answered by a line, over HTTP the body of a POST is a
+request answered by the body of the response::
+
+    {
+        "model": {"nodes": {"a": {}}},
+        "stylesheet": "portal",
+        "overlay": "digraph",
+        "options": {"select": "a"},
+        "name": "G",
+        "strict": false,
+        "strict_endpoints": false,
+        "format": "svg"
+    }
+
+Only the model is required. The stylesheet is the name of a json file
+in the stylesheet directory of the server or a stylesheet object, the
+options are the arguments of the overlay. Without a format the response
+is ``{"source": "..."}``, with one the rendered graph is base64 encoded
+as ``{"format": "svg", "output": "..."}``. Failures are answered with
+``{"error": "..."}``.
+
+Stylesheets are parsed and layered with the styles of each overlay once,
+so requests sharing them also share the compiled style cascades.
+"""
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor
+import json
+import logging
+import os.path
+import threading
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.jsonstream import loads
+from graphviz_overlay.render import render_async
+
+log = logging.getLogger(__name__)
+
+http_reasons = {
+    200: 'OK',
+    400: 'Bad Request',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+
+class StylesheetStore(object):
+    """
+    Parsed stylesheets by reference, layered with the overlay styles.
+
+    A stylesheet file is parsed again once modified. At most
+    ``max_entries`` stylesheets are kept, the oldest are dropped first.
+    """
+
+    def __init__(self, directory: str = None, default: dict = None,
+                 max_entries: int = 128):
+        self.directory = directory
+        self.default = default or {}
+        self.max_entries = max_entries
+        self._stylesheets = {}
+        # Requests are drawn by several threads.
+        self._lock = threading.Lock()
+
+    def get(self, reference, overlay_class):
+        """
+        The stylesheet of a request for an overlay.
+
+        :param reference: The name of a stylesheet file, a stylesheet or
+            None for the default stylesheet of the server.
+        """
+        if reference is None:
+            key = (None, None)
+        elif isinstance(reference, dict):
+            key = (json.dumps(reference, sort_keys=True), None)
+        elif isinstance(reference, str):
+            path = self.path(reference)
+            try:
+                key = (path, os.stat(path).st_mtime_ns)
+            except FileNotFoundError:
+                raise ValueError(f"unknown stylesheet '{reference}'")
+        else:
+            raise ValueError(f'invalid stylesheet {reference!r}')
+
+        key += (overlay_class,)
+        with self._lock:
+            styles = self._stylesheets.get(key)
+        if styles is not None:
+            return styles
+
+        if reference is None:
+            stylesheet = self.default
+        elif isinstance(reference, dict):
+            stylesheet = reference
+        else:
+            with open(key[0], mode='r') as f:
+                stylesheet = json.load(f)
+        styles = GraphContext(stylesheet).styles.layer(overlay_class.styles)
+
+        with self._lock:
+            if len(self._stylesheets) >= self.max_entries:
+                del self._stylesheets[next(iter(self._stylesheets))]
+            self._stylesheets[key] = styles
+        return styles
+
+    def path(self, name: str) -> str:
+        if (
+            self.directory is None
+            or not name
+            or os.path.basename(name) != name
+            or name.startswith('.')
+        ):
+            raise ValueError(f"unknown stylesheet '{name}'")
+        return os.path.join(self.directory, f'{name}.json')
+
+
+class DrawServer(object):
+    """
+    Answers drawing requests concurrently.
+
+    Models are drawn by a pool of ``jobs`` threads and rendered by
+    layout processes, so the event loop keeps accepting requests. The
+    requests of one connection are answered in order.
+    """
+    # Longest request line accepted on a Unix socket.
+    line_limit = 1 << 26
+
+    def __init__(self, overlays: dict, stylesheets: StylesheetStore = None,
+                 jobs: int = 1, engine: str = 'dot', timeout: float = None):
+        self.overlays = overlays
+        self.stylesheets = stylesheets or StylesheetStore()
+        self.engine = engine
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+
+    def draw(self, request: dict) -> str:
+        """The dot source of a request."""
+        overlay_name = request.get('overlay', 'graph')
+        if overlay_name not in self.overlays:
+            raise ValueError(f"unknown overlay '{overlay_name}'")
+        overlay_class = self.overlays[overlay_name]
+
+        options = request.get('options', {})
+        arguments = overlay_class.arguments()
+        unknown = [option for option in options if option not in arguments]
+        if unknown:
+            raise ValueError(f'unknown options {unknown}')
+
+        ctx = GraphContext(
+            self.stylesheets.get(request.get('stylesheet'), overlay_class),
+            strict=bool(request.get('strict', False)),
+            strict_endpoints=bool(request.get('strict_endpoints', False)),
+        )
+        overlay = overlay_class(ctx, **options)
+        return overlay.draw(
+            request.get('name', 'G'),
+            request.get('model', {}),
+        )
+
+    async def handle(self, request) -> dict:
+        """:returns: The response to a request."""
+        if not isinstance(request, dict):
+            raise ValueError('request must be a json object')
+        loop = asyncio.get_running_loop()
+        source = await loop.run_in_executor(
+            self._executor, self.draw, request,
+        )
+
+        output_format = request.get('format')
+        if not output_format:
+            return {'source': source}
+        _, output = await render_async(
+            source,
+            format=output_format,
+            engine=self.engine,
+            timeout=self.timeout,
+        )
+        return {
+            'format': output_format,
+            'output': base64.b64encode(output).decode('ascii'),
+        }
+
+    async def respond(self, data: bytes):
+        """:returns: A tuple (status, response) of the request in data."""
+        try:
+            return 200, await self.handle(loads(data))
+        except (ValueError, TypeError, RuntimeError, OSError) as e:
+            return 400, {'error': str(e)}
+        except Exception:
+            log.exception('Failed answering a request')
+            return 500, {'error': 'internal error'}
+
+    async def handle_lines(self, reader, writer):
+        """Answer each line of a connection with a line."""
+        try:
+            async for line in reader:
+                if not line.strip():
+                    continue
+                _, response = await self.respond(line)
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        except ValueError as e:
+            log.warning('Invalid request line: %s', e)
+        except asyncio.CancelledError:
+            log.debug('Closing a connection, the server is closing')
+        finally:
+            await self._close(writer)
+
+    async def handle_http(self, reader, writer):
+        """Answer a single HTTP request of a connection."""
+        try:
+            request_line = await reader.readline()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+
+            method = request_line.split(b' ', 1)[0]
+            if method != b'POST':
+                status, response = 405, {'error': 'only POST is supported'}
+            else:
+                length = int(headers.get('content-length', 0))
+                body = await reader.readexactly(length)
+                status, response = await self.respond(body)
+
+            body = json.dumps(response).encode()
+            head = (
+                f'HTTP/1.1 {status} {http_reasons[status]}\r\n'
+                'Content-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\n'
+                'Connection: close\r\n'
+                '\r\n'
+            )
+            writer.write(head.encode('latin-1') + body)
+            await writer.drain()
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            log.warning('Invalid HTTP request: %s', e)
+        except asyncio.CancelledError:
+            log.debug('Closing a connection, the server is closing')
+        finally:
+            await self._close(writer)
+
+    @staticmethod
+    async def _close(writer):
+        """Close a connection, also when the server is closing."""
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    async def start_unix(self, path: str):
+        """Listen for lines of requests on a Unix socket."""
+        return await asyncio.start_unix_server(
+            self.handle_lines, path=path, limit=self.line_limit,
+        )
+
+    async def start_http(self, host: str = '127.0.0.1', port: int = 8080):
+        """Listen for HTTP requests."""
+        return await asyncio.start_server(self.handle_http, host, port)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+async def serve_forever(draw_server: DrawServer, socket: str = None,
+                        host: str = '127.0.0.1', port: int = None):
+    """Serve on a Unix socket or an HTTP port until cancelled."""
+    if socket:
+        server = await draw_server.start_unix(socket)
+    else:
+        server = await draw_server.start_http(host, port)
+    async with server:
+        await server.serve_forever()
@@ -0,0 +1,132 @@
+"""
+Layered stylesheets.
+
+A stylesheet maps class names to the attributes they define. Adding a
+stylesheet puts a new layer on top of the stylesheet it is added to
+instead of merging into a copy of it. Contexts of subgraphs reference
+their parent's stylesheet, or a layer of their own ``styles`` on top of
+it, and no layer is modified once created::
+
+    base = Stylesheet({'node': {'shape': 'box'}})
+    local = base.layer({'node': {'color': 'red'}})
+    local['node']  # {'shape': 'box', 'color': 'red'}
+    base['node']   # {'shape': 'box'}
+"""
+from collections.abc import Mapping
+
+
+def merge_class(attrs: dict, new_attrs: dict) -> dict:
+    """
+    The attributes of a class defined again by a later stylesheet.
+
+    Attributes of the later definition override the earlier ones except
+    for ``style`` lists, which are merged keeping the later order.
+    """
+    merged = dict(attrs)
+    for attr, value in new_attrs.items():
+        if attr != 'style' or not isinstance(value, list):
+            merged[attr] = value
+        elif isinstance(merged.get('style'), list):
+            merged['style'] = [
+                v for v in merged['style'] if v not in value
+            ] + value
+        else:
+            merged['style'] = list(value)
+    return merged
+
+
+class Stylesheet(Mapping):
+    """
+    An immutable stylesheet of class definitions layered on a parent.
+
+    Looking up a class merges its definitions from the outermost layer
+    to this one, the result is memoised per layer. The returned
+    attributes are shared and must not be modified.
+
+    ``compiled`` caches style cascades derived from this stylesheet, see
+    GraphContext._compile_style.
+    """
+
+    def __init__(self, classes: dict = None, parent=None):
+        self.parent = parent
+        self.classes = {
+            class_name: merge_class({}, attrs)
+            for class_name, attrs in (classes or {}).items()
+        }
+        self.compiled = {}
+        self._resolved = {}
+
+    def layer(self, classes: dict):
+        """
+        A stylesheet of the classes layered on this one.
+
+        Layering definitions which change nothing returns this
+        stylesheet, keeping what has been compiled from it.
+        """
+        if not classes or all(
+            class_name in self
+            and merge_class(self[class_name], attrs) == self[class_name]
+            for class_name, attrs in classes.items()
+        ):
+            return self
+        return Stylesheet(classes, self)
+
+    def __getitem__(self, class_name):
+        try:
+            return self._resolved[class_name]
+        except KeyError:
+            pass
+
+        # Definitions of the class from this layer outwards, up to a
+        # layer which already resolved it.
+        definitions = []
+        attrs = None
+        scope = self
+        while scope is not None:
+            if class_name in scope._resolved:
+                attrs = scope._resolved[class_name]
+                break
+            if class_name in scope.classes:
+                definitions.append(scope.classes[class_name])
+            scope = scope.parent
+
+        if attrs is None:
+            if not definitions:
+                raise KeyError(class_name)
+            attrs = {}
+        for definition in reversed(definitions):
+            attrs = merge_class(attrs, definition)
+
+        self._resolved[class_name] = attrs
+        return attrs
+
+    def _layers(self):
+        """The layers from the outermost to this one."""
+        layers = []
+        scope = self
+        while scope is not None:
+            layers.append(scope)
+            scope = scope.parent
+        return reversed(layers)
+
+    def __iter__(self):
+        seen = set()
+        for scope in self._layers():
+            for class_name in scope.classes:
+                if class_name not in seen:
+                    seen.add(class_name)
+                    yield class_name
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __contains__(self, class_name):
+        scope = self
+        while scope is not None:
+            if class_name in scope.classes:
+                return True
+            scope = scope.parent
+        return False
+
+    def __repr__(self):
+        return f'Stylesheet({dict(self)!r})'
@@ -0,0 +1,140 @@
+"""
+Node ids of a model, resolving the endpoints of edges.
+
+A node is drawn with the ``prefix`` of the subgraph declaring it, node
+``a`` of a subgraph with the prefix ``p`` is drawn as ``p_a``. An edge
+endpoint names, nearest first, a node declared in the level of the edge
+or in any enclosing level within a subgraph with a prefix, and
+otherwise the id of a node. An endpoint naming no node is dangling,
+Graphviz draws it as a node of its own.
+
+Declaring a node is a dictionary lookup, as is resolving an endpoint.
+Only levels within a subgraph with a prefix get a scope of their own.
+The table keeps the ids the names of the scope last resolved in and of
+its enclosing scopes declare, nearest last. Resolving in another scope
+leaves the scopes not enclosing it and enters those which do, so
+resolving the levels of a model in the order they are walked enters
+every scope once.
+
+Levels left out of preprocessing, like the subgraphs of a model file
+which cannot be selected, do not declare their nodes. Given the ids of
+all nodes, an endpoint naming one of them resolves to it, not drawn.
+"""
+
+
+def node_id(prefix: str, name: str) -> str:
+    """The id of a node declared in a level with the prefix."""
+    if not prefix:
+        return name
+    return f'{prefix}_{name}'
+
+
+class Scope(object):
+    """The names declared in a level within a prefixed subgraph."""
+    __slots__ = ('names', 'parent', 'depth')
+
+    def __init__(self, parent=None):
+        self.names = {}
+        self.parent = parent
+        self.depth = 1 if parent is None else parent.depth + 1
+
+
+class SymbolTable(object):
+    """
+    The ids of the nodes of a model and which of them are drawn.
+
+    :param node_ids: The ids of all nodes of the model, any not declared
+        are in levels left out and not drawn.
+    """
+
+    def __init__(self, node_ids=None):
+        self.node_ids = node_ids
+        self.ids = set()
+        # Nodes only declared as not drawn, removed by preprocessing. A
+        # node declared both ways is drawn.
+        self._removed = set()
+        # Scopes entered, outermost first, and the ids their names
+        # declare, nearest last.
+        self._entered = []
+        self._visible = {}
+
+    def scope(self, prefix: str, parent: Scope = None):
+        """The scope of a level with the prefix within parent, None for
+        levels resolving names as node ids."""
+        if not prefix and parent is None:
+            return None
+        return Scope(parent)
+
+    def declare(self, scope, prefix: str, name: str, drawn: bool = True):
+        self.declare_all(scope, prefix, (name,), drawn)
+
+    def declare_all(self, scope, prefix: str, names, drawn: bool = True):
+        """Declare the nodes of a level by their names."""
+        if scope is not None and self._is_entered(scope):
+            self._enter(None)
+        if scope is not None or prefix:
+            ids = []
+            for name in names:
+                nodeid = node_id(prefix, name)
+                if scope is not None:
+                    scope.names[name] = nodeid
+                ids.append(nodeid)
+        else:
+            ids = names
+
+        if drawn:
+            if self._removed:
+                ids = list(ids)
+                self._removed.difference_update(ids)
+            self.ids.update(ids)
+        else:
+            ids = set(ids)
+            self._removed |= (ids - self.ids) | (ids & self._removed)
+            self.ids |= ids
+
+    def is_drawn(self, nodeid) -> bool:
+        return nodeid not in self._removed
+
+    def resolve(self, scope, name):
+        """:returns: The id of the node an endpoint names, or None"""
+        entered = self._entered
+        if (entered[-1] if entered else None) is not scope:
+            self._enter(scope)
+        ids = self._visible.get(name)
+        if ids:
+            return ids[-1]
+        if name in self.ids:
+            return name
+        if self.node_ids is not None and name in self.node_ids:
+            self.declare(None, '', name, drawn=False)
+            return name
+        return None
+
+    def _is_entered(self, scope) -> bool:
+        entered = self._entered
+        return (
+            len(entered) >= scope.depth
+            and entered[scope.depth - 1] is scope
+        )
+
+    def _enter(self, scope):
+        """Resolve the names declared in the scope and those enclosing
+        it."""
+        entering = []
+        while scope is not None and not self._is_entered(scope):
+            entering.append(scope)
+            scope = scope.parent
+
+        entered = self._entered
+        visible = self._visible
+        depth = 0 if scope is None else scope.depth
+        while len(entered) > depth:
+            for name in entered.pop().names:
+                ids = visible[name]
+                ids.pop()
+                if not ids:
+                    del visible[name]
+        for scope in reversed(entering):
+            for name, nodeid in scope.names.items():
+                visible.setdefault(name, []).append(nodeid)
+            entered.append(scope)
@@ -0,0 +1,33 @@
+"""
+Structured trace of the time spent drawing each element.
+
+A Tracer given to a GraphContext writes a JSON line for every node,
+edge and subgraph added to the graph::
+
+    {"element": "node", "name": "a", "path": "sub", "start": 0.0012,
+     "seconds": 0.000031}
+
+``start`` is relative to the creation of the tracer, the ``seconds``
+of a subgraph include its elements.
+"""
+import json
+from time import perf_counter
+
+
+class Tracer(object):
+
+    def __init__(self, file):
+        self.file = file
+        self._origin = perf_counter()
+
+    def record(self, element: str, name: str, start: float, path: str = ''):
+        """Record an element whose drawing started at ``start``."""
+        end = perf_counter()
+        self.file.write(json.dumps({
+            'element': element,
+            'name': name,
+            'path': path,
+            'start': start - self._origin,
+            'seconds': end - start,
+        }))
+        self.file.write('\n')
@@ -1,7 +1,43 @@
-import json
+import logging
+
+from graphviz_overlay.jsonstream import StreamedModel, load
+from graphviz_overlay.modelfile import is_model_file, load_model_file
+
+log = logging.getLogger(__name__)
 
 
 def load_json_file(file):
     if file:
-        return json.load(file)
+        return load(file)
     return {}
+
+
+def load_json_stream(file):
+    """Load a model incrementally, see graphviz_overlay.jsonstream.
+
+    Falls back to loading the whole file if it is not seekable.
+    """
+    if not file:
+        return {}
+    binary = getattr(file, 'buffer', file)
+    if not binary.seekable():
+        log.warning(
+            'Input is not seekable, loading it at once instead of '
+            'incrementally'
+        )
+        return load(file)
+    return StreamedModel(binary)
+
+
+def load_model(file, incremental=False):
+    """Load a model, mapping compiled model files into memory, see
+    graphviz_overlay.modelfile.
+
+    :param bool incremental: Load json incrementally, see
+        load_json_stream.
+    """
+    if file and is_model_file(getattr(file, 'name', None)):
+        return load_model_file(file.name)
+    if incremental:
+        return load_json_stream(file)
+    return load_json_file(file)
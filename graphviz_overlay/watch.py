@@ -0,0 +1,142 @@
+"""
+Draw a model again as it changes, reusing what is unchanged.
+
+The output of every top level subgraph is kept with the subgraph it was
+drawn from and the nodes the endpoints of its edges resolved to. When
+the model is drawn again only the subgraphs which differ from before,
+or whose edges resolve to other nodes, are walked, the others add their
+kept output. Every subgraph is preprocessed to declare its nodes. The
+nodes, edges and ranks of the top level are drawn every time. A change
+to any other top level attribute draws everything.
+"""
+import logging
+import os
+import time
+
+from graphviz_overlay.overlays.graphviz import Graph
+from graphviz_overlay.symbols import SymbolTable
+
+log = logging.getLogger(__name__)
+
+# Keys of a model drawn by its top level on every draw.
+level_keys = frozenset(['nodes', 'edges', 'subgraphs', 'ranks'])
+
+
+def supports_incremental(overlay_class) -> bool:
+    """Whether the overlay walks models the way Graph does."""
+    return (
+        issubclass(overlay_class, Graph)
+        and overlay_class.walk_model is Graph.walk_model
+        and overlay_class.preprocess_model is Graph.preprocess_model
+    )
+
+
+class IncrementalDraw(object):
+    """
+    Draws successive versions of a model.
+
+    :param overlay_factory: Returns an overlay with a new context for
+        every draw, the options of the overlays must not change.
+    """
+
+    def __init__(self, overlay_factory, name: str = 'G'):
+        self.overlay_factory = overlay_factory
+        self.name = name
+        self.redrawn = []
+        self._attributes = None
+        self._fragments = {}
+
+    def draw(self, model: dict) -> str:
+        """:returns: The dot source of the model."""
+        overlay = self.overlay_factory()
+        if not supports_incremental(type(overlay)):
+            self.redrawn = None
+            return overlay.draw(self.name, model)
+
+        attributes = {
+            key: value
+            for key, value in model.items()
+            if key not in level_keys
+        }
+        symbols = SymbolTable()
+        level = overlay._preprocess_level(model, '', symbols)
+        subgraphs = [
+            (subgraph_name, subgraph, overlay.preprocess_subgraph(
+                subgraph_name, subgraph, symbols=symbols, scope=level.scope,
+            ))
+            for subgraph_name, subgraph in model.get('subgraphs', {}).items()
+        ]
+        overlay.check_endpoints(overlay.ctx, [level] + [
+            processed
+            for _, _, processed_subgraphs in subgraphs
+            for _, processed in processed_subgraphs
+        ])
+        if attributes != self._attributes:
+            self._attributes = attributes
+            self._fragments = {}
+
+        ctx = overlay.ctx
+        ctx.init_graph(self.name, overlay.graph_class, model)
+        overlay.add_nodes(ctx, level.nodes)
+
+        fragments = {}
+        self.redrawn = []
+        for subgraph_name, subgraph, processed_subgraphs in subgraphs:
+            endpoints = self._resolved_endpoints(
+                overlay, symbols, processed_subgraphs,
+            )
+            kept = self._fragments.get(subgraph_name)
+            if (
+                kept is not None
+                and kept[1] == endpoints
+                and kept[0] == subgraph
+            ):
+                ctx.add_fragment(kept[2])
+                fragments[subgraph_name] = kept
+                continue
+
+            mark = ctx.fragment_mark()
+            for name, processed in processed_subgraphs:
+                subgraph_ctx = overlay.subgraph_context(ctx, name, processed)
+                overlay.walk_model(subgraph_ctx, processed)
+                ctx.add_subgraph_from_context(subgraph_ctx)
+            fragments[subgraph_name] = (
+                subgraph, endpoints, ctx.fragment(mark),
+            )
+            self.redrawn.append(subgraph_name)
+        self._fragments = fragments
+
+        overlay.add_edges(ctx, level.edges, symbols, level.scope)
+        overlay.add_ranks(ctx, model.get('ranks', {}))
+        ctx.close()
+        return ctx.source()
+
+    @staticmethod
+    def _resolved_endpoints(overlay, symbols, processed_subgraphs) -> list:
+        """The node ids the edge endpoints of preprocessed subgraphs
+        resolve to, with whether the nodes are drawn."""
+        return [
+            (name, nodeid, nodeid is not None and symbols.is_drawn(nodeid))
+            for name, nodeid in overlay.edge_endpoints(
+                [processed for _, processed in processed_subgraphs],
+            )
+        ]
+
+
+def watch(paths, interval: float = 0.5):
+    """
+    Yield whenever any of the files is modified, starting right away.
+
+    Changes are found by polling the modification times, a file being
+    replaced while it is read is retried at the next poll.
+    """
+    previous = None
+    while True:
+        try:
+            current = [os.stat(path).st_mtime_ns for path in paths]
+        except FileNotFoundError:
+            current = None
+        if current is not None and current != previous:
+            previous = current
+            yield
+        time.sleep(interval)
@@ -0,0 +1,56 @@
+import json
+import os
+import stat
+import sys
+
+import pytest
+
+# Stands in for a Graphviz layout engine, writing the format and the
+# source it was given to the output file or stdout.
+fake_engine = f'''#!{sys.executable}
+import sys, time
+args = sys.argv[1:]
+fmt = next(a[2:] for a in args if a.startswith('-T'))
+out = next((a[2:] for a in args if a.startswith('-o')), None)
+source = sys.stdin.read()
+if 'sleep' in source:
+    time.sleep(5)
+if 'fail' in source:
+    sys.exit('syntax error')
+result = f'{{fmt}}:{{source}}'
+if out:
+    with open(out, 'w') as f:
+        f.write(result)
+else:
+    sys.stdout.write(result)
+'''
+
+
+@pytest.fixture
+def fake_dot(tmp_path, monkeypatch):
+    bindir = tmp_path / 'bin'
+    bindir.mkdir()
+    engine = bindir / 'dot'
+    engine.write_text(fake_engine)
+    engine.chmod(engine.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', f'{bindir}{os.pathsep}{os.environ["PATH"]}')
+    return engine
+
+
+examples_dir = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'examples',
+)
+
+
+@pytest.fixture
+def examples():
+    return examples_dir
+
+
+# Loads a model of the examples directory by its name.
+@pytest.fixture
+def load_example_model(examples):
+    def load(example):
+        with open(os.path.join(examples, f'{example}.json'), mode='r') as f:
+            return json.load(f)
+    return load
@@ -0,0 +1,55 @@
+import pytest
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.batch import load_views, render_views
+from graphviz_overlay.overlays import Digraph, EntityRelationship, Graph
+
+overlays = {
+    overlay.name: overlay
+    for overlay in [Graph, Digraph, EntityRelationship]
+}
+
+views = [
+    {'output': 'all.dot', 'overlay': 'digraph'},
+    {'output': 'foo.dot', 'overlay': 'digraph', 'select': 'foo'},
+    {
+        'output': 'removed.dot',
+        'overlay': 'graph',
+        'name': 'H',
+        'select': 'foo',
+        'remove_deselected': True,
+    },
+]
+
+
+def expected_source(view, model):
+    overlay_class = overlays[view.get('overlay', 'graph')]
+    args = {k: v for k, v in view.items() if k in overlay_class.arguments()}
+    overlay = overlay_class(GraphContext(), **args)
+    return overlay.draw(view.get('name', 'G'), model)
+
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_render_views(jobs, tmp_path, load_example_model):
+    model = load_example_model('simple')
+    outfiles = render_views(
+        model, {}, views, overlays, outdir=str(tmp_path), jobs=jobs,
+    )
+
+    assert outfiles == [str(tmp_path / view['output']) for view in views]
+    for view, outfile in zip(views, outfiles):
+        with open(outfile) as f:
+            assert f.read() == expected_source(view, model)
+
+
+def test_render_views_unknown_overlay(tmp_path):
+    with pytest.raises(ValueError, match='unknown overlay'):
+        render_views(
+            {}, {}, [{'output': 'x.dot', 'overlay': 'nope'}], overlays,
+            outdir=str(tmp_path),
+        )
+
+
+def test_load_views():
+    assert load_views({'views': views}) == views
+    assert load_views(views) == views
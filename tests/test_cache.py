@@ -0,0 +1,114 @@
+import io
+import json
+import os
+import time
+
+from graphviz_overlay.cache import RenderCache, _normalised
+from graphviz_overlay.cache import _normalised_parts
+from graphviz_overlay.jsonstream import StreamedModel
+
+
+model = {'nodes': {'a': {'label': 'A'}, 'b': {}}, 'edges': []}
+
+
+def test_key_is_normalised():
+    reordered = {'edges': [], 'nodes': {'b': {}, 'a': {'label': 'A'}}}
+    assert (
+        RenderCache.key(model, {}, 'graph', {'select': 'a'}, name='G')
+        == RenderCache.key(reordered, {}, 'graph', {'select': 'a'}, name='G')
+    )
+
+
+def test_key_depends_on_inputs():
+    key = RenderCache.key(model, {}, 'graph', {'select': 'a'}, name='G')
+    assert key != RenderCache.key(
+        {'nodes': {}}, {}, 'graph', {'select': 'a'}, name='G',
+    )
+    assert key != RenderCache.key(
+        model, {'node': {'shape': 'box'}}, 'graph', {'select': 'a'}, name='G',
+    )
+    assert key != RenderCache.key(
+        model, {}, 'digraph', {'select': 'a'}, name='G',
+    )
+    assert key != RenderCache.key(
+        model, {}, 'graph', {'select': 'b'}, name='G',
+    )
+    assert key != RenderCache.key(
+        model, {}, 'graph', {'select': 'a'}, name='H',
+    )
+
+
+def test_key_of_deeply_nested_model():
+    shallow = {'b': [1, 'é', None, {'a': (2.5, True)}], 'a': {}}
+    assert b''.join(_normalised_parts(shallow)) == _normalised(shallow)
+
+    def nested(name):
+        model = inner = {}
+        for _ in range(5000):
+            inner = inner.setdefault('subgraphs', {}).setdefault('s', {})
+        inner['nodes'] = {name: {}}
+        return model
+
+    keys = {
+        RenderCache.key(nested(name), {}, 'graph', {})
+        for name in ['a', 'a', 'b']
+    }
+    assert len(keys) == 2
+
+
+def test_key_of_streamed_model():
+    sources = [
+        json.dumps(model).encode(),
+        json.dumps(model, indent=2, sort_keys=True).encode(),
+    ]
+    keys = {
+        RenderCache.key(StreamedModel(io.BytesIO(data)), {}, 'graph', {})
+        for data in sources
+    }
+    assert keys == {RenderCache.key(model, {}, 'graph', {})}
+    assert RenderCache.key(
+        StreamedModel(io.BytesIO(b'{"nodes": {"b": {}}}')), {}, 'graph', {},
+    ) not in keys
+
+
+def test_source_key():
+    files = [io.BytesIO(json.dumps(model).encode()), None]
+    key = RenderCache.source_key(files, 'graph', {}, name='G')
+
+    assert files[0].tell() == 0
+    assert key == RenderCache.source_key(files, 'graph', {}, name='G')
+    assert key != RenderCache.source_key(files, 'graph', {}, name='H')
+    assert key != RenderCache.source_key(
+        [io.BytesIO(json.dumps(model, indent=2).encode()), None],
+        'graph', {}, name='G',
+    )
+    assert key != RenderCache.source_key(
+        [files[0], io.BytesIO(b'{}')], 'graph', {}, name='G',
+    )
+
+
+def test_get_put(tmp_path):
+    cache = RenderCache(str(tmp_path))
+    key = RenderCache.key(model, {}, 'graph', {})
+
+    assert cache.get(key, 'dot') is None
+    cache.put(key, 'dot', b'graph G {}')
+    assert cache.get(key, 'dot') == b'graph G {}'
+    assert cache.get(key, 'dot.svg') is None
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), max_size=25)
+    cache.put('aa01', 'dot', b'x' * 10)
+    cache.put('aa02', 'dot', b'x' * 10)
+    # Make the first entry the most recently used.
+    past = time.time() - 10
+    os.utime(cache.path('aa02', 'dot'), (past, past))
+    os.utime(cache.path('aa01', 'dot'), (past - 10, past - 10))
+    assert cache.get('aa01', 'dot') is not None
+
+    cache.put('bb03', 'dot', b'x' * 10)
+
+    assert cache.get('aa01', 'dot') is not None
+    assert cache.get('aa02', 'dot') is None
+    assert cache.get('bb03', 'dot') is not None
@@ -0,0 +1,58 @@
+import io
+
+import graphviz
+import pytest
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.emitter import DotDigraph, DotGraph
+from graphviz_overlay.overlays import Digraph, EntityRelationship, Graph
+
+
+@pytest.mark.parametrize('overlay_class,example,args', [
+    (Graph, 'simple', {}),
+    (Graph, 'simple', {'select': 'foo', 'highlight': 'subgraph'}),
+    (Digraph, 'cluster', {'select': '0', 'shade': '^0'}),
+    (Digraph, 'layer', {}),
+    (Digraph, 'html-record', {}),
+    (EntityRelationship, 'er', {}),
+])
+def test_stream_matches_graphviz_source(
+    overlay_class, example, args, load_example_model,
+):
+    model = load_example_model(example)
+    expect = overlay_class(GraphContext(), **args).draw('G', model)
+
+    sink = io.StringIO()
+    overlay = overlay_class(GraphContext(sink=sink), **args)
+    overlay.draw('G', model)
+
+    assert sink.getvalue() == expect
+
+
+@pytest.mark.parametrize('emitter,graph_class', [
+    (DotGraph, graphviz.Graph),
+    (DotDigraph, graphviz.Digraph),
+])
+def test_emitter_statements(emitter, graph_class):
+    expect = graph_class('G', graph_attr={'rankdir': 'LR'})
+    expect.node('a b', label='<<B>a</B>>', shape='box')
+    expect.edge('a b:p', 'c', label='edge')
+    child = graph_class('cluster_x', node_attr={'color': 'red'})
+    child.node('c')
+    expect.subgraph(child)
+    with expect.subgraph() as s:
+        s.attr(rank='same')
+        s.node('c')
+
+    g = emitter('G', graph_attr={'rankdir': 'LR'})
+    g.node('a b', label='<<B>a</B>>', shape='box')
+    g.edge('a b:p', 'c', label='edge')
+    child = g.subgraph_class('cluster_x', node_attr={'color': 'red'})
+    child.node('c')
+    g.subgraph(child)
+    with g.subgraph() as s:
+        s.attr(rank='same')
+        s.node('c')
+    g.close()
+
+    assert g.source == expect.source
@@ -1,9 +1,13 @@
 from contextlib import contextmanager
+import io
+import json
+import logging
 
 import graphviz
 import pytest
 
 from graphviz_overlay import GraphContext
+from graphviz_overlay.trace import Tracer
 
 
 def test_instance_with_default_arguments():
@@ -207,3 +211,162 @@ def test_add_rank(rank_type, expect, mocker):
             mocker.call('anothernode'),
         ],
     )
+
+
+def test_compiled_styles_invalidated_by_stylesheet(mocker):
+    gv = mocker.Mock(spec=graphviz.Graph)
+    m = mocker.Mock(return_value=gv)
+    ctx = GraphContext({'myclass': {'color': 'lightgrey'}})
+    ctx.init_graph('G', m, {})
+    ctx.add_node('anode', classes=['myclass'])
+    ctx.add_stylesheet({'myclass': {'color': 'red'}})
+    ctx.add_node('anothernode', classes=['myclass'])
+    gv.node.assert_has_calls([
+        mocker.call('anode', color='lightgrey'),
+        mocker.call('anothernode', color='red'),
+    ])
+
+
+def test_invisible_element_does_not_leak_style(mocker):
+    gv = mocker.Mock(spec=graphviz.Graph)
+    m = mocker.Mock(return_value=gv)
+    ctx = GraphContext({'myclass': {'style': ['filled']}})
+    ctx.init_graph('G', m, {})
+    ctx.add_node('hidden', {'visible': False}, classes=['myclass'])
+    ctx.add_node('shown', classes=['myclass'])
+    gv.node.assert_has_calls([
+        mocker.call('hidden', style='filled,invis'),
+        mocker.call('shown', style='filled'),
+    ])
+
+
+def test_attributes_filtered_by_element_type(mocker):
+    gv = mocker.Mock(spec=graphviz.Graph)
+    m = mocker.Mock(return_value=gv)
+    ctx = GraphContext({'myclass': {'shape': 'box', 'arrowhead': 'dot'}})
+    ctx.init_graph('G', m, {})
+    ctx.add_node('anode', classes=['myclass'])
+    ctx.add_edge('anode', 'anode', {'shape': 'box'}, classes=['myclass'])
+    gv.node.assert_called_once_with('anode', shape='box')
+    gv.edge.assert_called_once_with('anode', 'anode', arrowhead='dot')
+
+
+def test_strict_mode_reports_inapplicable_attribute(mocker):
+    gv = mocker.Mock(spec=graphviz.Graph)
+    m = mocker.Mock(return_value=gv)
+    ctx = GraphContext(strict=True)
+    ctx.init_graph('G', m, {})
+    ctx.add_node('anode', {'shape': 'box', 'paths': ['a'], 'rank': 'r'})
+    with pytest.raises(ValueError, match='arrowhead'):
+        ctx.add_node('anothernode', {'arrowhead': 'dot'})
+
+
+def test_strict_mode_reports_unknown_class_attribute(mocker):
+    gv = mocker.Mock(spec=graphviz.Graph)
+    m = mocker.Mock(return_value=gv)
+    ctx = GraphContext({'myclass': {'colour': 'red'}}, strict=True)
+    ctx.init_graph('G', m, {})
+    with pytest.raises(ValueError, match='colour'):
+        ctx.add_node('anode', classes=['myclass'])
+
+
+def test_ranks_shared_with_subgraph_contexts():
+    ctx = GraphContext()
+    ctx.init_graph('G', graphviz.Graph, {})
+    ctx.add_node('a', {'rank': 'one'})
+
+    sub = ctx.new_context('sub', 'sub', {})
+    sub.add_node('b', {'rank': 'one'})
+    sub.add_node('c', {'rank': 'two'})
+    assert sub.get_ranks() == {'one': ['b'], 'two': ['c']}
+    ctx.add_subgraph_from_context(sub)
+
+    ctx.add_node('d', {'rank': 'one'})
+    assert ctx.get_ranks() == {'one': ['a', 'b', 'd'], 'two': ['c']}
+
+
+def test_ranks_merged_from_detached_context():
+    ctx = GraphContext()
+    ctx.init_graph('G', graphviz.Graph, {})
+    ctx.add_node('a', {'rank': 'one'})
+
+    sub = GraphContext(_level=1)
+    sub.init_graph('sub', graphviz.Graph, {})
+    sub.add_node('b', {'rank': 'two'})
+    sub.add_node('c', {'rank': 'one'})
+    ctx.add_subgraph_from_context(sub)
+
+    assert ctx.get_ranks() == {'one': ['a', 'c'], 'two': ['b']}
+
+
+def test_elements_logged_only_at_debug_level(caplog):
+    caplog.set_level(logging.INFO, logger='graphviz_overlay.context')
+    ctx = GraphContext()
+    ctx.init_graph('G', graphviz.Graph, {})
+    ctx.add_node('a')
+    assert not caplog.records
+
+    caplog.set_level(logging.DEBUG, logger='graphviz_overlay.context')
+    ctx = GraphContext()
+    ctx.init_graph('G', graphviz.Graph, {})
+    sub = ctx.new_context('sub', 'sub', {})
+    sub.add_node('b')
+    sub.add_edge('b', 'b')
+    assert [r.getMessage() for r in caplog.records] == [
+        'Adding node b {}',
+        'Adding edge b b {}',
+    ]
+
+
+def test_tracer_records_elements():
+    trace = io.StringIO()
+    ctx = GraphContext(tracer=Tracer(trace))
+    ctx.init_graph('G', graphviz.Graph, {})
+    ctx.add_node('a')
+    sub = ctx.new_context('sub', 'sub', {})
+    sub.add_node('b')
+    ctx.add_subgraph_from_context(sub)
+    ctx.add_edge('a', 'b')
+
+    records = [json.loads(line) for line in trace.getvalue().splitlines()]
+    assert [
+        (r['element'], r['name'], r['path']) for r in records
+    ] == [
+        ('node', 'a', ''),
+        ('node', 'b', 'sub'),
+        ('subgraph', 'sub', 'sub'),
+        ('edge', 'a:b', ''),
+    ]
+    assert all(r['seconds'] >= 0 for r in records)
+
+
+def test_subgraph_contexts_share_the_stylesheet():
+    ctx = GraphContext({'myclass': {'color': 'red'}})
+    ctx.init_graph('G', graphviz.Graph, {})
+    sub = ctx.new_context('sub', 'sub', {})
+    assert sub.styles is ctx.styles
+
+
+def test_subgraph_styles_apply_locally(mocker):
+    gv = mocker.Mock(spec=graphviz.Graph)
+    m = mocker.Mock(return_value=gv)
+    gv.subgraph_class = m
+    ctx = GraphContext({'myclass': {'color': 'red'}})
+    ctx.init_graph('G', m, {})
+
+    first = ctx.new_context('first', 'first', {
+        'styles': {'myclass': {'shape': 'box'}},
+    })
+    first.add_node('a', classes=['myclass'])
+    nested = first.new_context('nested', 'nested', {})
+    nested.add_node('b', classes=['myclass'])
+    second = ctx.new_context('second', 'second', {})
+    second.add_node('c', classes=['myclass'])
+    ctx.add_node('d', classes=['myclass'])
+
+    gv.node.assert_has_calls([
+        mocker.call('a', color='red', shape='box'),
+        mocker.call('b', color='red', shape='box'),
+        mocker.call('c', color='red'),
+        mocker.call('d', color='red'),
+    ])
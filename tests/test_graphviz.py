@@ -1,11 +1,16 @@
+import functools
+import io
 import json
+import logging
 import os.path
+import sys
 
 import graphviz
 import pytest
 
 from graphviz_overlay import GraphContext
-from graphviz_overlay.overlays import Graph, Digraph
+from graphviz_overlay.overlays import Graph, Digraph, EntityRelationship
+from graphviz_overlay.trace import Tracer
 
 here = os.path.dirname(os.path.abspath(__file__))
 examples = os.path.join(here, '..', 'examples')
@@ -47,3 +52,238 @@ def test_graphviz_digraph(example, expect_func, mocker):
 def load_example_model(example):
     with open(os.path.join(examples, f'{example}.json'), mode='r') as f:
         return json.load(f)
+
+
+def test_draw_does_not_modify_model():
+    model = load_example_model('simple')
+    expect = json.loads(json.dumps(model))
+
+    first = Digraph(GraphContext(), select='foo', highlight='foo').draw(
+        'G', model
+    )
+    assert model == expect
+
+    second = Digraph(GraphContext(), select='foo', highlight='foo').draw(
+        'G', model
+    )
+    assert first == second
+    assert Digraph(GraphContext()).draw('G', model) != first
+
+
+def test_remove_deselected_keeps_subgraphs_after_removed_subgraph():
+    model = {
+        'subgraphs': {
+            'a': {
+                'subgraphs': {
+                    'b': {'nodes': {'ab': {}}},
+                },
+            },
+            'c': {'nodes': {'c1': {}}},
+        },
+    }
+    overlay = Graph(select='a.b,c', remove_deselected=True)
+    source = overlay.draw('G', model)
+
+    assert 'subgraph b {' in source
+    assert 'subgraph a {' not in source
+    assert 'c1' in source
+
+
+def test_edge_endpoints_resolve_to_prefixed_nodes():
+    model = {
+        'nodes': {'a': {}},
+        'subgraphs': {
+            's': {
+                'prefix': 'p',
+                'nodes': {'a': {}, 'b': {'rank': 'r'}},
+                'edges': [{'from': 'a', 'to': 'b'}],
+                'ranks': {'r': 'same'},
+                'subgraphs': {
+                    't': {
+                        'nodes': {'c': {}},
+                        'edges': [
+                            {'from': 'c', 'to': 'b'},
+                            {'from': 'c', 'to': 'x'},
+                        ],
+                    },
+                },
+            },
+        },
+        'edges': [{'from': 'a', 'to': 'p_a'}],
+    }
+    source = Digraph().draw('G', model)
+
+    assert '\tp_a -> p_b\n' in source
+    assert '\tc -> p_b\n' in source
+    assert '\tc -> x\n' in source
+    assert '\ta -> p_a\n' in source
+    assert 'rank=same\n\t\t\tp_b\n' in source
+
+
+def test_strict_endpoints_reports_every_dangling_endpoint():
+    model = {
+        'nodes': {'a': {}},
+        'edges': [
+            {'from': 'a', 'to': 'missing'},
+            {'from': 'missing', 'to': 'a'},
+        ],
+        'subgraphs': {
+            'p': {
+                'prefix': 'p',
+                'nodes': {'b': {}},
+                'edges': [{'from': 'b', 'to': 'other'}],
+            },
+        },
+    }
+    Digraph().draw('G', model)
+    Digraph(GraphContext(strict=True)).draw('G', model)
+
+    with pytest.raises(
+        ValueError,
+        match="^edge endpoints are not nodes: 'missing', 'other'$",
+    ):
+        Digraph(GraphContext(strict_endpoints=True)).draw('G', model)
+
+
+@pytest.mark.parametrize('example', ['hello_world', 'cluster'])
+def test_strict_mode_draws_edges_between_implicit_nodes(example):
+    model = load_example_model(example)
+    assert (
+        Digraph(GraphContext(strict=True)).draw('G', model)
+        == Digraph().draw('G', model)
+    )
+
+
+def test_remove_deselected_removes_edges_of_removed_nodes():
+    model = {
+        'nodes': {'a': {'paths': ['x']}, 'b': {'paths': ['y']}},
+        'edges': [{'from': 'a', 'to': 'b', 'paths': ['x']}],
+    }
+
+    hidden = Digraph(select='x').draw('G', model)
+    removed = Digraph(select='x', remove_deselected=True).draw('G', model)
+
+    assert 'a -> b' in hidden
+    assert 'a -> b' not in removed
+    assert '\tb' not in removed
+
+
+edge_kinds_model = {
+    'styles': {'call': {'color': 'grey', 'label': 'calls'}},
+    'nodes': {'a': {}, 'b c': {'paths': ['x']}, 'd': {'paths': ['y']}},
+    'edges': [
+        {'from': 'a', 'to': 'b c', 'classes': ['call']},
+        {'from': 'b c', 'to': 'a:port', 'paths': ['x']},
+        {'from': 'a', 'to': 'd', 'paths': ['y'], 'label': 'a "d"'},
+        {'from': 'd', 'to': 'a'},
+        {'from': 'a', 'to': 'b c', 'classes': ['call']},
+    ],
+    'subgraphs': {
+        's': {
+            'prefix': 'p',
+            'nodes': {'a': {}},
+            'edges': [{'from': 'a', 'to': 'd'}, {'from': 'a', 'to': 'a'}],
+        },
+    },
+}
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'select': 'x'},
+    {'select': 'x', 'remove_deselected': True},
+])
+@pytest.mark.parametrize('stream', [False, True])
+def test_edges_added_in_bulk_match_edges_added_one_by_one(args, stream):
+    def draw(**ctx_args):
+        if stream:
+            ctx_args['sink'] = io.StringIO()
+        return Digraph(GraphContext(**ctx_args), **args).draw(
+            'G', edge_kinds_model,
+        )
+
+    one_by_one = draw(tracer=Tracer(io.StringIO()))
+    assert draw() == one_by_one
+    if not args.get('remove_deselected'):
+        assert '\t\tp_a -> p_a' in one_by_one
+
+
+class RecordingGraph(object):
+    """Records what is drawn in every graph to a shared list of events."""
+    source = None
+
+    def __init__(self, events, name=None, **attrs):
+        self.events = events
+        self.name = name
+
+    @property
+    def subgraph_class(self):
+        return functools.partial(RecordingGraph, self.events)
+
+    def node(self, name, **attrs):
+        self.events.append(('node', name))
+
+    def edge(self, tail, head, **attrs):
+        self.events.append(('edge', tail))
+
+    def subgraph(self, graph):
+        self.events.append(('subgraph', graph.name))
+
+
+def nested_model(depth, key):
+    model = root = {}
+    for level in range(depth):
+        model.update({
+            'nodes': {f'n{level}': {}},
+            'edges': [{'from': f'n{level}', 'to': f'n{level}'}],
+        })
+        if level + 1 < depth:
+            model[key] = {f's{level + 1}': {}}
+            model = model[key][f's{level + 1}']
+    return root
+
+
+def expected_nested_events(depth):
+    events = [('node', f'n{level}') for level in range(depth)]
+    for level in reversed(range(1, depth)):
+        events += [('edge', f'n{level}'), ('subgraph', f's{level}')]
+    return events + [('edge', 'n0')]
+
+
+@pytest.mark.parametrize('remove_deselected', [False, True])
+def test_deeply_nested_subgraphs(remove_deselected, caplog):
+    depth = 10_000
+    assert depth > sys.getrecursionlimit()
+    # Not a debug log line for every element.
+    caplog.set_level(logging.INFO, logger='graphviz_overlay')
+
+    events = []
+    overlay = Graph(remove_deselected=remove_deselected)
+    overlay.draw(
+        'G',
+        nested_model(depth, 'subgraphs'),
+        graph_class=functools.partial(RecordingGraph, events),
+    )
+
+    assert events == expected_nested_events(depth)
+
+
+def test_deeply_nested_domains(caplog):
+    depth = 10_000
+    caplog.set_level(logging.INFO, logger='graphviz_overlay')
+
+    model = root = {}
+    for level in range(1, depth):
+        model['entities'] = {f'e{level}': {}}
+        model['domains'] = {f'd{level}': {}}
+        model = model['domains'][f'd{level}']
+
+    events = []
+    EntityRelationship().draw(
+        'G', root, graph_class=functools.partial(RecordingGraph, events),
+    )
+
+    subgraphs = [name for event, name in events if event == 'subgraph']
+    assert subgraphs == [
+        f'cluster_d{level}' for level in reversed(range(1, depth))
+    ]
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+from graphviz_overlay.ir import ModelIR, compile_model
+from graphviz_overlay.overlays import Digraph, Graph
+
+
+def walk(overlay, model):
+    """Draw a model as given, without compiling it."""
+    overlay.ctx.init_graph('G', overlay.graph_class, model)
+    overlay.walk_model(overlay.ctx, overlay.preprocess_model(model))
+    overlay.ctx.close()
+    return overlay.source()
+
+
+@pytest.mark.parametrize(
+    'example', ['cluster', 'html-record', 'layer', 'simple'],
+)
+@pytest.mark.parametrize('options', [
+    {},
+    {'select': 'foo', 'highlight': 'bar'},
+    {'select': 'foo', 'remove_deselected': True},
+    {'shade': '^foo'},
+])
+def test_compiled_model_draws_the_same(example, options, load_example_model):
+    model = load_example_model(example)
+
+    assert (
+        Digraph(**options).draw('G', model)
+        == walk(Digraph(**options), model)
+    )
+
+
+def test_compiled_model_reads_like_the_model():
+    model = {
+        'label': 'root',
+        'nodes': {'a': {'classes': ['x']}, 'b': {}},
+        'edges': [{'from': 'a', 'to': 'b', 'paths': ['p']}],
+        'subgraphs': {'s': {'nodes': {'c': {}}}},
+    }
+    compiled = compile_model(model)
+
+    assert isinstance(compiled, ModelIR)
+    assert compiled['label'] == 'root'
+    assert set(compiled) == {'label', 'nodes', 'edges', 'subgraphs'}
+    assert dict(compiled['nodes'].items()) == model['nodes']
+    assert list(compiled['edges']) == model['edges']
+    assert dict(compiled['subgraphs']['s']['nodes'].items()) == {'c': {}}
+    assert compiled.get('ranks', {}) == {}
+
+
+def test_compiled_model_shares_ids_and_attributes():
+    model = {
+        'nodes': {'a': {'classes': ['x']}, 'b': {'classes': ['x']}},
+        'edges': [
+            {'from': 'a', 'to': 'b', 'color': 'red'},
+            {'from': 'b', 'to': 'a', 'color': 'red'},
+            {'from': 'a', 'to': 'b'},
+        ],
+    }
+    compiled = compile_model(json.loads(json.dumps(model)))
+
+    nodes = compiled.nodes
+    assert nodes.attributes[0] is nodes.attributes[1]
+    edges = compiled.edges
+    assert list(edges.tails) == [0, 1, 0]
+    assert list(edges.heads) == [1, 0, 1]
+    assert edges.symbols[0] is nodes.ids[0]
+    assert edges.attributes[0] is edges.attributes[1]
+    assert edges.attributes[2] == {}
+
+
+def test_compiled_model_keeps_value_types_apart():
+    compiled = compile_model({
+        'nodes': {'a': {'width': 1}, 'b': {'width': True}},
+    })
+
+    assert compiled.nodes.attributes[0]['width'] is 1
+    assert compiled.nodes.attributes[1]['width'] is True
+
+
+def test_compile_deeply_nested_model():
+    model = {}
+    level = model
+    for i in range(10_000):
+        level['subgraphs'] = {f's{i}': {'nodes': {f'n{i}': {}}}}
+        level = level['subgraphs'][f's{i}']
+
+    compiled = compile_model(model)
+
+    for i in range(10_000):
+        compiled = compiled.subgraphs[f's{i}']
+        assert compiled.nodes.ids == [f'n{i}']
+
+
+def test_compile_model_once():
+    compiled = Graph.compile_model({'nodes': {'a': {}}})
+
+    assert Graph.compile_model(compiled) is compiled
+
+
+def test_path_index_groups_elements_by_paths():
+    compiled = compile_model({
+        'nodes': {
+            'a': {'paths': ['x']},
+            'b': {},
+            'c': {'paths': ['x']},
+        },
+    })
+
+    groups = {
+        paths: list(indices)
+        for paths, indices in compiled.nodes.paths.items()
+    }
+    assert groups == {('x',): [0, 2], (): [1]}
+
+
+@pytest.mark.parametrize('remove_deselected', [True, False])
+def test_selection_by_path_groups_keeps_model_order(remove_deselected):
+    model = {
+        'nodes': {
+            f'n{i}': {'paths': [f'p{i % 3}']} if i % 4 else {}
+            for i in range(12)
+        },
+        'edges': [
+            {'from': f'n{i}', 'to': f'n{i + 1}', 'paths': [f'p{i % 2}']}
+            for i in range(11)
+        ],
+    }
+    options = {
+        'select': 'p0,p1',
+        'highlight': 'p1',
+        'remove_deselected': remove_deselected,
+    }
+
+    assert (
+        Graph(**options).draw('G', model)
+        == walk(Graph(**options), model)
+    )
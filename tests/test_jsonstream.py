@@ -0,0 +1,157 @@
+import io
+import json
+import os.path
+
+import pytest
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.jsonstream import LazyArray, LazyObject, StreamedModel
+from graphviz_overlay.jsonstream import loads, node_ids
+from graphviz_overlay.overlays import Digraph
+
+documents = [
+    b'{}',
+    b' { "edges" : [ {"from": "a", "to": "b"} , {"from": "b"} ] ,'
+    b' "n": -1.5e2, "t": true } ',
+    json.dumps({
+        'label': 'quote " and backslash \\ and ☃',
+        'nodes': {'a"b\\': {'n': [1, 2.5, None, False]}, 'c': {}},
+        'subgraphs': {'s': {'nodes': {'x': {}}, 'edges': []}},
+        'edges': [],
+    }, ensure_ascii=False).encode(),
+]
+
+
+def materialise(model):
+    result = {}
+    for key in model:
+        value = model[key]
+        if isinstance(value, LazyObject):
+            value = dict(value.items())
+        elif isinstance(value, LazyArray):
+            value = list(value)
+        result[key] = value
+    return result
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1 << 16])
+@pytest.mark.parametrize('document', documents)
+def test_streamed_model_equals_json(document, chunk_size):
+    model = StreamedModel(io.BytesIO(document), chunk_size=chunk_size)
+    assert materialise(model) == json.loads(document)
+
+
+def test_streamed_model_attributes_loaded_up_front():
+    model = StreamedModel(io.BytesIO(documents[1]))
+    assert model.attributes == {'n': -150.0, 't': True}
+    assert isinstance(model['edges'], LazyArray)
+
+
+@pytest.mark.parametrize('example', ['simple', 'cluster', 'layer'])
+@pytest.mark.parametrize('args', [
+    {},
+    {'select': 'foo', 'highlight': 'subgraph'},
+    {'select': 'foo,1', 'remove_deselected': True},
+    {'select': '^foo', 'remove_deselected': True},
+])
+def test_draw_streamed_model(example, args, examples):
+    path = os.path.join(examples, f'{example}.json')
+    with open(path, mode='rb') as f:
+        expect = Digraph(GraphContext(), **args).draw('G', json.load(f))
+        source = Digraph(GraphContext(), **args).draw('G', StreamedModel(f))
+
+    assert source == expect
+
+
+def test_deselected_elements_not_parsed():
+    # The removed subgraph and node would fail to parse
+    document = (
+        b'{"nodes": {"a": {"paths": ["keep"]}, "b": {"x": nope}},'
+        b' "subgraphs": {"drop": {"nodes": {"c": nope}},'
+        b' "keep": {"nodes": {"d": {}}}}}'
+    )
+    model = StreamedModel(io.BytesIO(document))
+    overlay = Digraph(GraphContext(), select='keep', remove_deselected=True)
+    source = overlay.draw('G', model)
+
+    assert '\ta\n' in source
+    assert 'subgraph keep' in source
+    assert 'drop' not in source
+
+
+def test_node_ids_of_source():
+    source = (
+        b'{"nodes": {"a": nope}, "subgraphs": {"x": {"nodes": {"b": 1},'
+        b' "prefix": "p", "subgraphs": {"y": {"nodes": {"c": {}}}}}},'
+        b' "edges": [{"from": "d", "to": "a"}]}'
+    )
+    assert sorted(node_ids(source)) == ['a', 'c', 'p_b']
+
+
+prefixed_model = {
+    'nodes': {'a': {'paths': ['x']}},
+    'edges': [{'from': 'a', 'to': 'p_b'}, {'from': 'a', 'to': 'c'}],
+    'subgraphs': {
+        'x': {
+            'prefix': 'p',
+            'nodes': {'a': {}, 'b': {}},
+            'edges': [{'from': 'a', 'to': 'b'}, {'from': 'b', 'to': 'c'}],
+        },
+        'y': {
+            'nodes': {'c': {}},
+            'edges': [{'from': 'c', 'to': 'p_a'}, {'from': 'c', 'to': 'a'}],
+        },
+    },
+}
+
+
+@pytest.mark.parametrize('args', [
+    {},
+    {'select': 'x', 'remove_deselected': True},
+    {'select': 'y', 'remove_deselected': True},
+    {'select': 'y'},
+])
+def test_draw_streamed_prefixed_model(args):
+    document = json.dumps(prefixed_model).encode()
+    expect = Digraph(GraphContext(), **args).draw('G', prefixed_model)
+    source = Digraph(GraphContext(), **args).draw(
+        'G', StreamedModel(io.BytesIO(document)),
+    )
+
+    assert source == expect
+
+
+def test_streamed_model_strict_endpoints():
+    model = {
+        'edges': [{'from': 'a', 'to': 'missing'}],
+        'subgraphs': {
+            'x': {'prefix': 'p', 'nodes': {'b': {}},
+                  'edges': [{'from': 'b', 'to': 'a'}]},
+            'y': {'nodes': {'a': {}}, 'edges': [{'from': 'b', 'to': 'p_b'}]},
+        },
+    }
+    document = json.dumps(model).encode()
+    message = "^edge endpoints are not nodes: 'missing', 'b'$"
+    for drawn in (model, StreamedModel(io.BytesIO(document))):
+        with pytest.raises(ValueError, match=message):
+            Digraph(GraphContext(strict_endpoints=True)).draw('G', drawn)
+
+
+@pytest.mark.parametrize('document', [
+    '{"a": [1, -2.5e3, "\\u00e9\\"", true, false, null, {}, []]}',
+    ' [[], [{"b": {"c": [0]}}]] ',
+    '{"a": 1, "a": 2}',
+])
+def test_loads_deeply_nested(document):
+    depth = 5000
+    deep = '{"x": [' * depth + document + ']}' * depth
+    value = loads(deep.encode())
+    for _ in range(depth):
+        value = value['x'][0]
+    assert value == json.loads(document)
+
+
+@pytest.mark.parametrize('document', ['[1,]', '{"a"}', '[1 2]', '{} x'])
+def test_loads_deeply_nested_invalid(document):
+    with pytest.raises(ValueError):
+        loads('[' * 5000 + document + ']' * 5000)
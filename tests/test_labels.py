@@ -0,0 +1,64 @@
+from graphviz_overlay.labels import (
+    compile_label, format_html_label, format_html_tag,
+)
+
+
+def test_format_html_label():
+    label = {
+        'border': '1',
+        'trs': [
+            [{'colspan': '2', 'value': 'Record'}],
+            [{'port': 'p0', 'value': 'key'}, {'port': 'p1', 'value': 'value'}],
+        ],
+    }
+    assert format_html_label(label) == (
+        '<<TABLE BORDER="1">'
+        '<TR><TD COLSPAN="2">Record</TD></TR>'
+        '<TR><TD PORT="p0">key</TD><TD PORT="p1">value</TD></TR>'
+        '</TABLE>>'
+    )
+
+
+def test_values_are_escaped():
+    label = {
+        'title': 'say "hi"',
+        'trs': [[{'value': 'a < b & {c}', 'href': 'x?a=1&b=2'}]],
+    }
+    assert format_html_label(label) == (
+        '<<TABLE TITLE="say &quot;hi&quot;">'
+        '<TR><TD HREF="x?a=1&amp;b=2">a &lt; b &amp; {c}</TD></TR>'
+        '</TABLE>>'
+    )
+
+
+def test_header_font_and_lines():
+    label = {
+        'font': {'face': 'Helvetica'},
+        'trs': [
+            [{'value': 'Entity', 'header': True}],
+            [{'value': ['one', 'two'], 'font': {'color': 'grey'}}],
+        ],
+    }
+    assert format_html_label(label) == (
+        '<<FONT FACE="Helvetica"><TABLE>'
+        '<TR><TD><B>Entity</B></TD></TR>'
+        '<TR><TD><FONT COLOR="grey">one<BR/>two</FONT></TD></TR>'
+        '</TABLE></FONT>>'
+    )
+
+
+def test_labels_with_the_same_structure_share_a_template():
+    compile_label.cache_clear()
+    for i in range(10):
+        format_html_label({'trs': [[{'port': f'p{i}', 'value': str(i)}]]})
+    format_html_label({'trs': [[{'value': 'no port'}]]})
+
+    info = compile_label.cache_info()
+    assert (info.misses, info.hits) == (2, 9)
+
+
+def test_format_html_tag():
+    assert format_html_tag('td', {'port': 'p0', 'nope': 1}, 'x') == (
+        '<TD PORT="p0">x</TD>'
+    )
+    assert format_html_tag('tr', inner='y') == '<TR>y</TR>'
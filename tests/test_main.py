@@ -0,0 +1,133 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+
+import pytest
+
+from graphviz_overlay import main
+from graphviz_overlay.main import run
+from graphviz_overlay.util import load_model
+
+
+def nested_model(depth):
+    model = inner = {}
+    for level in range(depth):
+        inner['nodes'] = {f'n{level}': {}}
+        inner['subgraphs'] = {f's{level}': {}}
+        inner = inner['subgraphs'][f's{level}']
+    return model
+
+
+def write_nested_model(path, depth):
+    # Written without recursion, json.dump is limited as json.load is.
+    with open(path, mode='w') as f:
+        for level in range(depth):
+            f.write(
+                f'{{"nodes": {{"n{level}": {{}}}}, '
+                f'"subgraphs": {{"s{level}": '
+            )
+        f.write('{}' + '}}' * depth)
+
+
+@pytest.mark.parametrize('options', [[], ['--incremental']])
+def test_draw_deeply_nested_model(tmp_path, monkeypatch, capsys, caplog,
+                                  options):
+    caplog.set_level(logging.INFO)
+    depth = 3000
+    path = tmp_path / 'model.json'
+    write_nested_model(path, depth)
+    # Streamed, as the graphviz package copies the body of every
+    # enclosing subgraph.
+    monkeypatch.setattr(sys, 'argv', [
+        'graphviz-overlay', '-i', str(path), '--stream', *options,
+        'digraph',
+    ])
+
+    run()
+
+    source = capsys.readouterr().out
+    assert source.count('subgraph s') == depth
+    assert f'\tn{depth - 1}\n' in source
+
+
+def test_write_nested_model(tmp_path):
+    path = tmp_path / 'model.json'
+    write_nested_model(path, 3)
+    with open(path) as f:
+        assert json.load(f) == nested_model(3)
+
+
+@pytest.mark.parametrize('options,unsupported', [
+    (['--stream'], '--stream'),
+    (['--cache-dir', 'cache', '--subgraph-jobs', '2'],
+     '--cache-dir, --subgraph-jobs'),
+])
+def test_watch_rejects_unsupported_options(tmp_path, monkeypatch, capsys,
+                                           options, unsupported):
+    path = tmp_path / 'model.json'
+    path.write_text('{}')
+    monkeypatch.setattr(sys, 'argv', [
+        'graphviz-overlay', '-i', str(path), '--watch', *options, 'digraph',
+    ])
+
+    with pytest.raises(SystemExit) as exc_info:
+        run()
+
+    assert exc_info.value.code == 2
+    assert (
+        f'--watch cannot be combined with {unsupported}'
+        in capsys.readouterr().err
+    )
+
+
+def test_cached_drawing_of_unchanged_input(tmp_path, monkeypatch, capsys):
+    model = {'nodes': {'a': {}, 'b': {}}, 'edges': [{'from': 'a', 'to': 'b'}]}
+    path = tmp_path / 'model.json'
+    path.write_text(json.dumps(model))
+
+    def draw(*options):
+        monkeypatch.setattr(sys, 'argv', [
+            'graphviz-overlay', '-i', str(path),
+            '--cache-dir', str(tmp_path / 'cache'), *options, 'digraph',
+        ])
+        run()
+        return capsys.readouterr().out
+
+    def fail(*args, **kwargs):
+        raise AssertionError('not cached')
+
+    source = draw()
+    # Found by the bytes of the input, without parsing it.
+    monkeypatch.setattr(main, 'load_model', fail)
+    assert draw() == source
+
+    # Found by the normalised model, however it is formatted or read.
+    monkeypatch.setattr(main, 'load_model', load_model)
+    monkeypatch.setattr(main, 'draw', fail)
+    path.write_text(json.dumps(model, indent=2))
+    assert draw() == source
+    path.write_text(json.dumps(model, indent=4))
+    assert draw('--incremental') == source
+
+
+def test_drawing_does_not_import_other_commands():
+    code = 'import sys, graphviz_overlay.main; print(*sys.modules)'
+    modules = subprocess.run(
+        [sys.executable, '-c', code],
+        capture_output=True, check=True, text=True,
+        cwd=os.path.join(os.path.dirname(__file__), '..'),
+    ).stdout.split()
+
+    for module in [
+        'asyncio',
+        'concurrent.futures',
+        'graphviz_overlay.batch',
+        'graphviz_overlay.cache',
+        'graphviz_overlay.parallel',
+        'graphviz_overlay.render',
+        'graphviz_overlay.serve',
+        'graphviz_overlay.watch',
+    ]:
+        assert module not in modules
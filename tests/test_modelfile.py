@@ -0,0 +1,147 @@
+import os.path
+import pickle
+
+import pytest
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.batch import render_views
+from graphviz_overlay.modelfile import (
+    is_model_file, load_model_file, write_model_file,
+)
+from graphviz_overlay.overlays import Digraph, EntityRelationship, Graph
+
+
+def compiled(model, tmp_path):
+    path = str(tmp_path / 'model.gvo')
+    with open(path, mode='wb') as f:
+        write_model_file(model, f)
+    return path
+
+
+@pytest.mark.parametrize('overlay_class,example,args', [
+    (Digraph, 'cluster', {}),
+    (Graph, 'layer', {}),
+    (Digraph, 'html-record', {}),
+    (Digraph, 'simple', {'select': 'foo', 'highlight': 'foo'}),
+    (Graph, 'simple', {'select': 'foo', 'remove_deselected': True}),
+    (EntityRelationship, 'er', {}),
+])
+def test_model_file_draws_as_model(
+    overlay_class, example, args, tmp_path, load_example_model,
+):
+    model = load_example_model(example)
+    mapped = load_model_file(compiled(model, tmp_path))
+
+    assert overlay_class(GraphContext(), **args).draw('G', mapped) == (
+        overlay_class(GraphContext(), **args).draw('G', model)
+    )
+
+
+def test_levels_are_read_when_used(tmp_path, load_example_model):
+    model = load_example_model('simple')
+    mapped = load_model_file(compiled(model, tmp_path))
+
+    assert not mapped.subgraphs._levels
+    assert mapped['subgraphs']['other_subgraph']['nodes'] is not None
+    assert list(mapped.subgraphs._levels) == [1]
+    assert list(mapped['subgraphs']) == list(model['subgraphs'])
+
+
+def test_model_file_is_pickled_by_path(tmp_path, load_example_model):
+    model = load_example_model('layer')
+    path = compiled(model, tmp_path)
+    mapped = pickle.loads(pickle.dumps(load_model_file(path)))
+
+    assert mapped.model_file.path == path
+    assert Digraph().draw('G', mapped) == Digraph().draw('G', model)
+
+    views = [{'output': 'a.dot', 'overlay': 'digraph'}]
+    outfiles = render_views(
+        load_model_file(path), {}, views, {'digraph': Digraph},
+        outdir=str(tmp_path), jobs=2,
+    )
+    with open(outfiles[0]) as f:
+        assert f.read() == Digraph().draw('G', model)
+
+
+def test_is_model_file(tmp_path, examples):
+    path = compiled({'nodes': {'a': {}}}, tmp_path)
+    assert is_model_file(path)
+    assert not is_model_file(os.path.join(examples, 'simple.json'))
+    assert not is_model_file(str(tmp_path / 'missing.gvo'))
+    assert not is_model_file(None)
+
+
+def many_subgraphs(count=50):
+    return {
+        'nodes': {'a': {'paths': ['d3']}},
+        'edges': [
+            {'from': 'a', 'to': 'p1_n', 'paths': ['d3']},
+            {'from': 'a', 'to': 'p3_n', 'paths': ['d3']},
+            {'from': 'a', 'to': 'z'},
+        ],
+        'subgraphs': {
+            f'd{index}': {
+                'prefix': f'p{index}',
+                'nodes': {'n': {}, 'm': {}},
+                'edges': [{'from': 'n', 'to': 'm'}, {'from': 'm', 'to': 'a'}],
+                'subgraphs': {'inner': {'nodes': {f'i{index}': {}}}},
+            }
+            for index in range(count)
+        } | {
+            'cluster_z': {'nodes': {'z': {'paths': ['d3']}}},
+        },
+    }
+
+
+@pytest.mark.parametrize('args', [
+    {'select': 'd3', 'remove_deselected': True},
+    {'select': 'd3.inner', 'remove_deselected': True},
+    {'select': '^d3', 'remove_deselected': True},
+    {'select': 'd3'},
+])
+def test_selection_of_model_file_draws_as_model(args, tmp_path):
+    model = many_subgraphs()
+    mapped = load_model_file(compiled(model, tmp_path))
+
+    assert Digraph(GraphContext(), **args).draw('G', mapped) == (
+        Digraph(GraphContext(), **args).draw('G', model)
+    )
+
+
+def test_unselectable_levels_are_not_read(tmp_path):
+    mapped = load_model_file(compiled(many_subgraphs(20), tmp_path))
+    overlay = Digraph(GraphContext(), select='d3', remove_deselected=True)
+    source = overlay.draw('G', mapped)
+
+    assert sorted(mapped.subgraphs._levels) == [3, 20]
+    decoded = mapped.model_file.strings._decoded.values()
+    assert 'i3' in decoded and 'i1' not in decoded
+    assert 'a -> p3_n' in source
+    assert 'p1_n' not in source
+
+
+def test_strict_endpoints_of_unread_levels(tmp_path):
+    model = many_subgraphs()
+    model['edges'].append({'from': 'a', 'to': 'missing', 'paths': ['d3']})
+    mapped = load_model_file(compiled(model, tmp_path))
+    overlay = Digraph(
+        GraphContext(strict_endpoints=True),
+        select='d3', remove_deselected=True,
+    )
+
+    with pytest.raises(ValueError, match="^edge endpoints .*: 'missing'$"):
+        overlay.draw('G', mapped)
+
+
+def test_model_file_digest(tmp_path):
+    model = many_subgraphs(3)
+    digest = load_model_file(compiled(model, tmp_path)).model_file.digest
+    assert load_model_file(
+        compiled(model, tmp_path / '..'),
+    ).model_file.digest == digest
+
+    model['subgraphs']['d1']['nodes']['n'] = {'label': 'N'}
+    assert load_model_file(
+        compiled(model, tmp_path),
+    ).model_file.digest != digest
@@ -0,0 +1,63 @@
+import io
+
+import pytest
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.overlays import Digraph, EntityRelationship, Graph
+from graphviz_overlay.parallel import draw_parallel
+
+prefixed_model = {
+    'nodes': {'a': {'rank': 'r'}},
+    'edges': [{'from': 'a', 'to': 'p_b'}],
+    'ranks': {'r': 'same'},
+    'subgraphs': {
+        's': {
+            'prefix': 'p',
+            'paths': ['x'],
+            'nodes': {'b': {'rank': 'r'}},
+            'edges': [{'from': 'b', 'to': 'c'}],
+        },
+        't': {
+            'nodes': {'c': {'rank': 'r'}},
+            'edges': [{'from': 'c', 'to': 'p_b'}],
+            'subgraphs': {'u': {'cluster': True, 'nodes': {'d': {}}}},
+        },
+        'v': {'paths': ['y'], 'nodes': {'e': {}}},
+    },
+}
+
+
+@pytest.mark.parametrize('overlay_class,example,args', [
+    (Digraph, 'cluster', {}),
+    (Graph, 'layer', {}),
+    (Digraph, 'simple', {'select': 'foo', 'highlight': 'foo'}),
+    (Digraph, prefixed_model, {}),
+    (Digraph, prefixed_model, {'select': 'x', 'remove_deselected': True}),
+    (Graph, prefixed_model, {'select': 'y', 'shade': 'x'}),
+])
+@pytest.mark.parametrize('stream', [False, True])
+def test_parallel_walk_matches_serial_walk(
+    overlay_class, example, args, stream, load_example_model,
+):
+    model = example
+    if isinstance(example, str):
+        model = load_example_model(example)
+    stylesheet = {'node': {'shape': 'box'}}
+
+    def context():
+        return GraphContext(
+            stylesheet, sink=io.StringIO() if stream else None,
+        )
+
+    serial = overlay_class(context(), **args).draw('G', model)
+    parallel = draw_parallel(
+        overlay_class(context(), **args), 'G', model, 2, stylesheet, args,
+    )
+    assert parallel == serial
+
+
+def test_parallel_walk_of_other_overlays_is_serial(load_example_model):
+    model = load_example_model('er')
+    assert draw_parallel(
+        EntityRelationship(), 'G', model, 2,
+    ) == EntityRelationship().draw('G', model)
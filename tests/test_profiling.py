@@ -0,0 +1,60 @@
+import json
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.overlays import Digraph
+from graphviz_overlay.profiling import Profiler, phase
+
+model = {
+    'nodes': {'a': {'classes': ['x']}, 'b': {'classes': ['x']}},
+    'edges': [{'from': 'a', 'to': 'b'}],
+    'subgraphs': {
+        'first': {'nodes': {'c': {}}},
+        'second': {'subgraphs': {'nested': {'nodes': {'d': {}}}}},
+    },
+}
+
+
+def test_profile_phases_of_draw():
+    recorded = []
+    profiler = Profiler(hooks=[recorded.append])
+    Digraph(GraphContext(profiler=profiler)).draw('G', model)
+
+    phases = [record['phase'] for record in profiler.phases]
+    assert phases == [
+        'compile',
+        'stylesheet',
+        'preprocess',
+        'walk/first',
+        'walk/second',
+        'walk',
+        'source',
+    ]
+    assert recorded == profiler.phases
+    assert all(record['seconds'] >= 0 for record in recorded)
+
+
+def test_profile_counters():
+    profiler = Profiler()
+    Digraph(GraphContext(profiler=profiler)).draw('G', model)
+
+    counters = profiler.report()['counters']
+    # Graph, node and edge defaults of the graph and three subgraphs,
+    # four nodes and an edge.
+    assert counters['build_attributes'] == 17
+    assert (
+        counters['style_cache_hits'] + counters['style_cache_misses']
+        == counters['build_attributes']
+    )
+    assert counters['style_cache_hits'] > 0
+
+
+def test_report_is_json():
+    profiler = Profiler()
+    with phase(profiler, 'load'):
+        pass
+    with phase(None, 'ignored'):
+        pass
+
+    report = json.loads(json.dumps(profiler.report()))
+    assert [record['phase'] for record in report['phases']] == ['load']
+    assert 'label_template_hits' in report['counters']
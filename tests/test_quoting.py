@@ -0,0 +1,53 @@
+from graphviz import quoting as graphviz_quoting
+import pytest
+
+from graphviz_overlay import quoting
+from graphviz_overlay.overlays import Digraph
+
+identifiers = [
+    'spam', 'spam spam', '', 'node', 'Graph', '-4.2', '<<b>html</b>>',
+    graphviz_quoting.nohtml('<<b>html</b>>'), 'say "hi"', 'a:port',
+    'a b:port port:n',
+]
+
+
+@pytest.mark.parametrize('identifier', identifiers)
+def test_quoting_matches_graphviz(identifier):
+    for _ in range(2):
+        assert quoting.quote(identifier) == graphviz_quoting.quote(identifier)
+        assert (
+            quoting.quote_edge(identifier)
+            == graphviz_quoting.quote_edge(identifier)
+        )
+
+
+def test_attribute_lists_match_graphviz():
+    cases = [
+        (None, {'style': 'invis', 'color': 'a b'}, None),
+        ('a label', {'shape': 'box', 'empty': None}, None),
+        (None, None, [('z', '1'), ('a', 'node'), ('z', '2')]),
+        (None, {}, {'b': '1', 'a': '2'}),
+        (None, None, None),
+    ]
+    for label, kwargs, attributes in cases:
+        assert quoting.attr_list(
+            label, kwargs=kwargs, attributes=attributes,
+        ) == graphviz_quoting.attr_list(
+            label, kwargs=kwargs, attributes=attributes,
+        )
+
+
+def test_cache_info_counts_hits():
+    quoting.cache_clear()
+    model = {
+        'nodes': {'a b': {'color': 'red'}, 'c': {'color': 'red'}},
+        'edges': [
+            {'from': 'a b', 'to': 'c'},
+            {'from': 'c', 'to': 'a b'},
+        ],
+    }
+    Digraph().draw('G', model)
+
+    info = quoting.cache_info()
+    assert info['misses'] > 0
+    assert info['hits'] > 0
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+from graphviz_overlay.batch import render_views
+from graphviz_overlay.overlays import Digraph, Graph
+from graphviz_overlay.render import RenderPool, render, render_async
+
+
+def test_render_to_file(fake_dot, tmp_path):
+    outfile = tmp_path / 'g.png'
+    seconds, output = render('graph G {}', str(outfile), format='png')
+
+    assert output is None
+    assert seconds > 0
+    assert outfile.read_text() == 'png:graph G {}'
+
+
+def test_render_to_stdout(fake_dot):
+    _, output = render('graph G {}')
+    assert output == b'svg:graph G {}'
+
+
+def test_render_failure(fake_dot):
+    with pytest.raises(RuntimeError, match='syntax error'):
+        render('fail')
+
+
+def test_render_timeout(fake_dot):
+    with pytest.raises(RuntimeError, match='timed out'):
+        render('sleep', timeout=0.5)
+
+
+def test_render_pool(fake_dot, tmp_path):
+    outfiles = [str(tmp_path / f'{i}.svg') for i in range(4)]
+    with RenderPool(jobs=2) as pool:
+        futures = [
+            pool.submit(f'graph G{i} {{}}', outfile)
+            for i, outfile in enumerate(outfiles)
+        ]
+    for i, (outfile, future) in enumerate(zip(outfiles, futures)):
+        assert future.result()[0] > 0
+        with open(outfile) as f:
+            assert f.read() == f'svg:graph G{i} {{}}'
+
+
+def test_render_views(fake_dot, tmp_path):
+    model = {'nodes': {'a': {}, 'b': {}}}
+    views = [
+        {'output': 'g.dot', 'overlay': 'graph'},
+        {'output': 'd.dot', 'overlay': 'digraph'},
+    ]
+    overlays = {'graph': Graph, 'digraph': Digraph}
+    timings = []
+    with RenderPool(jobs=2, format='pdf') as pool:
+        outfiles = render_views(
+            model, {}, views, overlays, outdir=str(tmp_path),
+            render_pool=pool, timings=timings,
+        )
+
+    for outfile, timing in zip(outfiles, timings):
+        rendered = outfile[:-len('.dot')] + '.pdf'
+        with open(outfile) as f:
+            source = f.read()
+        with open(rendered) as f:
+            assert f.read() == f'pdf:{source}'
+        assert timing['output'] == outfile
+        assert timing['rendered'] == rendered
+        assert timing['overlay_seconds'] > 0
+        assert timing['layout_seconds'] > 0
+
+
+def test_render_async(fake_dot):
+    seconds, output = asyncio.run(render_async('graph G {}', format='png'))
+    assert seconds > 0
+    assert output == b'png:graph G {}'
+
+    with pytest.raises(RuntimeError, match='syntax error'):
+        asyncio.run(render_async('fail'))
+    with pytest.raises(RuntimeError, match='timed out'):
+        asyncio.run(render_async('sleep', timeout=0.5))
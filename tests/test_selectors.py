@@ -0,0 +1,64 @@
+import itertools
+
+import pytest
+
+from benchmarks.bench_selectors import reference_paths_in_paths
+from graphviz_overlay.overlays import Graph
+from graphviz_overlay.selectors import PathSelector
+
+selector_cases = [
+    '',
+    'a',
+    'a.b',
+    '^a',
+    'a,^b',
+    '^a,^b.c',
+    'b,',
+    '^',
+    'a.b.c,a.b,x',
+    '^x,^a.b,c',
+]
+
+path_cases = [
+    [],
+    [''],
+    ['a'],
+    ['a.b'],
+    ['a.b.c'],
+    ['b'],
+    ['b.c', 'x'],
+    ['^a'],
+    ['c', 'a.b.d'],
+]
+
+
+@pytest.mark.parametrize('select', selector_cases)
+def test_match_equals_string_prefix_matching(select):
+    overlay = Graph(select=select, highlight=select, shade=select)
+    for paths in path_cases:
+        selected, highlighted, shaded = overlay.selector.match(paths)
+        expect = bool(
+            reference_paths_in_paths(paths, overlay.selected_paths),
+        )
+        assert highlighted == expect, paths
+        assert shaded == expect, paths
+        assert selected == (select == '' or expect), paths
+
+
+def test_match_combines_selections():
+    selector = PathSelector()
+    selector.add(['a.b', '^c'], unset=True)
+    selector.add(['a'])
+    selector.add([''])
+
+    assert selector.match(['a.b.c']) == (True, True, False)
+    assert selector.match(['c.d']) == (False, False, False)
+    assert selector.match(['d']) == (True, False, False)
+
+
+def test_match_any_path():
+    selector = PathSelector()
+    selector.add(['x', '^y'])
+    for paths in itertools.permutations(['y.1', 'x.1', 'z']):
+        assert selector.match(paths) == (True,)
+    assert selector.match(['y.1', 'z']) == (False,)
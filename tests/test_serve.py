@@ -0,0 +1,173 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+
+import pytest
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.overlays import Digraph, Graph
+from graphviz_overlay.serve import DrawServer, StylesheetStore
+
+overlays = {overlay.name: overlay for overlay in [Graph, Digraph]}
+
+model = {
+    'nodes': {'a': {'classes': ['important']}, 'b': {}},
+    'edges': [{'from': 'a', 'to': 'b', 'paths': ['x']}],
+}
+stylesheet = {'important': {'color': 'red'}}
+
+
+def expected_source(overlay_class, **options):
+    overlay = overlay_class(GraphContext(stylesheet), **options)
+    return overlay.draw('G', model)
+
+
+async def request_lines(path, requests):
+    reader, writer = await asyncio.open_unix_connection(path)
+    responses = []
+    for request in requests:
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        responses.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+
+async def request_http(port, method, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(
+        f'{method} / HTTP/1.1\r\nHost: localhost\r\n'
+        f'Content-Length: {len(body)}\r\n\r\n'.encode() + body
+    )
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), json.loads(body)
+
+
+@pytest.fixture
+def stylesheet_dir(tmp_path):
+    directory = tmp_path / 'styles'
+    directory.mkdir()
+    (directory / 'portal.json').write_text(json.dumps(stylesheet))
+    return directory
+
+
+def test_serve_unix_socket(tmp_path, stylesheet_dir):
+    path = str(tmp_path / 'serve.sock')
+    draw_server = DrawServer(
+        overlays, StylesheetStore(str(stylesheet_dir)), jobs=2,
+    )
+
+    async def run():
+        server = await draw_server.start_unix(path)
+        async with server:
+            return await request_lines(path, [
+                {'model': model, 'stylesheet': 'portal'},
+                {
+                    'model': model,
+                    'stylesheet': stylesheet,
+                    'overlay': 'digraph',
+                    'options': {'select': 'x'},
+                },
+                {'model': model, 'overlay': 'nope'},
+                {'model': model, 'options': {'nope': 1}},
+                {'model': model, 'stylesheet': '../portal'},
+            ])
+
+    responses = asyncio.run(run())
+    draw_server.close()
+
+    assert responses[:2] == [
+        {'source': expected_source(Graph)},
+        {'source': expected_source(Digraph, select='x')},
+    ]
+    assert responses[2] == {'error': "unknown overlay 'nope'"}
+    assert responses[3] == {'error': "unknown options ['nope']"}
+    assert responses[4] == {'error': "unknown stylesheet '../portal'"}
+
+
+def test_serve_http(fake_dot):
+    draw_server = DrawServer(overlays, StylesheetStore(default=stylesheet))
+
+    async def run():
+        server = await draw_server.start_http('127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return [
+                await request_http(
+                    port, 'POST', json.dumps({'model': model}).encode(),
+                ),
+                await request_http(
+                    port, 'POST',
+                    json.dumps({'model': model, 'format': 'svg'}).encode(),
+                ),
+                await request_http(port, 'POST', b'not json'),
+                await request_http(port, 'GET'),
+            ]
+
+    responses = asyncio.run(run())
+    draw_server.close()
+
+    source = expected_source(Graph)
+    assert responses[0] == (200, {'source': source})
+    status, response = responses[1]
+    assert status == 200
+    assert base64.b64decode(response['output']) == f'svg:{source}'.encode()
+    assert responses[2][0] == 400
+    assert responses[3][0] == 405
+
+
+def test_connection_open_at_shutdown(tmp_path, caplog):
+    path = str(tmp_path / 'serve.sock')
+    draw_server = DrawServer(overlays, StylesheetStore(default=stylesheet))
+
+    async def run():
+        server = await draw_server.start_unix(path)
+        async with server:
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(json.dumps({'model': model}).encode() + b'\n')
+            await writer.drain()
+            response = json.loads(await reader.readline())
+        # The connection is left open, its handler is cancelled as the
+        # loop shuts down.
+        return response
+
+    response = asyncio.run(run())
+    draw_server.close()
+
+    assert response == {'source': expected_source(Graph)}
+    assert not [
+        record for record in caplog.records
+        if record.levelno >= logging.ERROR
+    ]
+
+
+def test_stylesheets_are_reused_until_modified(stylesheet_dir):
+    store = StylesheetStore(str(stylesheet_dir))
+    styles = store.get('portal', Graph)
+    assert store.get('portal', Graph) is styles
+    assert store.get('portal', Digraph) is not styles
+
+    path = stylesheet_dir / 'portal.json'
+    path.write_text(json.dumps({'important': {'color': 'blue'}}))
+    mtime = path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+    assert store.get('portal', Graph)['important'] == {'color': 'blue'}
+
+
+def test_compiled_styles_shared_between_requests(stylesheet_dir):
+    draw_server = DrawServer(overlays, StylesheetStore(str(stylesheet_dir)))
+    draw_server.draw({'model': model, 'stylesheet': 'portal'})
+    styles = draw_server.stylesheets.get('portal', Graph)
+    compiled = dict(styles.compiled)
+    assert compiled
+
+    draw_server.draw({'model': model, 'stylesheet': 'portal'})
+    assert styles.compiled == compiled
+    draw_server.close()
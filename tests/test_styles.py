@@ -0,0 +1,62 @@
+import pytest
+
+from graphviz_overlay.styles import Stylesheet, merge_class
+
+
+def test_merge_class():
+    assert merge_class(
+        {'color': 'red', 'style': ['filled', 'dotted']},
+        {'color': 'blue', 'style': ['dotted', 'bold']},
+    ) == {'color': 'blue', 'style': ['filled', 'dotted', 'bold']}
+
+
+def test_layer_overrides_without_modifying_parent():
+    base = Stylesheet({'node': {'shape': 'box', 'style': ['filled']}})
+    local = base.layer({'node': {'color': 'red', 'style': ['rounded']}})
+
+    assert local['node'] == {
+        'shape': 'box',
+        'style': ['filled', 'rounded'],
+        'color': 'red',
+    }
+    assert base['node'] == {'shape': 'box', 'style': ['filled']}
+
+
+def test_sibling_layers_are_independent():
+    base = Stylesheet({'myclass': {'color': 'red'}})
+    first = base.layer({'myclass': {'shape': 'box'}})
+    second = base.layer({'other': {'shape': 'circle'}})
+
+    assert first['myclass'] == {'color': 'red', 'shape': 'box'}
+    assert second['myclass'] == {'color': 'red'}
+    assert 'other' not in first
+    assert list(second) == ['myclass', 'other']
+
+
+def test_definitions_are_copied():
+    classes = {'myclass': {'style': ['filled']}}
+    stylesheet = Stylesheet(classes)
+    classes['myclass']['style'].append('bold')
+    assert stylesheet['myclass'] == {'style': ['filled']}
+
+
+def test_lookups_are_memoised():
+    stylesheet = Stylesheet({'a': {'color': 'red'}}).layer({'b': {}})
+    assert stylesheet['a'] is stylesheet['a']
+    with pytest.raises(KeyError):
+        stylesheet['missing']
+    assert stylesheet.get('missing') is None
+
+
+def test_empty_layer_is_the_stylesheet():
+    stylesheet = Stylesheet({'a': {}})
+    assert stylesheet.layer({}) is stylesheet
+    assert stylesheet.layer(None) is stylesheet
+
+
+def test_layer_changing_nothing_is_the_stylesheet():
+    stylesheet = Stylesheet({'a': {'color': 'red', 'style': ['filled']}})
+    stylesheet.compiled['key'] = 'compiled'
+    assert stylesheet.layer({'a': {'style': ['filled']}}) is stylesheet
+    assert stylesheet.layer({'a': {'color': 'blue'}}) is not stylesheet
+    assert stylesheet.layer({'b': {}}) is not stylesheet
@@ -0,0 +1,50 @@
+from graphviz_overlay.symbols import SymbolTable
+
+
+def test_resolve_nearest_declaration():
+    symbols = SymbolTable()
+    symbols.declare_all(None, '', ['a', 'b'])
+    outer = symbols.scope('p')
+    symbols.declare_all(outer, 'p', ['a', 'c'])
+    inner = symbols.scope('', outer)
+    symbols.declare_all(inner, '', ['c'])
+
+    assert symbols.resolve(None, 'a') == 'a'
+    assert symbols.resolve(outer, 'a') == 'p_a'
+    assert symbols.resolve(inner, 'a') == 'p_a'
+    assert symbols.resolve(inner, 'c') == 'c'
+    assert symbols.resolve(inner, 'b') == 'b'
+    assert symbols.resolve(None, 'p_c') == 'p_c'
+    assert symbols.resolve(inner, 'missing') is None
+
+
+def test_node_declared_drawn_anywhere_is_drawn():
+    symbols = SymbolTable()
+    symbols.declare_all(None, '', ['a', 'b'], drawn=False)
+    symbols.declare_all(None, '', ['a'])
+    symbols.declare_all(None, '', ['c'])
+    symbols.declare_all(None, '', ['c', 'd'], drawn=False)
+
+    assert symbols.is_drawn('a')
+    assert not symbols.is_drawn('b')
+    assert symbols.is_drawn('c')
+    assert not symbols.is_drawn('d')
+
+
+def test_resolve_moving_between_scopes():
+    symbols = SymbolTable()
+    first = symbols.scope('p')
+    symbols.declare_all(first, 'p', ['a'])
+    nested = symbols.scope('', first)
+    second = symbols.scope('q')
+    symbols.declare_all(second, 'q', ['a'])
+
+    assert symbols.resolve(nested, 'a') == 'p_a'
+    assert symbols.resolve(second, 'a') == 'q_a'
+    assert symbols.resolve(None, 'a') is None
+    assert symbols.resolve(first, 'a') == 'p_a'
+
+    # Declared in a scope being resolved in.
+    symbols.declare_all(nested, '', ['a'])
+    assert symbols.resolve(nested, 'a') == 'a'
+    assert symbols.resolve(first, 'a') == 'p_a'
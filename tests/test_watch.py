@@ -0,0 +1,140 @@
+import copy
+import os
+
+import pytest
+
+from graphviz_overlay import GraphContext
+from graphviz_overlay.overlays import Digraph, EntityRelationship, Graph
+from graphviz_overlay.watch import IncrementalDraw, watch
+
+
+def first_subgraph(model):
+    return next(iter(model['subgraphs'].values()))
+
+
+def add_subgraph_node(model):
+    first_subgraph(model).setdefault('nodes', {})['added'] = {'rank': 'one'}
+
+
+def change_last_subgraph(model):
+    subgraph = list(model['subgraphs'].values())[-1]
+    subgraph['label'] = 'changed'
+
+
+def add_root_edge(model):
+    model.setdefault('edges', []).append({'from': 'x', 'to': 'y'})
+
+
+def change_root_attribute(model):
+    model['bgcolor'] = 'lightblue'
+
+
+def add_subgraph(model):
+    model['subgraphs']['added'] = {'nodes': {'z': {'paths': ['added']}}}
+
+
+def remove_subgraph(model):
+    model['subgraphs'].pop(next(iter(model['subgraphs'])))
+
+
+edits = [
+    add_subgraph_node,
+    change_last_subgraph,
+    add_root_edge,
+    change_root_attribute,
+    add_subgraph,
+    remove_subgraph,
+]
+
+
+@pytest.mark.parametrize('example', ['simple', 'cluster', 'layer'])
+@pytest.mark.parametrize('overlay_class,args', [
+    (Graph, {}),
+    (Digraph, {'select': 'subgraph,0,letters', 'highlight': 'added'}),
+    (Digraph, {'select': 'subgraph.subsub,1', 'remove_deselected': True}),
+    (Graph, {'shade': '^letters'}),
+])
+def test_incremental_draw_matches_full_draw(
+    example, overlay_class, args, load_example_model,
+):
+    stylesheet = {'highlighted': {'color': 'red'}}
+
+    def overlay_factory():
+        return overlay_class(GraphContext(stylesheet), **args)
+
+    incremental = IncrementalDraw(overlay_factory, 'G')
+    model = load_example_model(example)
+    assert incremental.draw(model) == overlay_factory().draw('G', model)
+
+    for edit in edits:
+        model = copy.deepcopy(model)
+        edit(model)
+        assert incremental.draw(model) == overlay_factory().draw('G', model)
+
+
+def test_only_changed_subgraphs_are_redrawn(load_example_model):
+    incremental = IncrementalDraw(Digraph, 'G')
+    model = load_example_model('cluster')
+    incremental.draw(model)
+    assert incremental.redrawn == ['0', '1']
+
+    model = copy.deepcopy(model)
+    add_root_edge(model)
+    incremental.draw(model)
+    assert incremental.redrawn == []
+
+    model = copy.deepcopy(model)
+    change_last_subgraph(model)
+    incremental.draw(model)
+    assert incremental.redrawn == ['1']
+
+    model = copy.deepcopy(model)
+    change_root_attribute(model)
+    incremental.draw(model)
+    assert incremental.redrawn == ['0', '1']
+
+
+def test_subgraphs_with_edges_resolving_alike_are_kept():
+    def overlay_factory():
+        return Digraph(select='a,b', remove_deselected=True)
+
+    incremental = IncrementalDraw(overlay_factory, 'G')
+    model = {
+        'subgraphs': {
+            'a': {'nodes': {'x': {}}},
+            'b': {'nodes': {'v': {}}, 'edges': [{'from': 'x', 'to': 'y'}]},
+            'c': {'nodes': {'w': {}}},
+        },
+    }
+    incremental.draw(model)
+
+    # The edge of b now ends at a removed node.
+    model = copy.deepcopy(model)
+    model['subgraphs']['c']['nodes']['y'] = {}
+    source = incremental.draw(model)
+    assert incremental.redrawn == ['b', 'c']
+    assert source == overlay_factory().draw('G', model)
+    assert 'x -> y' not in source
+
+    model = copy.deepcopy(model)
+    model['subgraphs']['a']['nodes']['u'] = {}
+    assert incremental.draw(model) == overlay_factory().draw('G', model)
+    assert incremental.redrawn == ['a']
+
+
+def test_other_overlays_are_drawn_in_full(load_example_model):
+    incremental = IncrementalDraw(EntityRelationship, 'G')
+    model = load_example_model('er')
+    assert incremental.draw(model) == EntityRelationship().draw('G', model)
+    assert incremental.redrawn is None
+
+
+def test_watch_yields_on_modification(tmp_path):
+    path = tmp_path / 'model.json'
+    path.write_text('{}')
+    changes = watch([str(path)], interval=0)
+
+    next(changes)
+    mtime = path.stat().st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+    next(changes)